@@ -0,0 +1,104 @@
+"""
+Micro-benchmark of the hydration of the libraries read from the db.
+
+It compares the previous approach (validate every node again, parsing phone
+numbers and emails, with a debug message per node) with the trusted hydration
+of the repository, that builds the models without validating them.
+
+Run it from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_hydration.py
+"""
+
+import argparse
+import timeit
+import uuid
+from typing import Any
+
+from ferrea.core.context import Context
+from ferrea.observability.logs import ferrea_logger
+from neo4j.spatial import WGS84Point
+
+from adapters.libraries import LibrariesRepository
+from models.library import Library
+
+CONTEXT = Context(uuid=str(uuid.uuid4()), app="LBS_BNC")
+
+
+def _nodes(count: int) -> list[dict[str, Any]]:
+    """Properties of the nodes, as they are stored on the db."""
+    library = Library(
+        name="Library",
+        address="via Monte Amiata, 60, Monza, MB, Italy",
+        phone="+39 039 731269",
+        email="monza.triante@brianzabiblioteche.it",
+    )
+    return [
+        {
+            "fid": str(uuid.uuid4()),
+            "name": f"Library {index}",
+            "address": library.address,
+            "phone": str(library.phone),
+            "email": str(library.email),
+            "location": WGS84Point((9.2550648, 45.5832943)),
+            "location_pending": False,
+            "version": 1,
+        }
+        for index in range(count)
+    ]
+
+
+def validated(nodes: list[dict[str, Any]]) -> list[Library]:
+    libraries = []
+    for node in nodes:
+        raw_library = dict(node)
+        ferrea_logger.debug(
+            f"Retrieved library: {raw_library['name']}, fid {raw_library['fid']}.",
+            **CONTEXT.log,
+        )
+        point = raw_library.get("location")
+        if point is not None:
+            raw_library["longitude"] = point.x
+            raw_library["latitude"] = point.y
+        libraries.append(Library(**raw_library))
+    return libraries
+
+
+def trusted(nodes: list[dict[str, Any]]) -> list[Library]:
+    repository = LibrariesRepository(db_client=None, context=CONTEXT)  # type: ignore
+    return [repository._build_library(dict(node)) for node in nodes]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'libraries':>10} {'validated (us)':>15} {'trusted (us)':>13} {'speedup':>8}"
+    )
+    for size in args.sizes:
+        nodes = _nodes(size)
+        assert validated(nodes) == trusted(nodes)
+
+        number = max(1, 10_000 // size)
+        timings = {}
+        for name, function in (("validated", validated), ("trusted", trusted)):
+            best = min(
+                timeit.repeat(
+                    lambda function=function, nodes=nodes: function(nodes),
+                    number=number,
+                    repeat=args.repeat,
+                )
+            )
+            timings[name] = best / number * 1e6
+
+        print(
+            f"{size:>10} {timings['validated']:>15.1f} {timings['trusted']:>13.1f}"
+            f" {timings['validated'] / timings['trusted']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
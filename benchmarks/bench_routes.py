@@ -0,0 +1,497 @@
+"""
+Load and latency benchmark of every route of the libraries and probes routers.
+
+The app is driven in process through httpx (no network, no server), against
+one of two backends:
+
+- fake: the in-memory FakeRepository of the tests;
+- neo4j: the real repository on a local Neo4j, e.g. a throwaway container
+  (docker run --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5).
+  Its data is WIPED before seeding each data set.
+
+Geocoding is replaced by a constant stand-in, so that it runs offline.
+For each data set size, every scenario reports throughput and p50/p95/p99 latency.
+Results can be saved as a baseline and later compared against it: a scenario whose
+throughput or p95 got worse than the tolerance is a regression (exit code 1).
+Baselines are only comparable on the same machine.
+
+Run it from the repository root:
+
+    PYTHONPATH=src:tests python benchmarks/bench_routes.py --backend fake \\
+        --sizes 10 1000 100000 --save-baseline /tmp/baseline.json
+    PYTHONPATH=src:tests python benchmarks/bench_routes.py --backend fake \\
+        --sizes 10 1000 100000 --baseline /tmp/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self
+from unittest import mock
+
+# settings are read on import: no background worker, a throwaway geocoding cache.
+os.environ.setdefault("FERREA_GEOCODING__BACKGROUND", "false")
+os.environ.setdefault(
+    "FERREA_GEOCODING__CACHE_PATH",
+    str(Path(tempfile.gettempdir()) / "ferrea-libraries-bench.sqlite3"),
+)
+
+import httpx
+from fake.repository import AsyncFakeRepository, FakeRepository
+from fastapi import FastAPI
+from ferrea.core.context import Context
+
+from adapters.cached_libraries import (
+    CachedLibrariesRepository,
+    LibraryCache,
+)
+from adapters.coalesced_libraries import (
+    CoalescedLibrariesRepository,
+    ReadKey,
+)
+from adapters.database import AsyncNeo4jPool
+from adapters.geocoding import CachedGeocoder
+from adapters.health import DatabaseHealthChecker
+from adapters.single_flight import SingleFlight
+from app import app as spinup_app
+from configs import settings
+from models.geocoding import Coordinates
+from models.library import Library
+from models.repository import AsyncRepositoryService
+from operations.pagination import encode_cursor
+from routers._builder import build_repository
+
+PREFIX = "/api/v1/libraries"
+MONZA = Coordinates(latitude=45.5832943, longitude=9.2550648)
+STREETS = ["Via Roma", "Via Monte Amiata", "Via Padre Giuliani", "Corso Milano"]
+CITIES = ["Monza", "Milano", "Lissone", "Vedano al Lambro", "Arcore"]
+
+# the export streams the whole collection: skipped on the larger data sets.
+MAX_EXPORT_SIZE = 100_000
+
+_SEED_CHUNK_SIZE = 10_000
+
+_WIPE_QUERY = """//cypher
+    MATCH (l:Library) WITH l LIMIT 10000 DETACH DELETE l RETURN count(*)
+"""
+
+_SEED_QUERY = """//cypher
+    UNWIND $rows AS row
+    CREATE (:Library {fid: row.fid, name: row.name, address: row.address,
+    phone: row.phone, email: row.email,
+    location: point({latitude: row.latitude, longitude: row.longitude}),
+    location_pending: false, version: 1})
+"""
+
+_BUMP_VERSION_QUERY = """//cypher
+    MERGE (v:CollectionVersion {name: 'Library'})
+    SET v.version = coalesce(v.version, 0) + 1
+"""
+
+
+@dataclass
+class Request:
+    """A single request of a scenario."""
+
+    method: str
+    path: str
+    params: dict[str, Any] | None = None
+    json: Any = None
+    headers: dict[str, str] | None = None
+
+
+@dataclass
+class Scenario:
+    """A route under load: the index of the request builds the request."""
+
+    name: str
+    build: Callable[[int], Request]
+    requests: int
+    # the responses are handed over, e.g. to remember the created libraries.
+    collect: Callable[[httpx.Response], None] | None = None
+
+
+@dataclass
+class Result:
+    """Throughput and latency percentiles (in milliseconds) of a scenario."""
+
+    requests: int
+    errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+
+    @classmethod
+    def from_latencies(
+        cls, latencies: list[float], errors: int, elapsed: float
+    ) -> "Result":
+        percentiles = statistics.quantiles(
+            [x * 1000 for x in latencies] * (2 if len(latencies) == 1 else 1),
+            n=100,
+            method="inclusive",
+        )
+        return cls(
+            requests=len(latencies),
+            errors=errors,
+            throughput=len(latencies) / elapsed,
+            p50=percentiles[49],
+            p95=percentiles[94],
+            p99=percentiles[98],
+        )
+
+
+@dataclass
+class DataSet:
+    """The seeded libraries, and the state shared by the scenarios."""
+
+    size: int
+    fids: list[str]
+    created: list[str] = field(default_factory=list)
+
+
+class StandInDBClient:
+    """Client always able to reach the db, for the probes of the fake backend."""
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
+
+    async def read(self, query: str, params: Any = None) -> list[Any]:
+        return []
+
+    async def verify_connectivity(self) -> bool:
+        return True
+
+
+def _libraries(size: int, seed: int) -> list[Library]:
+    """Deterministic libraries around Monza, the same for every backend."""
+    rng = random.Random(seed)
+    return [
+        Library.from_trusted(
+            {
+                "fid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "name": f"Biblioteca {rng.choice(CITIES)} {index}",
+                "address": f"{rng.choice(STREETS)}, {index}, {rng.choice(CITIES)}",
+                "phone": "tel:+39-039-731269",
+                "email": f"library{index}@brianzabiblioteche.it",
+                "latitude": MONZA.latitude + rng.uniform(-0.2, 0.2),
+                "longitude": MONZA.longitude + rng.uniform(-0.2, 0.2),
+                "version": 1,
+            }
+        )
+        for index in range(size)
+    ]
+
+
+def _fake_app(libraries: list[Library]) -> FastAPI:
+    """The app, on a fake repository seeded with the libraries."""
+    context = Context(uuid=str(uuid.uuid4()), app="LBS_BNC")
+    fake = FakeRepository(context=context, db_client=None)  # type: ignore
+    fake._graph.extend(libraries)
+    fake._version += 1
+    repository: AsyncRepositoryService = AsyncFakeRepository(fake)
+
+    app = spinup_app()
+    app.state.geocoding_worker = None
+    app.state.library_cache = None
+    if settings.library_cache.enabled:
+        app.state.library_cache = LibraryCache(settings.library_cache)
+    if settings.request_coalescing.enabled:
+        repository = CoalescedLibrariesRepository(
+            repository=repository, flights=SingleFlight[ReadKey]()
+        )
+
+    def fake_repository() -> AsyncRepositoryService:
+        # same wiring of build_repository, cache and coalescing included.
+        if app.state.library_cache is None:
+            return repository
+        return CachedLibrariesRepository(
+            repository=repository, cache=app.state.library_cache
+        )
+
+    app.dependency_overrides[build_repository] = fake_repository
+    app.state.health_checker = DatabaseHealthChecker(
+        settings=settings.health_check, db_client_factory=StandInDBClient
+    )
+    return app
+
+
+async def _seed_neo4j(libraries: list[Library]) -> None:
+    """Replace the libraries on the db with the given ones."""
+    db_pool = AsyncNeo4jPool(settings.database)
+    try:
+        while True:
+            async with db_pool.session() as session:
+                [[deleted]] = await session.write(_WIPE_QUERY)
+            if deleted == 0:
+                break
+
+        for start in range(0, len(libraries), _SEED_CHUNK_SIZE):
+            rows = [
+                x.model_dump(mode="json")
+                for x in libraries[start : start + _SEED_CHUNK_SIZE]
+            ]
+            async with db_pool.session() as session:
+                await session.write(_SEED_QUERY, {"rows": rows})
+
+        async with db_pool.session() as session:
+            await session.write(_BUMP_VERSION_QUERY)
+    finally:
+        await db_pool.close()
+
+
+def _scenarios(data: DataSet, requests: int) -> list[Scenario]:
+    """All the routes, reads first: writes change the data set."""
+    fids = data.fids
+
+    def fid(index: int) -> str:
+        return fids[index % len(fids)]
+
+    def library(index: int, prefix: str = "Benchmark") -> dict[str, Any]:
+        return {"name": f"{prefix} {index}", "address": f"Via Roma, {index}, Monza"}
+
+    def remember(response: httpx.Response) -> None:
+        if response.status_code == 200:
+            data.created.append(response.json()["fid"])
+
+    def created(index: int) -> str:
+        # every library created is deleted once, then the seeded ones are missing.
+        return data.created[index] if index < len(data.created) else fid(index)
+
+    scenarios = [
+        Scenario("list", lambda i: Request("GET", PREFIX), requests),
+        Scenario(
+            "list_page",
+            lambda i: Request("GET", PREFIX, params={"cursor": encode_cursor(fid(i))}),
+            requests,
+        ),
+        Scenario(
+            "list_fields",
+            lambda i: Request("GET", PREFIX, params={"fields": "fid,name"}),
+            requests,
+        ),
+        Scenario(
+            "list_bbox",
+            lambda i: Request("GET", PREFIX, params={"bbox": "9.2,45.5,9.3,45.6"}),
+            requests,
+        ),
+        Scenario(
+            "list_not_modified",
+            lambda i: Request("GET", PREFIX, headers={"If-None-Match": "*"}),
+            requests,
+        ),
+        Scenario("lookup", lambda i: Request("GET", f"{PREFIX}/{fid(i)}"), requests),
+        Scenario(
+            "lookup_not_modified",
+            lambda i: Request(
+                "GET", f"{PREFIX}/{fid(i)}", headers={"If-None-Match": "*"}
+            ),
+            requests,
+        ),
+        Scenario(
+            "nearby",
+            lambda i: Request(
+                "GET",
+                f"{PREFIX}/nearby",
+                params={"lat": MONZA.latitude, "lon": MONZA.longitude, "radius": 2000},
+            ),
+            requests,
+        ),
+        Scenario(
+            "search",
+            lambda i: Request(
+                "GET", f"{PREFIX}/search", params={"q": f"bibl {CITIES[i % 5]}"}
+            ),
+            requests,
+        ),
+    ]
+    if data.size <= MAX_EXPORT_SIZE:
+        scenarios.append(
+            Scenario(
+                "export",
+                lambda i: Request("GET", f"{PREFIX}:export"),
+                max(1, min(requests, 10_000 // max(1, data.size))),
+            )
+        )
+
+    scenarios += [
+        Scenario(
+            "create",
+            lambda i: Request("POST", PREFIX, json=library(i)),
+            requests,
+            collect=remember,
+        ),
+        Scenario(
+            "batch",
+            lambda i: Request(
+                "POST",
+                f"{PREFIX}:batch",
+                json=[library(i * 100 + x, "Batch") for x in range(100)],
+            ),
+            max(1, requests // 10),
+        ),
+        Scenario(
+            "update",
+            lambda i: Request("PUT", f"{PREFIX}/{created(i)}", json=library(i)),
+            requests,
+        ),
+        Scenario(
+            "delete", lambda i: Request("DELETE", f"{PREFIX}/{created(i)}"), requests
+        ),
+        Scenario("ready", lambda i: Request("GET", "/_/ready"), requests),
+        Scenario("health", lambda i: Request("GET", "/_/health"), requests),
+        Scenario("stats", lambda i: Request("GET", "/_/stats"), requests),
+    ]
+    return scenarios
+
+
+async def _run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, concurrency: int
+) -> Result:
+    """Send the requests of a scenario from concurrent clients."""
+    latencies: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < scenario.requests:
+            request = scenario.build(next_index)
+            next_index += 1
+
+            started = time.perf_counter()
+            response = await client.request(
+                request.method,
+                request.path,
+                params=request.params,
+                json=request.json,
+                headers=request.headers,
+            )
+            latencies.append(time.perf_counter() - started)
+
+            if response.status_code >= 400:
+                errors += 1
+            if scenario.collect is not None:
+                scenario.collect(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return Result.from_latencies(latencies, errors, time.perf_counter() - started)
+
+
+async def run(
+    backend: str, size: int, requests: int, concurrency: int, seed: int
+) -> dict[str, Result]:
+    """Seed a data set of the given size, then run all the scenarios on it."""
+    libraries = _libraries(size, seed)
+    data = DataSet(size=size, fids=[str(x.fid) for x in libraries])
+
+    async with AsyncExitStack() as stack:
+        if backend == "fake":
+            app = _fake_app(libraries)
+            await app.state.health_checker.check()
+        else:
+            await _seed_neo4j(libraries)
+            app = spinup_app()
+            await stack.enter_async_context(app.router.lifespan_context(app))
+
+        # geocoding stand-in: the same location for every address, no upstream call.
+        stack.enter_context(
+            mock.patch.object(CachedGeocoder, "_lookup", lambda self, address: MONZA)
+        )
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench"
+            )
+        )
+
+        return {
+            scenario.name: await _run_scenario(client, scenario, concurrency)
+            for scenario in _scenarios(data, requests)
+        }
+
+
+def _compare(
+    result: Result, baseline: dict[str, float] | None, tolerance: float
+) -> str:
+    """Helper function to compare a result against its baseline, if any."""
+    if baseline is None:
+        return ""
+
+    throughput = result.throughput / baseline["throughput"] - 1
+    p95 = result.p95 / baseline["p95"] - 1
+    regressed = throughput < -tolerance or p95 > tolerance
+    return f"{'REGRESSION' if regressed else 'ok':<10} {throughput:+.0%} rps {p95:+.0%} p95"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=["fake", "neo4j"], default="fake")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, help="compare against this baseline")
+    parser.add_argument("--save-baseline", type=Path, help="save the results here")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="relative change of throughput or p95 tolerated (default 0.25)",
+    )
+    args = parser.parse_args()
+
+    baseline: dict[str, dict[str, float]] = {}
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+
+    print(
+        f"{'backend':<7} {'libraries':>9} {'scenario':<20} {'req/s':>9}"
+        f" {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errors':>6}"
+    )
+    results: dict[str, dict[str, float]] = {}
+    regressions = 0
+    for size in args.sizes:
+        measures = asyncio.run(
+            run(args.backend, size, args.requests, args.concurrency, args.seed)
+        )
+        for name, result in measures.items():
+            key = f"{args.backend}/{size}/{name}"
+            results[key] = {
+                "throughput": result.throughput,
+                "p50": result.p50,
+                "p95": result.p95,
+                "p99": result.p99,
+            }
+            comparison = _compare(result, baseline.get(key), args.tolerance)
+            regressions += comparison.startswith("REGRESSION")
+            print(
+                f"{args.backend:<7} {size:>9} {name:<20} {result.throughput:>9.1f}"
+                f" {result.p50:>9.2f} {result.p95:>9.2f} {result.p99:>9.2f}"
+                f" {result.errors:>6} {comparison}"
+            )
+
+    if args.save_baseline is not None:
+        args.save_baseline.write_text(json.dumps(results, indent=2, sort_keys=True))
+
+    sys.exit(1 if regressions > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
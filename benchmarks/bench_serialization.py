@@ -0,0 +1,129 @@
+"""
+Micro-benchmark of the serialization of the list responses.
+
+It compares the previous approach (dump to JSON, load it back, let JSONResponse
+dump it again) with ModelResponse, that writes the pydantic-core bytes as they are.
+Then, for each representation (JSON and the installed binary formats) and compression,
+it reports the size of the payload and the time to encode it.
+
+Run it from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_serialization.py
+"""
+
+import argparse
+import json
+import timeit
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from models.library import Library, LibraryList
+from routers._codecs import CODECS, ENCODINGS, Codec, ContentEncoding
+from routers._responses import ModelResponse, encode
+
+
+def _libraries(count: int) -> list[Library]:
+    return [
+        Library(
+            name=f"Library {index}",
+            address=f"via Monte Amiata, {index}, Monza, MB, Italy",
+            fid=str(uuid.uuid4()),
+            phone="+39 039 731269",
+            email="monza.triante@brianzabiblioteche.it",
+            latitude=45.5832943,
+            longitude=9.2550648,
+        )
+        for index in range(count)
+    ]
+
+
+def json_round_trip(libraries: list[Library]) -> bytes:
+    response = {
+        "items": len(libraries),
+        "result": [
+            json.loads(library.model_dump_json(by_alias=True)) for library in libraries
+        ],
+    }
+    return JSONResponse(content=response).body
+
+
+def model_response(libraries: list[Library]) -> bytes:
+    response = LibraryList(items=len(libraries), result=libraries)
+    return ModelResponse(content=response, exclude={"next_cursor"}).body
+
+
+def encoded_payload(
+    libraries: list[Library], codec: Codec, encoding: ContentEncoding | None
+) -> bytes:
+    response = LibraryList(items=len(libraries), result=libraries)
+    body = encode(response, codec=codec, exclude={"next_cursor"})
+    if encoding is None:
+        return body
+    # the default levels of the compression settings.
+    compressor = encoding.compressor(3 if encoding.name == "zstd" else 6)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _timeit(function: Callable[[], Any], number: int, repeat: int) -> float:
+    """Best time of a call, in us."""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'libraries':>10} {'round trip (us)':>16} {'model (us)':>12} {'speedup':>8}"
+    )
+    for size in args.sizes:
+        libraries = _libraries(size)
+        assert json.loads(json_round_trip(libraries)) == json.loads(
+            model_response(libraries)
+        )
+
+        number = max(1, 10_000 // size)
+        timings = {}
+        for name, function in (
+            ("round_trip", json_round_trip),
+            ("model", model_response),
+        ):
+            best = min(
+                timeit.repeat(
+                    lambda function=function, libraries=libraries: function(libraries),
+                    number=number,
+                    repeat=args.repeat,
+                )
+            )
+            timings[name] = best / number * 1e6
+
+        print(
+            f"{size:>10} {timings['round_trip']:>16.1f} {timings['model']:>12.1f}"
+            f" {timings['round_trip'] / timings['model']:>7.1f}x"
+        )
+
+    print(f"\n{'libraries':>10} {'format':>16} {'bytes':>10} {'encode (us)':>12}")
+    for size in args.sizes:
+        libraries = _libraries(size)
+        number = max(1, 10_000 // size)
+        for codec in CODECS:
+            for encoding in (None, *ENCODINGS):
+                name = codec.name + (f"+{encoding.name}" if encoding else "")
+                payload = encoded_payload(libraries, codec, encoding)
+                elapsed = _timeit(
+                    lambda libraries=libraries, codec=codec, encoding=encoding: (
+                        encoded_payload(libraries, codec, encoding)
+                    ),
+                    number=number,
+                    repeat=args.repeat,
+                )
+                print(f"{size:>10} {name:>16} {len(payload):>10} {elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
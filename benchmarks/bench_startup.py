@@ -0,0 +1,184 @@
+"""
+Cold start benchmark: how long a new process takes before serving and being ready.
+
+Each run starts a fresh uvicorn process and polls /_/ready until it answers 200,
+reporting the time from the start of the process until:
+
+- import: the app is imported and built (in a bare process, without the interpreter startup);
+- serving: the first response of any status (the lifespan has started);
+- ready: the first 200, i.e. the db has been reached and the pool warmed.
+
+Being ready needs a reachable Neo4j (see the FERREA_DATABASE__* variables), e.g. a
+throwaway container (docker run --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5):
+without it only serving is reported, as long as the migrations on startup are
+disabled (FERREA_MIGRATIONS__ON_STARTUP=false): they wait for the db.
+With --profile the modules slowest to import are listed as well (python -X importtime).
+With --budget the run fails (exit code 1) if importing the app takes longer.
+
+Run it from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_startup.py --runs 5 --profile --budget 1.0
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+SRC = Path(__file__).parents[1] / "src"
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import app
+app.app()
+print(time.perf_counter() - started)
+"""
+
+
+@dataclass
+class Run:
+    """Timings of a single cold start, in seconds (None if never reached)."""
+
+    imported: float
+    serving: float | None
+    ready: float | None
+
+
+def _environment() -> dict[str, str]:
+    """The environment of the processes, with the sources on the path."""
+    path = os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")]))
+    return {**os.environ, "PYTHONPATH": path}
+
+
+def _free_port() -> int:
+    """A free port on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _import_time() -> float:
+    """Time to import the app module and build the app, in a bare process."""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", IMPORT_SCRIPT],
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.splitlines()[-1])
+
+
+def _serve(timeout: float) -> tuple[float | None, float | None]:
+    """Time until a new server process first answers and first answers 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            *(sys.executable, "-W", "ignore", "-m", "uvicorn", "app:app"),
+            *("--factory", "--port", str(port), "--log-level", "warning"),
+        ],
+        env=_environment(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    serving = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    response = client.get("/_/ready", timeout=1.0)
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                elapsed = time.perf_counter() - started
+                serving = serving if serving is not None else elapsed
+                if response.status_code == 200:
+                    ready = elapsed
+                    break
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+    return serving, ready
+
+
+def _profile(top: int) -> list[tuple[float, float, str]]:
+    """The slowest modules to import: cumulative time, self time and name."""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import app"],
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.append((int(cumulative) / 1e6, int(own) / 1e6, name.rstrip()))
+
+    return sorted(modules, reverse=True)[:top]
+
+
+def _format(values: list[float | None]) -> str:
+    """Median and max of some timings, in ms."""
+    reached = [value for value in values if value is not None]
+    if len(reached) == 0:
+        return "not reached"
+    return (
+        f"median {statistics.median(reached) * 1000:7.1f} ms, "
+        f"max {max(reached) * 1000:7.1f} ms ({len(reached)}/{len(values)} runs)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="seconds to wait for ready"
+    )
+    parser.add_argument(
+        "--profile", type=int, nargs="?", const=20, default=0, metavar="TOP"
+    )
+    parser.add_argument(
+        "--budget", type=float, help="max seconds (median) to import the app"
+    )
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        imported = _import_time()
+        serving, ready = _serve(args.timeout)
+        runs.append(Run(imported=imported, serving=serving, ready=ready))
+
+    print(f"{'import':<8} {_format([run.imported for run in runs])}")
+    print(f"{'serving':<8} {_format([run.serving for run in runs])}")
+    print(f"{'ready':<8} {_format([run.ready for run in runs])}")
+
+    if args.profile > 0:
+        print(f"\n{'cumulative':>12} {'self':>9}  module")
+        for cumulative, own, name in _profile(args.profile):
+            print(f"{cumulative * 1000:9.1f} ms {own * 1000:6.1f} ms {name}")
+
+    imported = statistics.median(run.imported for run in runs)
+    if args.budget is not None and imported > args.budget:
+        print(
+            f"\nImporting the app takes {imported * 1000:.1f} ms,"
+            f" over the budget of {args.budget * 1000:.1f} ms."
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
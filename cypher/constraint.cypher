@@ -1,2 +0,0 @@
-CREATE CONSTRAINT unique_ferrea_id
-FOR (l:Library) REQUIRE l.fid IS UNIQUE;
\ No newline at end of file
@@ -0,0 +1,3 @@
+// every library is identified by its fid (the constraint is backed by a range index).
+CREATE CONSTRAINT unique_ferrea_id IF NOT EXISTS
+FOR (l:Library) REQUIRE l.fid IS UNIQUE;
@@ -0,0 +1,3 @@
+// single node holding the version of the libraries collection (for the ETags).
+CREATE CONSTRAINT unique_collection_version IF NOT EXISTS
+FOR (v:CollectionVersion) REQUIRE v.name IS UNIQUE;
@@ -0,0 +1,3 @@
+// nearby and bounding box searches (point.distance, point.withinBBox).
+CREATE POINT INDEX library_location IF NOT EXISTS
+FOR (l:Library) ON (l.location);
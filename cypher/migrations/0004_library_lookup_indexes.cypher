@@ -0,0 +1,7 @@
+// MERGE of the batch upserts, matching on name and address.
+CREATE RANGE INDEX library_name_address IF NOT EXISTS
+FOR (l:Library) ON (l.name, l.address);
+
+// recovery of the libraries still waiting for their location.
+CREATE RANGE INDEX library_location_pending IF NOT EXISTS
+FOR (l:Library) ON (l.location_pending);
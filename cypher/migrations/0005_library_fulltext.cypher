@@ -0,0 +1,3 @@
+// free text search on name and address (GET /api/v1/libraries/search).
+CREATE FULLTEXT INDEX library_search IF NOT EXISTS
+FOR (l:Library) ON EACH [l.name, l.address];
@@ -24,3 +24,11 @@ GRANT ROLE $role TO $user;
 
 // grant the ability to traverse + read all attributes ({*}) to the role (and therefore the user)
 GRANT MATCH {*} ON HOME GRAPH NODES Library TO $role;
+
+// grant the ability to create new labels and property names, that the editor role lacks:
+// the writes introduce them (e.g. location_pending, version, the CollectionVersion node)
+GRANT NAME MANAGEMENT ON HOME DATABASE TO $role;
+
+// grant the ability to apply the schema migrations (cypher/migrations) at startup
+GRANT INDEX MANAGEMENT ON HOME DATABASE TO $role;
+GRANT CONSTRAINT MANAGEMENT ON HOME DATABASE TO $role;
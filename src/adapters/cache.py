@@ -0,0 +1,156 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from threading import Lock
+from typing import Generic, Literal, Protocol, TypeVar
+
+from models.stats import CacheStats
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class Missing(Enum):
+    """Sentinel for a key not found in the cache (None is a legit cached value)."""
+
+    MISSING = auto()
+
+
+MISSING = Missing.MISSING
+
+
+@dataclass
+class LRUCache(Generic[K, V]):
+    """
+    Thread safe, bounded, in-process LRU cache with a per entry time to live.
+
+    Once the cache is full the least recently used entry is evicted.
+    """
+
+    max_size: int
+    ttl: float
+    _entries: OrderedDict[K, tuple[V, float]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+    _hits: int = field(default=0, init=False)
+    _misses: int = field(default=0, init=False)
+    _evictions: int = field(default=0, init=False)
+
+    def get(self, key: K) -> V | Literal[Missing.MISSING]:
+        """
+        Get a value from the cache.
+
+        Args:
+            key (K): the key of the entry.
+
+        Returns:
+            V | Missing: the cached value or MISSING if not found (or expired).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        Store a value in the cache, evicting the least recently used if full.
+
+        Args:
+            key (K): the key of the entry.
+            value (V): the value to store.
+            ttl (float | None, optional): override of the default ttl, in seconds. Defaults to None.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """
+        Remove an entry from the cache, if present.
+
+        Args:
+            key (K): the key of the entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all the entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        """The counters of the cache."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+            )
+
+
+class InvalidationBus(Protocol):
+    """Protocol for a pub/sub channel broadcasting the keys to drop from the caches."""
+
+    def publish(self, key: str) -> None: ...
+
+    def subscribe(self, callback: Callable[[str], None]) -> None: ...
+
+
+@dataclass
+class LocalInvalidationBus:
+    """
+    In-process stand-in of a pub/sub broker (e.g. Redis), matching the InvalidationBus protocol.
+
+    Every published key is delivered synchronously to all the subscribers of this
+    process: it does not cross process boundaries, so it can't keep the caches of
+    pre-forked workers consistent.
+    """
+
+    _subscribers: list[Callable[[str], None]] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def publish(self, key: str) -> None:
+        """
+        Broadcast a key to all the subscribers.
+
+        Args:
+            key (str): the key to invalidate.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(key)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """
+        Register a callback, called with every published key.
+
+        Args:
+            callback (Callable[[str], None]): the callback.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
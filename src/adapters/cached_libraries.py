@@ -0,0 +1,288 @@
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, field
+from threading import Lock
+
+from ferrea.core.context import Context
+
+from adapters.cache import MISSING, InvalidationBus, LRUCache
+from adapters.database import AsyncDBClient
+from configs.config import LibraryCache as LibraryCacheSettings
+from models.geocoding import BoundingBox
+from models.library import BatchItemResult, Library, NearbyLibrary, ScoredLibrary
+from models.repository import AsyncRepositoryService
+from models.stats import CacheStats
+
+# key of the version of the whole collection.
+_COLLECTION = "libraries"
+
+
+@dataclass
+class LibraryCache:
+    """
+    Process wide cache of the libraries, keyed by fid.
+
+    Writes drop the entry from the cache or, if a bus is provided, from all the caches
+    subscribed to it, this one included. The bus is in process: it does not reach
+    the caches of the other processes (e.g. pre-forked workers).
+    Libraries still waiting for their location are never cached, since the
+    background worker is going to change them.
+    The version of the whole collection is cached as well, dropped on every write.
+    """
+
+    settings: LibraryCacheSettings
+    bus: InvalidationBus | None = None
+    _cache: LRUCache[str, Library] = field(init=False, repr=False)
+    _collection_version: LRUCache[str, int] = field(init=False, repr=False)
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+    _generation: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._cache = LRUCache(max_size=self.settings.size, ttl=self.settings.ttl)
+        self._collection_version = LRUCache(
+            max_size=1, ttl=self.settings.collection_version_ttl
+        )
+        if self.bus is not None:
+            self.bus.subscribe(self._drop)
+
+    @property
+    def generation(self) -> int:
+        """Counter increased on every invalidation, to detect the reads racing with a write."""
+        with self._lock:
+            return self._generation
+
+    def get(self, fid: str) -> Library | None:
+        """
+        Get a library from the cache.
+
+        Args:
+            fid (str): the ferreaID of the library.
+
+        Returns:
+            Library | None: the cached library or None if not cached.
+        """
+        library = self._cache.get(fid)
+        return None if library is MISSING else library
+
+    def set(self, fid: str, library: Library, generation: int) -> None:
+        """
+        Store a library read from the db, unless a write happened since the read started.
+
+        Args:
+            fid (str): the ferreaID of the library.
+            library (Library): the library.
+            generation (int): the generation read before querying the db.
+        """
+        if library.location_pending:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(fid, library)
+
+    def get_collection_version(self) -> int | None:
+        """
+        Get the version of the collection from the cache.
+
+        Returns:
+            int | None: the cached version or None if not cached.
+        """
+        version = self._collection_version.get(_COLLECTION)
+        return None if version is MISSING else version
+
+    def set_collection_version(self, version: int, generation: int) -> None:
+        """
+        Store the version of the collection, unless a write happened since the read started.
+
+        Args:
+            version (int): the version of the collection.
+            generation (int): the generation read before querying the db.
+        """
+        with self._lock:
+            if generation == self._generation:
+                self._collection_version.set(_COLLECTION, version)
+
+    def invalidate(self, fid: str) -> None:
+        """
+        Drop a library from this cache, through the bus if any (reaching the others too).
+
+        Args:
+            fid (str): the ferreaID of the library.
+        """
+        if self.bus is None:
+            self._drop(fid)
+        else:
+            self.bus.publish(fid)
+
+    def _drop(self, fid: str) -> None:
+        """Helper method to drop a library from this cache only."""
+        with self._lock:
+            self._generation += 1
+            self._cache.invalidate(fid)
+            self._collection_version.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        """The counters of the cache."""
+        return self._cache.stats
+
+
+@dataclass
+class CachedLibrariesRepository:
+    """
+    Repository matching the AsyncRepositoryService protocol, with a read-through cache
+    in front of the single library lookups of the wrapped repository.
+    """
+
+    repository: AsyncRepositoryService
+    cache: LibraryCache
+
+    @property
+    def db_client(self) -> AbstractAsyncContextManager[AsyncDBClient]:
+        """The db client of the wrapped repository."""
+        return self.repository.db_client
+
+    @property
+    def context(self) -> Context:
+        """The context of the wrapped repository."""
+        return self.repository.context
+
+    async def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
+        """This method lists the libraries through the wrapped repository (no cache)."""
+        return await self.repository.find_all_libraries(
+            after=after, limit=limit, bbox=bbox, fields=fields
+        )
+
+    def iter_all_libraries(self) -> AsyncIterator[Library]:
+        """This method streams the libraries from the wrapped repository (no cache)."""
+        return self.repository.iter_all_libraries()
+
+    async def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
+        """This method finds the nearby libraries through the wrapped repository (no cache)."""
+        return await self.repository.find_nearby_libraries(
+            latitude, longitude, radius, limit
+        )
+
+    async def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        """This method searches the libraries through the wrapped repository (no cache)."""
+        return await self.repository.search_libraries(text, offset, limit)
+
+    async def find_a_library_by_fid(self, fid: str) -> Library:
+        """
+        This method search for the desired library in the cache first, then on the db.
+
+        Args:
+            fid (str): the ferreaID of the object.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the found library.
+        """
+        cached = self.cache.get(fid)
+        if cached is not None:
+            return cached
+
+        generation = self.cache.generation
+        library = await self.repository.find_a_library_by_fid(fid)
+        self.cache.set(fid, library, generation)
+
+        return library
+
+    async def get_collection_version(self) -> int:
+        """
+        This method gets the version of the collection from the cache first, then on the db.
+
+        Returns:
+            int: the version of the collection.
+        """
+        cached = self.cache.get_collection_version()
+        if cached is not None:
+            return cached
+
+        generation = self.cache.generation
+        version = await self.repository.get_collection_version()
+        self.cache.set_collection_version(version, generation)
+
+        return version
+
+    async def create_library(self, data: Library) -> Library:
+        """
+        This method creates a library through the wrapped repository, then invalidates
+        its entry and the version of the collection.
+
+        Args:
+            data (Library): the data of the library to create.
+
+        Returns:
+            Library: the created library.
+        """
+        library = await self.repository.create_library(data)
+        self.cache.invalidate(str(library.fid))
+        return library
+
+    async def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        """
+        This method creates (or updates) many libraries through the wrapped repository,
+        then invalidates the entries of the written ones and the version of the collection.
+
+        Args:
+            libraries (list[Library]): the data of the libraries.
+
+        Returns:
+            list[BatchItemResult]: the outcome of each library, by its position.
+        """
+        results = await self.repository.upsert_libraries(libraries)
+        for result in results:
+            if result.library is not None:
+                self.cache.invalidate(str(result.library.fid))
+        return results
+
+    async def update_library(self, fid: str, new_value: Library) -> Library:
+        """
+        This method updates a library through the wrapped repository, then invalidates
+        its entry and the version of the collection, even if the update failed.
+
+        Args:
+            fid (str): the ferreaID of the object.
+            new_value (Library): the new data of the library.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the updated library.
+        """
+        try:
+            return await self.repository.update_library(fid, new_value)
+        finally:
+            self.cache.invalidate(fid)
+
+    async def delete_library(self, fid: str) -> Library:
+        """
+        This method deletes a library through the wrapped repository, then invalidates
+        its entry and the version of the collection, even if the delete failed.
+
+        Args:
+            fid (str): the ferreaID of the object.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the deleted library.
+        """
+        try:
+            return await self.repository.delete_library(fid)
+        finally:
+            self.cache.invalidate(fid)
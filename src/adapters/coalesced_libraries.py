@@ -0,0 +1,144 @@
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from ferrea.core.context import Context
+
+from adapters.database import AsyncDBClient
+from adapters.metrics import DB_COALESCED_READS, DB_SHARED_READS
+from adapters.single_flight import SingleFlight
+from models.geocoding import BoundingBox
+from models.library import BatchItemResult, Library, NearbyLibrary, ScoredLibrary
+from models.repository import AsyncRepositoryService
+
+T = TypeVar("T")
+
+# the key of a read: the name of the method and its arguments.
+ReadKey = tuple[Any, ...]
+
+
+@dataclass
+class CoalescedLibrariesRepository:
+    """
+    Repository matching the AsyncRepositoryService protocol, coalescing the concurrent
+    identical reads of the wrapped repository: e.g. a popular library requested by many
+    clients at once, after it expired from the cache, is read from the db just once.
+
+    The flights are process wide, shared by the repositories of all the requests.
+    Writes stop sharing the reads in flight, which may have started before them.
+    """
+
+    repository: AsyncRepositoryService
+    flights: SingleFlight[ReadKey]
+
+    @property
+    def db_client(self) -> AbstractAsyncContextManager[AsyncDBClient]:
+        """The db client of the wrapped repository."""
+        return self.repository.db_client
+
+    @property
+    def context(self) -> Context:
+        """The context of the wrapped repository."""
+        return self.repository.context
+
+    async def _read(self, key: ReadKey, call: Callable[[], Awaitable[T]]) -> T:
+        """Helper method to share a read in flight, counting the db calls saved."""
+        method = key[0]
+        if self.flights.in_flight(key):
+            DB_SHARED_READS.inc(method)
+        else:
+            DB_COALESCED_READS.inc(method)
+        return await self.flights.do(key, call)
+
+    async def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
+        """This method lists the libraries, sharing the identical pages in flight."""
+        return await self._read(
+            ("find_all_libraries", after, limit, bbox, fields),
+            lambda: self.repository.find_all_libraries(
+                after=after, limit=limit, bbox=bbox, fields=fields
+            ),
+        )
+
+    def iter_all_libraries(self) -> AsyncIterator[Library]:
+        """This method streams the libraries from the wrapped repository (not coalesced)."""
+        return self.repository.iter_all_libraries()
+
+    async def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
+        """This method finds the nearby libraries, sharing the identical reads in flight."""
+        return await self._read(
+            ("find_nearby_libraries", latitude, longitude, radius, limit),
+            lambda: self.repository.find_nearby_libraries(
+                latitude, longitude, radius, limit
+            ),
+        )
+
+    async def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        """This method searches the libraries, sharing the identical searches in flight."""
+        return await self._read(
+            ("search_libraries", text, offset, limit),
+            lambda: self.repository.search_libraries(text, offset, limit),
+        )
+
+    async def find_a_library_by_fid(self, fid: str) -> Library:
+        """
+        This method searches for a library, sharing the lookups of the same fid in flight
+        (their exception too, e.g. if the library does not exist).
+
+        Args:
+            fid (str): the ferreaID of the object.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the found library.
+        """
+        return await self._read(
+            ("find_a_library_by_fid", fid),
+            lambda: self.repository.find_a_library_by_fid(fid),
+        )
+
+    async def get_collection_version(self) -> int:
+        """This method gets the version of the collection, sharing the reads in flight."""
+        return await self._read(
+            ("get_collection_version",), self.repository.get_collection_version
+        )
+
+    async def create_library(self, data: Library) -> Library:
+        """This method creates a library, then stops sharing the reads in flight."""
+        try:
+            return await self.repository.create_library(data)
+        finally:
+            self.flights.clear()
+
+    async def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        """This method creates (or updates) many libraries, then stops sharing the reads."""
+        try:
+            return await self.repository.upsert_libraries(libraries)
+        finally:
+            self.flights.clear()
+
+    async def update_library(self, fid: str, new_value: Library) -> Library:
+        """This method updates a library, then stops sharing the reads in flight."""
+        try:
+            return await self.repository.update_library(fid, new_value)
+        finally:
+            self.flights.clear()
+
+    async def delete_library(self, fid: str) -> Library:
+        """This method deletes a library, then stops sharing the reads in flight."""
+        try:
+            return await self.repository.delete_library(fid)
+        finally:
+            self.flights.clear()
@@ -0,0 +1,212 @@
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Any, Protocol, Self
+
+from neo4j import (
+    AsyncDriver,
+    AsyncGraphDatabase,
+    AsyncManagedTransaction,
+    AsyncSession,
+    Record,
+)
+
+from configs.config import Database
+
+Neo4jParameters = dict[str, Any]
+
+
+async def _fetch_all(
+    tx: AsyncManagedTransaction, query: str, params: Neo4jParameters
+) -> list[Record]:
+    """Helper function to consume the whole result inside the transaction."""
+    result = await tx.run(query, params)
+    return [record async for record in result]
+
+
+async def _fetch_plan(
+    tx: AsyncManagedTransaction, query: str, params: Neo4jParameters, profile: bool
+) -> dict[str, Any] | None:
+    """Helper function to get the plan of a query (PROFILE runs it, EXPLAIN does not)."""
+    result = await tx.run(f"{'PROFILE' if profile else 'EXPLAIN'} {query}", params)
+    summary = await result.consume()
+    return summary.profile if profile else summary.plan
+
+
+class AsyncDBClient(Protocol):
+    """Protocol for an async client of the db (the async version of ferrea DBClient)."""
+
+    async def read(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> list[Record]: ...
+
+    async def write(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> list[Record]: ...
+
+    def stream(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> AsyncIterator[Record]: ...
+
+    async def verify_connectivity(self) -> bool: ...
+
+
+@dataclass
+class AsyncNeo4jSession:
+    """
+    Client matching the AsyncDBClient protocol, borrowing its connection from a shared driver.
+
+    Entering the context manager opens a session on the driver pool, exiting it
+    gives the connection back to the pool (the driver itself is never closed here).
+    """
+
+    driver: AsyncDriver
+    database: str | None = None
+    _session: AsyncSession | None = field(default=None, init=False, repr=False)
+
+    async def __aenter__(self) -> Self:
+        self._session = self.driver.session(database=self.database)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def _active_session(self) -> AsyncSession:
+        """Helper property for the session opened by the context manager."""
+        if self._session is None:
+            raise RuntimeError("The session must be used as an async context manager.")
+        return self._session
+
+    async def read(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> list[Record]:
+        """
+        Run a query inside a read transaction.
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+
+        Returns:
+            list[Record]: the records returned by the query.
+        """
+        return await self._active_session.execute_read(_fetch_all, query, params or {})
+
+    async def write(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> list[Record]:
+        """
+        Run a query inside a write transaction.
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+
+        Returns:
+            list[Record]: the records returned by the query.
+        """
+        return await self._active_session.execute_write(_fetch_all, query, params or {})
+
+    async def stream(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> AsyncIterator[Record]:
+        """
+        Run a query inside a transaction, yielding the records while they are fetched.
+        The transaction stays open until the iterator is exhausted (or closed).
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+
+        Yields:
+            AsyncIterator[Record]: the records returned by the query.
+        """
+        async with await self._active_session.begin_transaction() as tx:
+            result = await tx.run(query, params or {})
+            async for record in result:
+                yield record
+
+    async def plan(
+        self,
+        query: str,
+        params: Neo4jParameters | None = None,
+        profile: bool = False,
+        write: bool = False,
+    ) -> dict[str, Any] | None:
+        """
+        Get the execution plan of a query.
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+            profile (bool, optional): PROFILE the query, running it again, instead of
+                just EXPLAIN it. Defaults to False.
+            write (bool, optional): whether the query writes (it's planned in a write
+                transaction). Defaults to False.
+
+        Returns:
+            dict[str, Any] | None: the plan, as returned by the db.
+        """
+        execute = (
+            self._active_session.execute_write
+            if write
+            else self._active_session.execute_read
+        )
+        return await execute(_fetch_plan, query, params or {}, profile)
+
+    async def verify_connectivity(self) -> bool:
+        """
+        Verify that the driver is able to reach the database.
+
+        Returns:
+            bool: True if the database is reachable (raises otherwise).
+        """
+        await self.driver.verify_connectivity()
+        return True
+
+
+@dataclass
+class AsyncNeo4jPool:
+    """
+    Process wide async Neo4j driver, owning the connection pool.
+
+    It's meant to be created once (by the app lifespan) and closed on shutdown.
+    """
+
+    settings: Database
+    _driver: AsyncDriver = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._driver = AsyncGraphDatabase.driver(
+            self.settings.uri,
+            auth=(self.settings.username, self.settings.password),
+            max_connection_pool_size=self.settings.max_connection_pool_size,
+            connection_acquisition_timeout=self.settings.connection_acquisition_timeout,
+            max_connection_lifetime=self.settings.max_connection_lifetime,
+        )
+
+    @property
+    def driver(self) -> AsyncDriver:
+        """The shared driver."""
+        return self._driver
+
+    def session(self) -> AsyncNeo4jSession:
+        """
+        Build a client that borrows its connections from the shared pool.
+
+        Returns:
+            AsyncNeo4jSession: the client.
+        """
+        return AsyncNeo4jSession(driver=self._driver, database=self.settings.database)
+
+    async def close(self) -> None:
+        """Close the driver and all the pooled connections."""
+        await self._driver.close()
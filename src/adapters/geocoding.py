@@ -0,0 +1,325 @@
+import asyncio
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from functools import cache
+from threading import Lock
+from typing import TYPE_CHECKING, Literal
+
+from ferrea.observability.logs import ferrea_logger
+
+from adapters.cache import MISSING, LRUCache, Missing
+from adapters.metrics import GEOCODER_REQUEST_DURATION
+from configs.config import Geocoding, settings
+from models.exceptions import FerreaGeocodingError
+from models.geocoding import Coordinates
+from models.stats import GeocodingStats
+
+if TYPE_CHECKING:
+    import geopy
+
+_WHITESPACES = re.compile(r"\s+")
+_SEPARATORS = re.compile(r"\s*,\s*")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Normalize an address, so that trivially different spellings share the same cache key.
+
+    Args:
+        address (str): the address as provided by the user.
+
+    Returns:
+        str: the normalized address.
+    """
+    address = _WHITESPACES.sub(" ", address.casefold()).strip()
+    return _SEPARATORS.sub(", ", address).strip(", ")
+
+
+@dataclass
+class SqliteGeocodingStore:
+    """
+    Persistent tier of the geocoding cache.
+
+    The SQLite database (in WAL mode) survives restarts and is shared by all the
+    workers running on the same host.
+    Negative results are stored with null coordinates.
+    """
+
+    path: str
+    _connection: sqlite3.Connection = field(init=False, repr=False)
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._connection = sqlite3.connect(
+            self.path,
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS geocoding (
+                    address TEXT PRIMARY KEY,
+                    latitude REAL,
+                    longitude REAL,
+                    expires_at REAL NOT NULL
+                )
+                """)
+
+    def get(self, address: str) -> Coordinates | None | Literal[Missing.MISSING]:
+        """
+        Get the stored coordinates of a normalized address.
+
+        Args:
+            address (str): the normalized address.
+
+        Returns:
+            Coordinates | None | Missing: the coordinates, None for a negative result
+                or MISSING if not stored (or expired).
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT latitude, longitude, expires_at FROM geocoding WHERE address = ?",
+                (address,),
+            ).fetchone()
+
+        if row is None or row[2] <= time.time():
+            return MISSING
+        if row[0] is None or row[1] is None:
+            return None
+        return Coordinates(latitude=row[0], longitude=row[1])
+
+    def set(self, address: str, coordinates: Coordinates | None, ttl: float) -> None:
+        """
+        Store the coordinates of a normalized address.
+
+        Args:
+            address (str): the normalized address.
+            coordinates (Coordinates | None): the coordinates, None for a negative result.
+            ttl (float): the time to live of the entry, in seconds.
+        """
+        latitude = coordinates.latitude if coordinates is not None else None
+        longitude = coordinates.longitude if coordinates is not None else None
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO geocoding VALUES (?, ?, ?, ?)",
+                (address, latitude, longitude, time.time() + ttl),
+            )
+
+
+@dataclass
+class CachedGeocoder:
+    """
+    Geocoder with a two levels cache in front of Nominatim.
+
+    Lookups go through an in-process LRU cache first, then through the on-disk
+    store and only on a miss of both reach Nominatim.
+    Addresses that cannot be geocoded are cached as well (with a shorter ttl).
+    """
+
+    settings: Geocoding
+    _memory: LRUCache[str, Coordinates | None] = field(init=False, repr=False)
+    _disk: SqliteGeocodingStore | None = field(default=None, init=False, repr=False)
+    _nominatim: "geopy.Nominatim | None" = field(default=None, init=False, repr=False)
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+    _disk_hits: int = field(default=0, init=False)
+    _disk_misses: int = field(default=0, init=False)
+    _negative_hits: int = field(default=0, init=False)
+    _upstream_calls: int = field(default=0, init=False)
+    _upstream_errors: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self._memory = LRUCache(
+            max_size=self.settings.cache_size,
+            ttl=self.settings.cache_ttl,
+        )
+        if self.settings.cache_path is not None:
+            self._disk = SqliteGeocodingStore(self.settings.cache_path)
+
+    @property
+    def _geolocator(self) -> "geopy.Nominatim":
+        """
+        Integrated geolocator for geopy, built only once.
+        geopy is imported here, on the first miss of both caches, not to slow the startup.
+        """
+        if self._nominatim is None:
+            import geopy
+
+            self._nominatim = geopy.Nominatim(user_agent=self.settings.user_agent)
+        return self._nominatim
+
+    def _ttl(self, coordinates: Coordinates | None) -> float:
+        """Helper method for the ttl of an entry, shorter for negative results."""
+        if coordinates is None:
+            return self.settings.negative_cache_ttl
+        return self.settings.cache_ttl
+
+    def _count(self, counter: str) -> None:
+        """Helper method to increase a counter."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def peek(self, address: str) -> Coordinates | None | Literal[Missing.MISSING]:
+        """
+        Find the coordinates of an address only through the caches (Nominatim is never called).
+
+        Args:
+            address (str): the address to geocode.
+
+        Returns:
+            Coordinates | None | Missing: the coordinates, None if the address cannot be found
+                or MISSING if the address is not cached.
+        """
+        key = normalize_address(address)
+
+        cached = self._memory.get(key)
+        if cached is not MISSING:
+            if cached is None:
+                self._count("_negative_hits")
+            return cached
+
+        if self._disk is not None:
+            stored = self._disk.get(key)
+            if stored is not MISSING:
+                self._count("_disk_hits")
+                if stored is None:
+                    self._count("_negative_hits")
+                self._memory.set(key, stored, ttl=self._ttl(stored))
+                return stored
+            self._count("_disk_misses")
+
+        return MISSING
+
+    def geocode(self, address: str) -> Coordinates | None:
+        """
+        Find the coordinates of an address.
+
+        Args:
+            address (str): the address to geocode.
+
+        Returns:
+            Coordinates | None: the coordinates or None if the address cannot be found.
+        """
+        cached = self.peek(address)
+        if cached is not MISSING:
+            return cached
+
+        return self._geocode_uncached(address)
+
+    def _geocode_uncached(self, address: str) -> Coordinates | None:
+        """
+        Helper method to geocode an address on Nominatim, storing it in both caches.
+        Only for the callers that already peeked: each lookup is counted once by the caches.
+        """
+        key = normalize_address(address)
+        coordinates = self._lookup(address)
+        self._memory.set(key, coordinates, ttl=self._ttl(coordinates))
+        if self._disk is not None:
+            self._disk.set(key, coordinates, ttl=self._ttl(coordinates))
+
+        return coordinates
+
+    def _lookup(self, address: str) -> Coordinates | None:
+        """Helper method to query Nominatim."""
+        self._count("_upstream_calls")
+        started = time.perf_counter()
+        try:
+            location = self._geolocator.geocode(address)
+        except Exception as e:
+            self._count("_upstream_errors")
+            raise FerreaGeocodingError(
+                f"Unable to geocode address {address} due to {e}."
+            ) from e
+        finally:
+            GEOCODER_REQUEST_DURATION.observe(time.perf_counter() - started)
+
+        if location is None:
+            ferrea_logger.warning(f"Unable to geocode address {address}.")
+            return None
+        return Coordinates(latitude=location.latitude, longitude=location.longitude)  # type: ignore
+
+    @property
+    def stats(self) -> GeocodingStats:
+        """The counters of the geocoder and its caches."""
+        with self._lock:
+            return GeocodingStats(
+                memory=self._memory.stats,
+                disk_hits=self._disk_hits,
+                disk_misses=self._disk_misses,
+                negative_hits=self._negative_hits,
+                upstream_calls=self._upstream_calls,
+                upstream_errors=self._upstream_errors,
+            )
+
+
+@dataclass
+class AsyncGeocoder:
+    """
+    Async adapter of the CachedGeocoder, for the event loop.
+
+    Cache lookups are served inline, while the blocking calls to Nominatim are
+    offloaded to a thread, so that they never stall the event loop.
+    """
+
+    geocoder: CachedGeocoder
+
+    def peek(self, address: str) -> Coordinates | None | Literal[Missing.MISSING]:
+        """
+        Find the coordinates of an address only through the caches (Nominatim is never called).
+
+        Args:
+            address (str): the address to geocode.
+
+        Returns:
+            Coordinates | None | Missing: the coordinates, None if the address cannot be found
+                or MISSING if the address is not cached.
+        """
+        return self.geocoder.peek(address)
+
+    async def geocode(self, address: str) -> Coordinates | None:
+        """
+        Find the coordinates of an address.
+
+        Args:
+            address (str): the address to geocode.
+
+        Returns:
+            Coordinates | None: the coordinates or None if the address cannot be found.
+        """
+        cached = self.geocoder.peek(address)
+        if cached is not MISSING:
+            return cached
+
+        return await self.geocode_uncached(address)
+
+    async def geocode_uncached(self, address: str) -> Coordinates | None:
+        """
+        Find the coordinates of an address on Nominatim, skipping the caches (they
+        store the result): for the callers that already peeked, not to count a miss twice.
+
+        Args:
+            address (str): the address to geocode.
+
+        Returns:
+            Coordinates | None: the coordinates or None if the address cannot be found.
+        """
+        return await asyncio.to_thread(self.geocoder._geocode_uncached, address)
+
+    @property
+    def stats(self) -> GeocodingStats:
+        """The counters of the geocoder and its caches."""
+        return self.geocoder.stats
+
+
+@cache
+def get_geocoder() -> AsyncGeocoder:
+    """
+    Get the process wide geocoder, so that its caches are shared among requests.
+
+    Returns:
+        AsyncGeocoder: the geocoder.
+    """
+    return AsyncGeocoder(CachedGeocoder(settings.geocoding))
@@ -0,0 +1,296 @@
+import asyncio
+import heapq
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, field
+from typing import Literal
+
+from ferrea.observability.logs import ferrea_logger
+
+from adapters.cache import MISSING, InvalidationBus, Missing
+from adapters.database import AsyncDBClient
+from adapters.geocoding import AsyncGeocoder
+from configs.config import Geocoding
+from models.exceptions import FerreaGeocodingError
+from models.geocoding import Coordinates
+from models.stats import GeocodingQueueStats
+
+_PENDING_LIBRARIES_QUERY = """//cypher
+    MATCH (l:Library) WHERE l.location_pending = true RETURN l.fid, l.address
+"""
+
+# the match on the address skips stale jobs, if the address changed in the meantime.
+# as every other write, it bumps the versions of the libraries and of their collection.
+_SET_LOCATIONS_QUERY = """//cypher
+    UNWIND $rows AS row
+    MATCH (l:Library {fid: row.fid}) WHERE l.address = row.address
+    SET l.location = point({latitude: row.latitude, longitude: row.longitude}),
+    l.location_pending = false, l.version = coalesce(l.version, 0) + 1
+    WITH count(l) AS written WHERE written > 0
+    MERGE (v:CollectionVersion {name: 'Library'})
+    SET v.version = coalesce(v.version, 0) + 1
+"""
+
+
+@dataclass(order=True)
+class GeocodingJob:
+    """A library waiting for its location. Jobs are ordered by when they are due."""
+
+    not_before: float
+    fid: str = field(compare=False)
+    address: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+@dataclass
+class GeocodingWorker:
+    """
+    Background task that fills in the location of the libraries saved as pending.
+
+    Calls to Nominatim are rate limited, the locations are written on the db in
+    batches and failed jobs are retried with an exponential backoff.
+    The libraries written are published on the bus, if any, to drop them from the caches.
+    The libraries left pending on the db (e.g. by a restart, or by the deferred workers of
+    the other processes) are looked up at start and then every recover_interval.
+    A deferred worker does nothing: its libraries stay pending, for the worker of another
+    process to pick them up.
+    The worker runs on the event loop that starts it: enqueue must be called from that loop.
+    """
+
+    settings: Geocoding
+    geocoder: AsyncGeocoder
+    db_client_factory: Callable[[], AbstractAsyncContextManager[AsyncDBClient]]
+    bus: InvalidationBus | None = None
+    _queue: list[GeocodingJob] = field(default_factory=list, init=False, repr=False)
+    _wakeup: asyncio.Event = field(
+        default_factory=asyncio.Event, init=False, repr=False
+    )
+    _stopping: bool = field(default=False, init=False, repr=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False, repr=False)
+    _next_upstream_call: float = field(default=0.0, init=False, repr=False)
+    # the fid and address of the jobs queued or being processed, not to enqueue them twice.
+    _queued: set[tuple[str, str]] = field(default_factory=set, init=False, repr=False)
+    _processed: int = field(default=0, init=False)
+    _retried: int = field(default=0, init=False)
+    _failed: int = field(default=0, init=False)
+    _last_lag: float = field(default=0.0, init=False)
+
+    def start(self) -> None:
+        """Start the worker task on the running event loop (unless deferred)."""
+        if self.settings.deferred:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="geocoding-worker")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the worker task. Jobs still queued are recovered on the next start.
+
+        Args:
+            timeout (float, optional): how long to wait for the task, in seconds. Defaults to 5.0.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except TimeoutError:
+                ferrea_logger.warning("Geocoding worker cancelled on shutdown.")
+            except Exception as e:
+                # not raised: the shutdown of the other resources goes on.
+                ferrea_logger.exception(f"Geocoding worker failed: {e}.")
+            self._task = None
+
+    def enqueue(self, fid: str, address: str) -> None:
+        """
+        Schedule the geocoding of a library, unless already scheduled or deferred.
+
+        Args:
+            fid (str): the ferreaID of the library.
+            address (str): the address to geocode.
+        """
+        if self.settings.deferred or (fid, address) in self._queued:
+            return
+        self._queued.add((fid, address))
+        now = time.monotonic()
+        self._push(
+            GeocodingJob(not_before=now, fid=fid, address=address, enqueued_at=now)
+        )
+
+    @property
+    def stats(self) -> GeocodingQueueStats:
+        """The counters of the worker."""
+        now = time.monotonic()
+        oldest = min((job.enqueued_at for job in self._queue), default=now)
+
+        return GeocodingQueueStats(
+            depth=len(self._queue),
+            oldest_job_age=now - oldest,
+            last_lag=self._last_lag,
+            processed=self._processed,
+            retried=self._retried,
+            failed=self._failed,
+        )
+
+    def _push(self, job: GeocodingJob) -> None:
+        """Helper method to add a job to the queue."""
+        heapq.heappush(self._queue, job)
+        self._wakeup.set()
+
+    async def _recover_pending(self) -> None:
+        """Helper method to enqueue the libraries left pending (e.g. by a restart)."""
+        try:
+            async with self.db_client_factory() as session:
+                pending = await session.read(_PENDING_LIBRARIES_QUERY)
+        except Exception as e:
+            # the worker goes on: the recovery is tried again on the next interval.
+            ferrea_logger.exception(
+                f"Unable to recover the pending libraries due to {e}."
+            )
+            return
+
+        for fid, address in pending:
+            self.enqueue(fid, address)
+
+    async def _next_job(self, timeout: float) -> GeocodingJob | None:
+        """Helper method to wait (up to timeout seconds) for a job due to be processed."""
+        deadline = time.monotonic() + timeout
+        while not self._stopping:
+            now = time.monotonic()
+            if self._queue and self._queue[0].not_before <= now:
+                return heapq.heappop(self._queue)
+            if now >= deadline:
+                return None
+
+            wait = deadline - now
+            if self._queue:
+                wait = min(wait, self._queue[0].not_before - now)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except TimeoutError:
+                pass
+
+        return None
+
+    async def _run(self) -> None:
+        """Main loop of the worker: collect a batch of locations, then write it."""
+        await self._recover_pending()
+        recover_at = time.monotonic() + self.settings.recover_interval
+
+        while not self._stopping:
+            if 0 < self.settings.recover_interval and recover_at <= time.monotonic():
+                await self._recover_pending()
+                recover_at = time.monotonic() + self.settings.recover_interval
+
+            job = await self._next_job(timeout=self.settings.flush_interval)
+            if job is None:
+                continue
+
+            batch: list[tuple[GeocodingJob, Coordinates | None]] = []
+            flush_at = time.monotonic() + self.settings.flush_interval
+            while job is not None:
+                location = await self._geocode(job)
+                if location is not MISSING:
+                    batch.append((job, location))
+                if len(batch) >= self.settings.batch_size:
+                    break
+                job = await self._next_job(
+                    timeout=max(0.0, flush_at - time.monotonic())
+                )
+
+            await self._flush(batch)
+
+    async def _throttle(self) -> None:
+        """Helper method to respect the rate limit of Nominatim."""
+        wait = self._next_upstream_call - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._next_upstream_call = time.monotonic() + 1.0 / self.settings.rate_limit
+
+    async def _geocode(
+        self, job: GeocodingJob
+    ) -> Coordinates | None | Literal[Missing.MISSING]:
+        """
+        Helper method to geocode a job. Returns MISSING if the job is rescheduled,
+        or left pending for the recovery.
+        """
+        try:
+            cached = self.geocoder.peek(job.address)
+            if cached is not MISSING:
+                return cached
+
+            await self._throttle()
+            return await self.geocoder.geocode_uncached(job.address)
+        except FerreaGeocodingError as e:
+            ferrea_logger.warning(f"Unable to geocode library {job.fid} due to {e}.")
+            if self._retry(job):
+                return MISSING
+            # give up: the library is saved without location.
+            return None
+        except Exception as e:
+            # e.g. the sqlite cache is locked: the worker goes on with the other jobs.
+            ferrea_logger.exception(
+                f"Unexpected error geocoding library {job.fid}: {e}."
+            )
+            # on give up, the library stays pending: the recovery enqueues it again.
+            self._retry(job)
+            return MISSING
+
+    def _retry(self, job: GeocodingJob) -> bool:
+        """Helper method to reschedule a job with backoff. Returns False if it has to give up."""
+        job.attempts += 1
+        if job.attempts >= self.settings.max_attempts:
+            ferrea_logger.error(
+                f"Giving up on geocoding library {job.fid} after {job.attempts} attempts."
+            )
+            self._failed += 1
+            self._queued.discard((job.fid, job.address))
+            return False
+
+        delay = min(
+            self.settings.backoff * 2 ** (job.attempts - 1),
+            self.settings.max_backoff,
+        )
+        job.not_before = time.monotonic() + delay
+        self._retried += 1
+        self._push(job)
+        return True
+
+    async def _flush(
+        self, batch: list[tuple[GeocodingJob, Coordinates | None]]
+    ) -> None:
+        """Helper method to write a batch of locations in a single transaction."""
+        if len(batch) == 0:
+            return
+
+        rows = [
+            {
+                "fid": job.fid,
+                "address": job.address,
+                "latitude": location.latitude if location is not None else None,
+                "longitude": location.longitude if location is not None else None,
+            }
+            for job, location in batch
+        ]
+        try:
+            async with self.db_client_factory() as session:
+                await session.write(_SET_LOCATIONS_QUERY, {"rows": rows})
+        except Exception as e:
+            ferrea_logger.exception(
+                f"Unable to write {len(rows)} locations due to {e}."
+            )
+            for job, _ in batch:
+                self._retry(job)
+            return
+
+        if self.bus is not None:
+            for job, _ in batch:
+                self.bus.publish(job.fid)
+
+        for job, _ in batch:
+            self._queued.discard((job.fid, job.address))
+        self._processed += len(batch)
+        self._last_lag = time.monotonic() - min(job.enqueued_at for job, _ in batch)
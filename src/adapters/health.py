@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, field
+
+from ferrea.observability.logs import ferrea_logger
+from neo4j.exceptions import DriverError, Neo4jError
+
+from adapters.database import AsyncDBClient
+from configs.config import HealthCheck
+from models.probes import DatabaseHealth
+
+_PING_QUERY = """//cypher
+    RETURN 1
+"""
+
+
+@dataclass
+class DatabaseHealthChecker:
+    """
+    Background task checking the db on an interval, through the shared driver.
+
+    Probes read the snapshot of the last check instead of reaching the db themselves,
+    so that they're cheap and never stuck on a slow db.
+    After the first successful check the pool is warmed, opening a few connections:
+    only then the checker is ready.
+    """
+
+    settings: HealthCheck
+    db_client_factory: Callable[[], AbstractAsyncContextManager[AsyncDBClient]]
+    _task: asyncio.Task[None] | None = field(default=None, init=False, repr=False)
+    _healthy: bool = field(default=False, init=False)
+    _ready: bool = field(default=False, init=False)
+    _latency: float | None = field(default=None, init=False)
+    _checked_at: float | None = field(default=None, init=False)
+
+    def start(self) -> None:
+        """Start the checker task on the running event loop."""
+        self._task = asyncio.create_task(self._run(), name="db-health-checker")
+
+    async def stop(self) -> None:
+        """Stop the checker task, even in the middle of a check."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def snapshot(self) -> DatabaseHealth:
+        """The outcome of the last check (a stale one counts as unhealthy)."""
+        age = (
+            time.monotonic() - self._checked_at
+            if self._checked_at is not None
+            else None
+        )
+        fresh = age is not None and age <= self.settings.max_age
+
+        return DatabaseHealth(
+            healthy=self._healthy and fresh,
+            ready=self._ready,
+            latency=self._latency,
+            age=age,
+        )
+
+    async def check(self) -> bool:
+        """
+        Check the db once, updating the snapshot (and warming the pool, if not yet).
+
+        Returns:
+            bool: True if the db is reachable.
+        """
+        started = time.monotonic()
+        try:
+            async with self.db_client_factory() as session:
+                await asyncio.wait_for(
+                    session.verify_connectivity(), self.settings.timeout
+                )
+            healthy = True
+        # timeouts and connection errors are OSErrors.
+        except (Neo4jError, DriverError, OSError) as e:
+            ferrea_logger.error(f"Unable to connect to db due to {e}.")
+            healthy = False
+
+        self._checked_at = time.monotonic()
+        self._latency = self._checked_at - started
+        self._healthy = healthy
+
+        if healthy and not self._ready:
+            self._ready = await self._warm_pool()
+        return healthy
+
+    async def _warm_pool(self) -> bool:
+        """Helper method to open some connections at once, so that they're pooled."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(self._ping() for _ in range(self.settings.warm_connections))
+                ),
+                self.settings.timeout,
+            )
+        except (Neo4jError, DriverError, OSError) as e:
+            ferrea_logger.warning(f"Unable to warm the db pool due to {e}.")
+            return False
+        return True
+
+    async def _ping(self) -> None:
+        """Helper method to run a trivial query on a connection of its own."""
+        async with self.db_client_factory() as session:
+            await session.read(_PING_QUERY)
+
+    async def _run(self) -> None:
+        """Main loop of the checker."""
+        while True:
+            await self.check()
+            await asyncio.sleep(self.settings.interval)
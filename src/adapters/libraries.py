@@ -1,16 +1,36 @@
-from dataclasses import dataclass
-from typing import Any, ContextManager
+import re
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, field
+from typing import Any
 
-import geopy
-from ferrea.clients.db import DBClient
 from ferrea.core.context import Context
 from ferrea.observability.logs import ferrea_logger
+from neo4j.exceptions import DriverError, Neo4jError
 from neo4j.spatial import Point
 
+from adapters.cache import MISSING
+from adapters.database import AsyncDBClient
+from adapters.geocoding import AsyncGeocoder, get_geocoder, normalize_address
+from adapters.geocoding_worker import GeocodingWorker
+from adapters.metrics import DB_QUERY_DURATION, timed
 from models.exceptions import FerreaLibraryNotCreated, FerreaNonExistingLibrary
-from models.library import Library
+from models.geocoding import BoundingBox, Coordinates
+from models.library import (
+    BatchItemResult,
+    BatchStatus,
+    Library,
+    NearbyLibrary,
+    ScoredLibrary,
+)
 
-Neo4jParameter = dict[str, str | int | float]
+Neo4jParameter = dict[str, str | int | float | bool | None]
+
+# libraries written in a single transaction by upsert_libraries.
+UPSERT_CHUNK_SIZE = 250
+
+# words of a search: no lucene syntax is passed through from the user.
+_SEARCH_TERMS = re.compile(r"\w+")
 
 
 @dataclass
@@ -21,44 +41,196 @@ class LibrariesRepository:
         _type_: the repository class.
     """
 
-    db_client: ContextManager[DBClient]
+    db_client: AbstractAsyncContextManager[AsyncDBClient]
     context: Context
+    geocoding_worker: GeocodingWorker | None = field(default=None, kw_only=True)
 
     def _build_library(self, raw_library: dict[str, Any]) -> Library:
-        """Helper method to build a serialized version."""
+        """
+        Helper method to build a serialized version.
+        Nodes were validated when written, so they are not validated again.
+        """
+        return Library.from_trusted(self._flatten_location(raw_library))
+
+    def _projection(self, fields: frozenset[str]) -> str:
+        """
+        Helper method for the map projection of some fields of the library.
+        The fid is always there (it's the cursor), latitude and longitude come from the location.
+        """
+        properties = sorted((fields | {"fid"}) - {"latitude", "longitude"})
+        if fields & {"latitude", "longitude"}:
+            properties.append("location")
+
+        # the fields are checked against the model: they're safe to interpolate.
+        return f"l {{{', '.join(f'.{x}' for x in properties)}}}"
+
+    def _flatten_location(self, raw_library: dict[str, Any]) -> dict[str, Any]:
+        """Helper method to turn the location point into latitude and longitude."""
+        point: Point | None = raw_library.get("location")
+        if point is not None:
+            raw_library["longitude"] = point.x
+            raw_library["latitude"] = point.y
+
+        return raw_library
+
+    @timed(DB_QUERY_DURATION)
+    async def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
+        """
+        This method gets all libraries on the db, ordered by their fid.
+        Filters and limit are pushed down to the db, so that it can seek the indexes.
+        The fields are a map projection: the db sends only the requested properties.
+
+        Args:
+            after (str | None, optional): only the libraries with a greater fid. Defaults to None.
+            limit (int | None, optional): the maximum number of libraries. Defaults to None.
+            bbox (BoundingBox | None, optional): only the libraries inside the box. Defaults to None.
+            fields (frozenset[str] | None, optional): only these properties are read
+                (plus the fid), the others are left to their default. Defaults to None (all).
+
+        Returns:
+            list[Library]: the list of all Libraries.
+        """
+        params: Neo4jParameter = {"after": after, "limit": limit}
+        # a predicate on the fid, even on the first page, lets the planner seek the fid
+        # index in order: no sort of the whole label before the limit.
+        filters = ["l.fid > $after" if after is not None else "l.fid IS NOT NULL"]
+        if bbox is not None:
+            # range scan on the point index on the location.
+            filters.append(
+                "point.withinBBox(l.location, "
+                "point({longitude: $min_longitude, latitude: $min_latitude}), "
+                "point({longitude: $max_longitude, latitude: $max_latitude}))"
+            )
+            params.update(bbox.model_dump())
+        where = f"WHERE {' AND '.join(filters)}"
+        paginate = "LIMIT $limit" if limit is not None else ""
+        projection = self._projection(fields) if fields is not None else "l"
+        query = f"""//cypher
+            MATCH (l:Library) {where}
+            RETURN {projection} ORDER BY l.fid {paginate}
+        """
+
+        async with self.db_client as session:
+            libraries_raw = await session.read(query, params)
+
+        libraries = [self._build_library(dict(x[0].items())) for x in libraries_raw]
         ferrea_logger.debug(
-            f"Retrieved library: {raw_library['name']}, fid {raw_library['fid']}.",
-            **self.context.log,
+            f"Retrieved {len(libraries)} libraries.", **self.context.log
         )
 
-        point: Point = raw_library["location"]
-        raw_library["longitude"] = point.x
-        raw_library["latitude"] = point.y
+        return libraries
+
+    @timed(DB_QUERY_DURATION)
+    async def iter_all_libraries(self) -> AsyncIterator[Library]:
+        """
+        This method streams all libraries on the db, ordered by their fid.
+        Libraries are yielded while the records are fetched, without loading all of them.
+
+        Yields:
+            AsyncIterator[Library]: the libraries.
+        """
+        # as for the pages, the predicate on the fid makes the order come from the index:
+        # the records stream at once, instead of after a sort of the whole label.
+        query = """//cypher
+            MATCH (l:Library) WHERE l.fid IS NOT NULL RETURN l ORDER BY l.fid
+        """
 
-        return Library(**raw_library)
+        async with self.db_client as session:
+            async for record in session.stream(query):
+                yield self._build_library(dict(record[0].items()))
 
-    def find_all_libraries(self) -> list[Library]:
+    @timed(DB_QUERY_DURATION)
+    async def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
         """
-        This method gets all libraries on the db.
+        This method gets the libraries within a radius from a point, the nearest first.
+        The distance filter is served by the point index on the location.
+
+        Args:
+            latitude (float): the latitude of the point.
+            longitude (float): the longitude of the point.
+            radius (float): the maximum distance from the point, in meters.
+            limit (int): the maximum number of libraries.
 
         Returns:
-            list[Library]: the list of all Libraries.
+            list[NearbyLibrary]: the libraries, ordered by distance.
         """
         query = """//cypher
-            MATCH (l:Library) return l
+            WITH point({latitude: $latitude, longitude: $longitude}) AS origin
+            MATCH (l:Library)
+            WHERE point.distance(l.location, origin) <= $radius
+            WITH l, point.distance(l.location, origin) AS distance
+            RETURN l, distance ORDER BY distance LIMIT $limit
         """
+        params: Neo4jParameter = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "radius": radius,
+            "limit": limit,
+        }
 
-        with self.db_client as session:
-            libraries_raw = session.read(query=query)
+        async with self.db_client as session:
+            libraries_raw = await session.read(query, params)
 
-        libraries = list()
-        for library in libraries_raw:
-            temp = dict(library[0].items())
-            libraries.append(self._build_library(temp))
+        return [
+            NearbyLibrary.from_trusted(
+                {**self._flatten_location(dict(library.items())), "distance": distance}
+            )
+            for library, distance in libraries_raw
+        ]
 
-        return libraries
+    @timed(DB_QUERY_DURATION)
+    async def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        """
+        This method searches the libraries by name and address, the most relevant first.
+        Every word must match, either as a whole or as the prefix of a longer one
+        (exact matches are more relevant), through the full-text index.
+
+        Args:
+            text (str): the text to search.
+            offset (int): the number of results to skip.
+            limit (int): the maximum number of libraries.
+
+        Returns:
+            list[ScoredLibrary]: the libraries, ordered by relevance.
+        """
+        terms = _SEARCH_TERMS.findall(text.casefold())
+        if len(terms) == 0:
+            return []
+
+        query = """//cypher
+            CALL db.index.fulltext.queryNodes('library_search', $search,
+            {skip: $offset, limit: $limit})
+            YIELD node, score
+            RETURN node, score
+        """
+        params: Neo4jParameter = {
+            "search": " AND ".join(f"({x} OR {x}*)" for x in terms),
+            "offset": offset,
+            "limit": limit,
+        }
+
+        async with self.db_client as session:
+            libraries_raw = await session.read(query, params)
+
+        return [
+            ScoredLibrary.from_trusted(
+                {**self._flatten_location(dict(library.items())), "score": score}
+            )
+            for library, score in libraries_raw
+        ]
 
-    def find_a_library_by_fid(self, fid: str) -> Library:
+    @timed(DB_QUERY_DURATION)
+    async def find_a_library_by_fid(self, fid: str) -> Library:
         """
         This method search for the desired library on the db.
 
@@ -76,8 +248,8 @@ class LibrariesRepository:
         """
         params: Neo4jParameter = {"fid": fid}
 
-        with self.db_client as session:
-            library_raw = session.read(query, params)
+        async with self.db_client as session:
+            library_raw = await session.read(query, params)
 
         if len(library_raw) == 0:
             ferrea_logger.warning(f"Unable to find library with fid {fid}.")
@@ -88,50 +260,137 @@ class LibrariesRepository:
         raw_result = dict(library_raw[0][0].items())
         return self._build_library(raw_result)
 
-    def create_library(self, data: Library) -> Library:
+    async def create_library(self, data: Library) -> Library:
         """
-        This method creates a library on the db.
+        This method creates a library on the db, in a single statement returning the new node.
 
         Args:
             data (Library): the data of the library to create.
 
+        Raises:
+            FerreaLibraryNotCreated: if the db does not return the created library.
+
         Returns:
             Library: the created library.
         """
         params: Neo4jParameter = {
-            "name": data.name,
-            "phone": str(data.phone),
-            "address": data.address,
-            "email": str(data.email),
+            **self._library_params(data),
+            **await self._location_params(data.address),
         }
-        location = self._find_location(data.address)
-        if location is not None:
-            params["latitude"] = location.latitude
-            params["longitude"] = location.longitude
 
         query = """//cypher
-            MERGE (l:Library {name: $name, phone: $phone, address: $address, email: $email, 
-            location: point({latitude: $latitude, longitude: $longitude}), fid: randomUUID()})
-            RETURN l.fid
+            CREATE (l:Library {fid: randomUUID(), name: $name, phone: $phone,
+            address: $address, email: $email,
+            location: point({latitude: $latitude, longitude: $longitude}),
+            location_pending: $location_pending, version: 1})
+            WITH l
+            MERGE (v:CollectionVersion {name: 'Library'})
+            SET v.version = coalesce(v.version, 0) + 1
+            RETURN l
         """
 
-        with self.db_client as session:
-            [[new_fid]] = session.write(query, params)
+        # the geocoding above is not a db query: only the write is timed.
+        with DB_QUERY_DURATION.timer("create_library"):
+            async with self.db_client as session:
+                library_raw = await session.write(query, params)
 
-        created_library = self.find_a_library_by_fid(new_fid)
-        if created_library is None:
+        if len(library_raw) == 0:
             raise FerreaLibraryNotCreated(
                 f"Unable to find {data.name} library after its creation."
             )
 
+        created_library = self._build_library(dict(library_raw[0][0].items()))
+        self._schedule_geocoding(str(created_library.fid), params)
+
         return created_library
 
-    def update_library(self, fid: str, new_value: Library) -> Library:
+    async def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        """
+        This method creates (or updates, if matching on name and address) many libraries.
+        Addresses are geocoded once each, then libraries are written in chunks,
+        a single UNWIND transaction per chunk: a failed chunk fails only its libraries.
+
+        Args:
+            libraries (list[Library]): the data of the libraries.
+
+        Returns:
+            list[BatchItemResult]: the outcome of each library, by its position.
+        """
+        locations: dict[str, Neo4jParameter] = {}
+        for library in libraries:
+            key = normalize_address(library.address)
+            if key not in locations:
+                locations[key] = await self._location_params(library.address)
+
+        rows: list[dict[str, Any]] = [
+            {
+                "index": index,
+                **self._library_params(library),
+                **locations[normalize_address(library.address)],
+            }
+            for index, library in enumerate(libraries)
+        ]
+
+        query = """//cypher
+            UNWIND $rows AS row
+            WITH row, EXISTS {
+                MATCH (x:Library {name: row.name, address: row.address})
+            } AS existed
+            MERGE (l:Library {name: row.name, address: row.address})
+            ON CREATE SET l.fid = randomUUID()
+            SET l.phone = row.phone, l.email = row.email,
+            l.location = point({latitude: row.latitude, longitude: row.longitude}),
+            l.location_pending = row.location_pending,
+            l.version = coalesce(l.version, 0) + 1
+            WITH row, existed, l
+            MERGE (v:CollectionVersion {name: 'Library'})
+            SET v.version = coalesce(v.version, 0) + 1
+            RETURN row.index, existed, l
+        """
+
+        results: list[BatchItemResult] = []
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start : start + UPSERT_CHUNK_SIZE]
+            try:
+                with DB_QUERY_DURATION.timer("upsert_libraries"):
+                    async with self.db_client as session:
+                        written = await session.write(query, {"rows": chunk})
+            except (Neo4jError, DriverError) as e:
+                ferrea_logger.exception(
+                    f"Unable to write {len(chunk)} libraries due to: {e}.",
+                    **self.context.log,
+                )
+                results.extend(
+                    BatchItemResult(
+                        index=row["index"],
+                        status=BatchStatus.FAILED,
+                        error=f"{e}",
+                    )
+                    for row in chunk
+                )
+                continue
+
+            for index, existed, library_raw in written:
+                library = self._build_library(dict(library_raw.items()))
+                self._schedule_geocoding(str(library.fid), rows[index])
+                results.append(
+                    BatchItemResult(
+                        index=index,
+                        status=BatchStatus.UPDATED if existed else BatchStatus.CREATED,
+                        library=library,
+                    )
+                )
+
+        return results
+
+    async def update_library(self, fid: str, new_value: Library) -> Library:
         """
         This method updates an existing library on the db, based on its fid (Ferrea ID).
+        Match, update and read back happen in a single statement.
 
         Args:
             fid (str): the ferreaID of the object.
+            new_value (Library): the new data of the library.
 
         Raises:
             FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
@@ -139,33 +398,43 @@ class LibrariesRepository:
         Returns:
             Library: the updated library.
         """
-        # just check that the library exists, or raise an Error.
-        _ = self.find_a_library_by_fid(fid)
-
         params: Neo4jParameter = {
-            "name": new_value.name,
-            "phone": str(new_value.phone),
-            "address": new_value.address,
-            "email": str(new_value.email),
+            **self._library_params(new_value),
+            "fid": fid,
+            **await self._location_params(new_value.address),
         }
-        location = self._find_location(new_value.address)
-        if location is not None:
-            params["latitude"] = location.latitude
-            params["longitude"] = location.longitude
 
         query = """//cypher
-            MERGE (l:Library {name: $name, phone: $phone, address: $address, email: $email,
-            location: point({latitude: $latitude, longitude: $longitude})})
+            MATCH (l:Library {fid: $fid})
+            SET l.name = $name, l.phone = $phone, l.address = $address, l.email = $email,
+            l.location = point({latitude: $latitude, longitude: $longitude}),
+            l.location_pending = $location_pending,
+            l.version = coalesce(l.version, 0) + 1
+            WITH l
+            MERGE (v:CollectionVersion {name: 'Library'})
+            SET v.version = coalesce(v.version, 0) + 1
+            RETURN l
         """
 
-        with self.db_client as session:
-            session.write(query, params)
+        with DB_QUERY_DURATION.timer("update_library"):
+            async with self.db_client as session:
+                library_raw = await session.write(query, params)
+
+        if len(library_raw) == 0:
+            ferrea_logger.warning(f"Unable to find library with fid {fid}.")
+            raise FerreaNonExistingLibrary(
+                f"Unable to find library based on the provided fid {fid}."
+            )
+
+        self._schedule_geocoding(fid, params)
 
-        return self.find_a_library_by_fid(fid)
+        return self._build_library(dict(library_raw[0][0].items()))
 
-    def delete_library(self, fid: str) -> Library:
+    @timed(DB_QUERY_DURATION)
+    async def delete_library(self, fid: str) -> Library:
         """
-        This method deltes an existing library from the db, based on its fid (Ferrea ID).
+        This method deletes an existing library from the db, based on its fid (Ferrea ID).
+        The properties of the node are returned by the same statement deleting it.
 
         Args:
             fid (str): the ferreaID of the object.
@@ -176,27 +445,86 @@ class LibrariesRepository:
         Returns:
             Library: the deleted library.
         """
-        # just check that the library exists, or raise an Error.
-        old_library = self.find_a_library_by_fid(fid)
-
         params: Neo4jParameter = {
             "fid": fid,
         }
         query = """//cypher
-            MATCH (l:Library {fid: $fid}) DELETE l
+            MATCH (l:Library {fid: $fid})
+            WITH l, properties(l) AS old_library
+            DELETE l
+            WITH old_library
+            MERGE (v:CollectionVersion {name: 'Library'})
+            SET v.version = coalesce(v.version, 0) + 1
+            RETURN old_library
         """
 
-        with self.db_client as session:
-            session.write(query, params)
+        async with self.db_client as session:
+            library_raw = await session.write(query, params)
 
-        return old_library
+        if len(library_raw) == 0:
+            ferrea_logger.warning(f"Unable to find library with fid {fid}.")
+            raise FerreaNonExistingLibrary(
+                f"Unable to find library based on the provided fid {fid}."
+            )
+
+        return self._build_library(dict(library_raw[0][0]))
+
+    @timed(DB_QUERY_DURATION)
+    async def get_collection_version(self) -> int:
+        """
+        This method gets the version of the libraries collection, increased on every write.
+
+        Returns:
+            int: the version of the collection.
+        """
+        query = """//cypher
+            MATCH (v:CollectionVersion {name: 'Library'}) RETURN v.version
+        """
+
+        async with self.db_client as session:
+            version_raw = await session.read(query)
+
+        return version_raw[0][0] if len(version_raw) > 0 else 0
 
     @property
-    def _geolocator(self) -> geopy.Nominatim:
-        """Integrated geolocator for geopy"""
-        return geopy.Nominatim(user_agent="my_geo_coder")
+    def _geolocator(self) -> AsyncGeocoder:
+        """Integrated geolocator, shared by the whole process."""
+        return get_geocoder()
+
+    async def _find_location(self, address: str) -> Coordinates | None:
+        return await self._geolocator.geocode(address)
+
+    def _library_params(self, data: Library) -> Neo4jParameter:
+        """Helper method for the properties of a write (missing values are not stored)."""
+        return {
+            "name": data.name,
+            "phone": str(data.phone) if data.phone is not None else None,
+            "address": data.address,
+            "email": str(data.email) if data.email is not None else None,
+        }
+
+    async def _location_params(self, address: str) -> Neo4jParameter:
+        """
+        Helper method for the location parameters of a write.
 
-    def _find_location(self, address: str) -> geopy.Location | None:
-        location = self._geolocator.geocode(address)
+        If the background worker is available and the address is not cached yet,
+        the library is saved as pending instead of waiting for Nominatim.
+        """
+        if self.geocoding_worker is None:
+            location = await self._find_location(address)
+        else:
+            cached = self._geolocator.peek(address)
+            if cached is MISSING:
+                return {"latitude": None, "longitude": None, "location_pending": True}
+            location = cached
+
+        return {
+            "latitude": location.latitude if location is not None else None,
+            "longitude": location.longitude if location is not None else None,
+            "location_pending": False,
+        }
 
-        return location  # type: ignore
+    def _schedule_geocoding(self, fid: str, params: Neo4jParameter) -> None:
+        """Helper method to hand a pending library over to the background worker."""
+        if self.geocoding_worker is not None and params["location_pending"]:
+            self.geocoding_worker.enqueue(fid, str(params["address"]))
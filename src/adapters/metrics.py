@@ -0,0 +1,289 @@
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, ClassVar, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# a sample: the suffix of the name, its labels and its value.
+Sample = tuple[str, tuple[tuple[str, str], ...], float]
+
+# from 1 ms to 10 s, in seconds.
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    """Helper function to format a value as the exposition format expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else f"{int(value)}"
+
+
+def _escape(value: str) -> str:
+    """Helper function to escape the value of a label."""
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+@dataclass
+class Counter:
+    """
+    A value that only goes up (e.g. the requests served), one per set of labels.
+    Metrics are thread safe: the geocoder updates them from its threads.
+    """
+
+    type: ClassVar[str] = "counter"
+
+    name: str
+    documentation: str
+    labels: tuple[str, ...] = ()
+    _values: dict[tuple[str, ...], float] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """
+        Increase the value.
+
+        Args:
+            label_values (str): the values of the labels, in order.
+            amount (float, optional): the increase. Defaults to 1.0.
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        """The current values, one per set of labels."""
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield "", tuple(zip(self.labels, label_values)), value
+
+
+@dataclass
+class Gauge(Counter):
+    """A value that goes up and down (e.g. the requests in flight)."""
+
+    type: ClassVar[str] = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        """
+        Decrease the value.
+
+        Args:
+            label_values (str): the values of the labels, in order.
+            amount (float, optional): the decrease. Defaults to 1.0.
+        """
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float) -> None:
+        """
+        Set the value.
+
+        Args:
+            label_values (str): the values of the labels, in order.
+            value (float): the value.
+        """
+        with self._lock:
+            self._values[label_values] = value
+
+
+@dataclass
+class Histogram:
+    """
+    Distribution of observed values (e.g. durations in seconds) in buckets, one per set of labels.
+    Each observation increases a single bucket: they are made cumulative on scrape.
+    """
+
+    type: ClassVar[str] = "histogram"
+
+    name: str
+    documentation: str
+    labels: tuple[str, ...] = ()
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+    # per set of labels: the count of each bucket (+Inf last), the sum and the count.
+    _values: dict[tuple[str, ...], tuple[list[int], list[float]]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value (float): the observed value.
+            label_values (str): the values of the labels, in order.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = ([0] * (len(self.buckets) + 1), [0.0])
+                self._values[label_values] = entry
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def timer(self, *label_values: str) -> Iterator[None]:
+        """
+        Observe the duration of the block, in seconds.
+
+        Args:
+            label_values (str): the values of the labels, in order.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def samples(self) -> Iterator[Sample]:
+        """The cumulative buckets, sum and count, one set per set of labels."""
+        with self._lock:
+            values = [(k, list(v[0]), v[1][0]) for k, v in self._values.items()]
+
+        bounds = [*self.buckets, math.inf]
+        for label_values, counts, total in values:
+            labels = tuple(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield "_bucket", (*labels, ("le", _format_value(bound))), cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+Metric = Counter | Histogram
+
+
+def render(metrics: list[Metric]) -> str:
+    """
+    Render the metrics in the Prometheus text exposition format (version 0.0.4).
+
+    Args:
+        metrics (list[Metric]): the metrics.
+
+    Returns:
+        str: the exposition.
+    """
+    lines: list[str] = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, labels, value in metric.samples():
+            rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            rendered = f"{{{rendered}}}" if rendered else ""
+            lines.append(f"{metric.name}{suffix}{rendered} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram) -> Callable[[F], F]:
+    """
+    Decorator observing the duration of an async method (or async generator, until
+    exhausted) on a histogram with a single label, the name of the method.
+
+    Args:
+        histogram (Histogram): the histogram.
+
+    Returns:
+        Callable[[F], F]: the decorator.
+    """
+
+    def decorator(function: F) -> F:
+        name = function.__name__
+
+        if inspect.isasyncgenfunction(function):
+
+            @functools.wraps(function)
+            async def generator_wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    async for item in function(*args, **kwargs):
+                        yield item
+                finally:
+                    histogram.observe(time.perf_counter() - started, name)
+
+            return generator_wrapper  # type: ignore
+
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, name)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+# the metrics updated while serving, process wide (the caches are read on scrape).
+HTTP_REQUEST_DURATION = Histogram(
+    "ferrea_http_request_duration_seconds",
+    "Duration of the HTTP requests, by route, method and status.",
+    labels=("route", "method", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "ferrea_http_requests_in_flight", "HTTP requests being served."
+)
+DB_QUERY_DURATION = Histogram(
+    "ferrea_db_query_duration_seconds",
+    "Duration of the db queries, by repository method.",
+    labels=("method",),
+)
+DB_STATEMENT_DURATION = Histogram(
+    "ferrea_db_statement_duration_seconds",
+    "Duration of each statement run on the db, by transaction (read or write).",
+    labels=("transaction",),
+)
+DB_SLOW_QUERIES = Counter(
+    "ferrea_db_slow_queries_total", "Db queries slower than the slow query threshold."
+)
+DB_COALESCED_READS = Counter(
+    "ferrea_db_coalesced_reads_total",
+    "Repository reads made on the db for a group of identical concurrent reads, by method.",
+    labels=("method",),
+)
+DB_SHARED_READS = Counter(
+    "ferrea_db_shared_reads_total",
+    "Repository reads served by an identical read already in flight (db calls saved), by method.",
+    labels=("method",),
+)
+GEOCODER_REQUEST_DURATION = Histogram(
+    "ferrea_geocoder_request_duration_seconds",
+    "Duration of the calls to Nominatim (cache misses only).",
+)
+
+METRICS: list[Metric] = [
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    DB_QUERY_DURATION,
+    DB_STATEMENT_DURATION,
+    DB_SLOW_QUERIES,
+    DB_COALESCED_READS,
+    DB_SHARED_READS,
+    GEOCODER_REQUEST_DURATION,
+]
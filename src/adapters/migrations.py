@@ -0,0 +1,181 @@
+import hashlib
+import re
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from pathlib import Path
+
+from ferrea.observability.logs import ferrea_logger
+from neo4j.exceptions import DriverError, Neo4jError
+
+from adapters.database import AsyncDBClient
+from models.exceptions import FerreaMigrationError
+
+# cypher/migrations, next to the folder of the sources (both in the repo and in the image).
+DEFAULT_MIGRATIONS_PATH = Path(__file__).resolve().parents[2] / "cypher" / "migrations"
+
+_FILE_NAME = re.compile(r"^(?P<version>\d+)_(?P<name>\w+)\.cypher$")
+_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_LINE_COMMENT = re.compile(r"^\s*//.*$", re.MULTILINE)
+
+_BOOTSTRAP_QUERY = """//cypher
+    CREATE CONSTRAINT unique_migration_version IF NOT EXISTS
+    FOR (m:Migration) REQUIRE m.version IS UNIQUE
+"""
+
+_APPLIED_QUERY = """//cypher
+    MATCH (m:Migration) RETURN m.version, m.checksum ORDER BY m.version
+"""
+
+_RECORD_QUERY = """//cypher
+    MERGE (m:Migration {version: $version})
+    SET m.name = $name, m.checksum = $checksum, m.applied_at = datetime()
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A versioned .cypher file, made of idempotent statements."""
+
+    version: int
+    name: str
+    statements: tuple[str, ...]
+    checksum: str
+
+
+def _split_statements(script: str) -> tuple[str, ...]:
+    """Helper function to split a script in its statements, without comments."""
+    script = _LINE_COMMENT.sub("", _BLOCK_COMMENT.sub("", script))
+    return tuple(x.strip() for x in script.split(";") if x.strip())
+
+
+def load_migrations(path: Path | None = None) -> list[Migration]:
+    """
+    Load the migrations from a folder, ordered by version.
+    Files must be named <version>_<name>.cypher, e.g. 0001_unique_fid.cypher.
+
+    Args:
+        path (Path | None, optional): the folder of the migrations. Defaults to None,
+            meaning DEFAULT_MIGRATIONS_PATH.
+
+    Raises:
+        FerreaMigrationError: if the folder is missing or two files share the version.
+
+    Returns:
+        list[Migration]: the migrations.
+    """
+    path = path or DEFAULT_MIGRATIONS_PATH
+    if not path.is_dir():
+        raise FerreaMigrationError(f"Unable to find the migrations folder {path}.")
+
+    migrations: dict[int, Migration] = {}
+    for file in sorted(path.glob("*.cypher")):
+        match = _FILE_NAME.match(file.name)
+        if match is None:
+            ferrea_logger.warning(f"Skipping {file.name}, not a migration.")
+            continue
+
+        version = int(match["version"])
+        if version in migrations:
+            raise FerreaMigrationError(f"Duplicated migration version {version}.")
+
+        script = file.read_text()
+        migrations[version] = Migration(
+            version=version,
+            name=match["name"],
+            statements=_split_statements(script),
+            checksum=hashlib.sha256(script.encode()).hexdigest(),
+        )
+
+    return [migrations[x] for x in sorted(migrations)]
+
+
+@dataclass
+class MigrationRunner:
+    """
+    Apply the migrations not applied yet, in order, tracking them in the graph.
+
+    Each applied migration is recorded as a (:Migration {version}) node.
+    Statements must be idempotent (e.g. IF NOT EXISTS), so that workers starting
+    together, or a migration interrupted halfway, are harmless.
+    """
+
+    db_client_factory: Callable[[], AbstractAsyncContextManager[AsyncDBClient]]
+    migrations: list[Migration]
+
+    async def applied(self) -> dict[int, str]:
+        """
+        Get the migrations already applied on the db.
+
+        Raises:
+            FerreaMigrationError: if the db cannot be queried.
+
+        Returns:
+            dict[int, str]: the checksum of each applied migration, by version.
+        """
+        try:
+            async with self.db_client_factory() as session:
+                await session.write(_BOOTSTRAP_QUERY)
+                applied = await session.read(_APPLIED_QUERY)
+        except (Neo4jError, DriverError) as e:
+            raise FerreaMigrationError(
+                f"Unable to read the applied migrations due to {e}."
+            ) from e
+
+        return {version: checksum for version, checksum in applied}
+
+    async def pending(self) -> list[Migration]:
+        """
+        Get the migrations not applied yet, in order.
+
+        Raises:
+            FerreaMigrationError: if the db cannot be queried.
+
+        Returns:
+            list[Migration]: the pending migrations.
+        """
+        applied = await self.applied()
+        for migration in self.migrations:
+            checksum = applied.get(migration.version)
+            if checksum is not None and checksum != migration.checksum:
+                ferrea_logger.warning(
+                    f"Migration {migration.version} changed after being applied."
+                )
+
+        return [x for x in self.migrations if x.version not in applied]
+
+    async def run(self) -> list[Migration]:
+        """
+        Apply the pending migrations, one statement per transaction
+        (schema changes cannot share a transaction with other writes).
+
+        Raises:
+            FerreaMigrationError: if the db cannot be queried or a statement fails
+                (later migrations are not applied).
+
+        Returns:
+            list[Migration]: the migrations applied.
+        """
+        pending = await self.pending()
+        for migration in pending:
+            ferrea_logger.info(
+                f"Applying migration {migration.version} {migration.name}."
+            )
+            try:
+                async with self.db_client_factory() as session:
+                    for statement in migration.statements:
+                        await session.write(statement)
+                    await session.write(
+                        _RECORD_QUERY,
+                        {
+                            "version": migration.version,
+                            "name": migration.name,
+                            "checksum": migration.checksum,
+                        },
+                    )
+            except (Neo4jError, DriverError) as e:
+                raise FerreaMigrationError(
+                    f"Unable to apply migration {migration.version} due to {e}."
+                ) from e
+
+        return pending
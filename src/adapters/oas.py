@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from ferrea.observability.logs import ferrea_logger
+
+OpenAPISchema = dict[str, Any]
+
+
+def compiled_path(path: Path) -> Path:
+    """
+    The compiled form of an OAS bundle, next to it (e.g. bundle.yaml -> bundle.compiled.json).
+
+    Args:
+        path (Path): the path of the bundle.
+
+    Returns:
+        Path: the path of its compiled form.
+    """
+    return path.with_name(f"{path.stem}.compiled.json")
+
+
+def compile_openapi_schema(path: Path) -> OpenAPISchema:
+    """
+    Parse an OAS bundle, storing it in its compiled form: JSON loads in well under
+    a ms, the YAML bundle takes about a hundred.
+    The compiled form holds the digest of the bundle, to tell when it's stale.
+
+    Args:
+        path (Path): the path of the bundle.
+
+    Returns:
+        OpenAPISchema: the schema.
+    """
+    source = path.read_bytes()
+    schema = _parse(source)
+    _store(compiled_path(path), _digest(source), schema)
+    return schema
+
+
+def load_openapi_schema(path: Path) -> OpenAPISchema:
+    """
+    Load an OAS bundle from its compiled form, compiling it again if missing or stale.
+    The bundle is only read to check its digest: YAML is parsed on a cache miss alone.
+
+    Args:
+        path (Path): the path of the bundle.
+
+    Returns:
+        OpenAPISchema: the schema.
+    """
+    source = path.read_bytes()
+    digest = _digest(source)
+    compiled = compiled_path(path)
+
+    try:
+        cached = json.loads(compiled.read_bytes())
+        if cached.get("digest") == digest:
+            return cached["schema"]
+    except (OSError, ValueError):
+        pass
+
+    ferrea_logger.info(f"Compiling the OAS bundle {path}.")
+    schema = _parse(source)
+    try:
+        _store(compiled, digest, schema)
+    except (OSError, TypeError) as e:
+        # e.g. a read-only filesystem: it's parsed again on the next start.
+        ferrea_logger.warning(f"Unable to store the compiled OAS bundle due to {e}.")
+    return schema
+
+
+def add_openapi_schema(app: FastAPI, path: Path) -> FastAPI:
+    """
+    Serve the schema of an OAS bundle instead of the generated one.
+
+    Args:
+        app (FastAPI): the app.
+        path (Path): the path of the bundle.
+
+    Returns:
+        FastAPI: the app.
+    """
+    schema = load_openapi_schema(path)
+    # not app.openapi_schema: fastapi generates it again when the routes change.
+    app.openapi = lambda: schema  # type: ignore
+    return app
+
+
+def _digest(source: bytes) -> str:
+    """Helper function for the digest of a bundle."""
+    return hashlib.sha256(source).hexdigest()
+
+
+def _parse(source: bytes) -> OpenAPISchema:
+    """Helper function to parse a bundle (yaml is imported only when needed)."""
+    import yaml
+
+    return yaml.safe_load(source)
+
+
+def _store(compiled: Path, digest: str, schema: OpenAPISchema) -> None:
+    """Helper function to store the compiled form, atomically (workers may race on it)."""
+    temporary = compiled.with_name(f"{compiled.name}.{os.getpid()}.tmp")
+    try:
+        temporary.write_text(json.dumps({"digest": digest, "schema": schema}))
+        os.replace(temporary, compiled)
+    finally:
+        temporary.unlink(missing_ok=True)
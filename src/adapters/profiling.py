@@ -0,0 +1,299 @@
+import asyncio
+import re
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Any, Self
+
+from ferrea.core.context import Context
+from ferrea.observability.logs import ferrea_logger
+from neo4j import Record
+from neo4j.exceptions import DriverError, Neo4jError
+
+from adapters.database import AsyncNeo4jSession, Neo4jParameters
+from adapters.metrics import DB_SLOW_QUERIES, DB_STATEMENT_DURATION
+from configs.config import QueryProfiling
+
+PLAN_MODES = ("none", "explain", "profile")
+
+_WHITESPACES = re.compile(r"\s+")
+
+
+def _shape(value: Any) -> str:
+    """Helper function for the shape of a parameter: its type, never its value."""
+    if isinstance(value, (list, tuple)):
+        return f"list[{len(value)}]"
+    if isinstance(value, dict):
+        return "map"
+    return type(value).__name__
+
+
+def _format_plan(plan: dict[str, Any], depth: int = 0) -> list[str]:
+    """Helper function to format a plan as an indented tree of operators."""
+    args = plan.get("args", {})
+    details = [f"estimated rows {args.get('EstimatedRows', 0):.0f}"]
+    if "rows" in plan:
+        details.append(f"rows {plan['rows']}")
+    if "dbHits" in plan:
+        details.append(f"db hits {plan['dbHits']}")
+    if "Details" in args:
+        details.append(f"{args['Details']}")
+
+    lines = [f"{'  ' * depth}{plan.get('operatorType')} ({', '.join(details)})"]
+    for child in plan.get("children", []):
+        lines.extend(_format_plan(child, depth + 1))
+    return lines
+
+
+@dataclass(frozen=True)
+class QueryProfile:
+    """A query run on the db: what, how long and for which request."""
+
+    query: str
+    parameters: dict[str, str]
+    rows: int
+    duration: float
+    write: bool
+    correlation_id: str | None = None
+
+
+@dataclass
+class QueryProfiler:
+    """
+    Process wide sink of the query profiles: each one is observed on the duration
+    histogram, the slow ones are logged as well, with their plan if configured.
+    EXPLAIN only plans the query again, PROFILE runs it as well (so it's used only
+    for reads: a write is never run twice).
+
+    The plan is fetched in the background, on a session of its own, so that a slow
+    query never pays a second round trip to the db before returning its records.
+    """
+
+    settings: QueryProfiling
+    session_factory: Callable[[], AsyncNeo4jSession]
+    _plans: set[asyncio.Task[None]] = field(default_factory=set, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.settings.plan not in PLAN_MODES:
+            raise ValueError(
+                f"Invalid plan mode {self.settings.plan}, expected one of {PLAN_MODES}."
+            )
+
+    def is_slow(self, profile: QueryProfile) -> bool:
+        """
+        Check a query against the threshold.
+
+        Args:
+            profile (QueryProfile): the profile of the query.
+
+        Returns:
+            bool: True if the query has to be logged.
+        """
+        return profile.duration >= self.settings.slow_threshold
+
+    def record(
+        self,
+        profile: QueryProfile,
+        params: Neo4jParameters | None,
+        context: Context | None,
+    ) -> None:
+        """
+        Record the profile of a query, logging it if slow.
+
+        Args:
+            profile (QueryProfile): the profile of the query.
+            params (Neo4jParameters | None): the parameters of the query, to plan it.
+            context (Context | None): the context of the request, if any.
+        """
+        DB_STATEMENT_DURATION.observe(
+            profile.duration, "write" if profile.write else "read"
+        )
+        if not self.is_slow(profile):
+            return
+
+        DB_SLOW_QUERIES.inc()
+        if self.settings.plan == "none":
+            self._log(profile, None, context)
+            return
+
+        task = asyncio.create_task(self._log_with_plan(profile, params, context))
+        self._plans.add(task)
+        task.add_done_callback(self._plans.discard)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Wait for the plans being fetched, cancelling the ones still running after the timeout.
+
+        Args:
+            timeout (float, optional): how long to wait, in seconds. Defaults to 5.0.
+        """
+        if len(self._plans) == 0:
+            return
+
+        _, pending = await asyncio.wait(self._plans, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def _log(
+        self,
+        profile: QueryProfile,
+        plan: dict[str, Any] | None,
+        context: Context | None,
+    ) -> None:
+        """Helper method to log a slow query, with its plan if any."""
+        message = (
+            f"Slow query ({profile.duration * 1000:.0f} ms, {profile.rows} rows): "
+            f"{_WHITESPACES.sub(' ', profile.query).strip()} "
+            f"with parameters {profile.parameters}."
+        )
+        if plan is not None:
+            message = "\n".join([message, *_format_plan(plan)])
+
+        ferrea_logger.warning(message, **(context.log if context is not None else {}))
+
+    async def _log_with_plan(
+        self,
+        profile: QueryProfile,
+        params: Neo4jParameters | None,
+        context: Context | None,
+    ) -> None:
+        """Helper method to fetch the plan of a slow query, then log it."""
+        plan = None
+        try:
+            async with self.session_factory() as session:
+                plan = await session.plan(
+                    profile.query,
+                    params,
+                    profile=self.settings.plan == "profile" and not profile.write,
+                    write=profile.write,
+                )
+        except (Neo4jError, DriverError) as e:
+            ferrea_logger.warning(f"Unable to get the plan of a slow query due to {e}.")
+
+        self._log(profile, plan, context)
+
+
+@dataclass
+class ProfiledSession:
+    """
+    Client matching the AsyncDBClient protocol, wrapping a session to profile each
+    query: text, shape of the parameters, rows returned and time spent on the db.
+
+    The time of a stream is the time spent waiting for the records, not for
+    their consumer (e.g. a slow client of the export).
+    """
+
+    session: AsyncNeo4jSession
+    profiler: QueryProfiler
+    context: Context | None = None
+
+    async def __aenter__(self) -> Self:
+        await self.session.__aenter__()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.session.__aexit__(exc_type, exc_value, traceback)
+
+    async def read(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> list[Record]:
+        """
+        Run a query inside a read transaction.
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+
+        Returns:
+            list[Record]: the records returned by the query.
+        """
+        started = time.perf_counter()
+        records = await self.session.read(query, params)
+        duration = time.perf_counter() - started
+        self._record(query, params, len(records), duration, write=False)
+        return records
+
+    async def write(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> list[Record]:
+        """
+        Run a query inside a write transaction.
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+
+        Returns:
+            list[Record]: the records returned by the query.
+        """
+        started = time.perf_counter()
+        records = await self.session.write(query, params)
+        duration = time.perf_counter() - started
+        self._record(query, params, len(records), duration, write=True)
+        return records
+
+    async def stream(
+        self, query: str, params: Neo4jParameters | None = None
+    ) -> AsyncIterator[Record]:
+        """
+        Run a query inside a transaction, yielding the records while they are fetched.
+
+        Args:
+            query (str): the cypher query.
+            params (Neo4jParameters | None, optional): the query parameters. Defaults to None.
+
+        Yields:
+            AsyncIterator[Record]: the records returned by the query.
+        """
+        rows = 0
+        waited = 0.0
+        # closing the stream early (e.g. a client gone) closes the transaction as well.
+        async with aclosing(self.session.stream(query, params)) as records:  # type: ignore
+            while True:
+                started = time.perf_counter()
+                try:
+                    record = await anext(records)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    waited += time.perf_counter() - started
+                rows += 1
+                yield record
+
+        self._record(query, params, rows, waited, write=False)
+
+    async def verify_connectivity(self) -> bool:
+        """
+        Verify that the driver is able to reach the database.
+
+        Returns:
+            bool: True if the database is reachable (raises otherwise).
+        """
+        return await self.session.verify_connectivity()
+
+    def _record(
+        self,
+        query: str,
+        params: Neo4jParameters | None,
+        rows: int,
+        duration: float,
+        write: bool,
+    ) -> None:
+        """Helper method to hand the profile of a query over to the profiler."""
+        profile = QueryProfile(
+            query=query,
+            parameters={k: _shape(v) for k, v in (params or {}).items()},
+            rows=rows,
+            duration=duration,
+            write=write,
+            correlation_id=self.context.uuid if self.context is not None else None,
+        )
+        self.profiler.record(profile, params, self.context)
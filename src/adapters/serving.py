@@ -0,0 +1,248 @@
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from multiprocessing.process import BaseProcess
+from types import FrameType
+
+import uvicorn
+from ferrea.observability.logs import ferrea_logger
+
+from configs.config import Serving
+
+# seconds between two checks of the workers.
+_MONITOR_INTERVAL = 0.5
+# seconds before replacing a crashed worker, doubled on each crash in a row.
+_RESPAWN_BACKOFF = 0.5
+_MAX_RESPAWN_BACKOFF = 30.0
+
+
+def worker_count(settings: Serving) -> int:
+    """
+    The number of workers to pre-fork.
+
+    Args:
+        settings (Serving): the serving settings.
+
+    Returns:
+        int: the configured workers, or one per cpu if 0.
+    """
+    if settings.workers > 0:
+        return settings.workers
+    # the cpus this process may run on (e.g. restricted by a container), when known.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def worker_pool_size(connection_budget: int, workers: int) -> int:
+    """
+    The size of the Neo4j pool of each worker, so that all the workers together never
+    open more connections than the budget.
+
+    Args:
+        connection_budget (int): the connections of all the workers together.
+        workers (int): the number of workers.
+
+    Raises:
+        ValueError: if the budget is not enough for a connection per worker.
+
+    Returns:
+        int: the size of the pool of each worker.
+    """
+    if workers < 1:
+        raise ValueError(f"Invalid number of workers {workers}.")
+    if connection_budget < workers:
+        raise ValueError(
+            f"The connection budget {connection_budget} is lower than the {workers} workers."
+        )
+    return connection_budget // workers
+
+
+def _serve_worker(
+    config: uvicorn.Config,
+    sock: socket.socket,
+    index: int,
+    setup: Callable[[int], None] | None,
+) -> None:
+    """Body of a worker process: a single uvicorn server, on the shared socket."""
+    # the handlers of the supervisor are inherited: uvicorn installs its own on startup.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # restarts are up to the supervisor (e.g. when the terminal is closed).
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    if setup is not None:
+        setup(index)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+@dataclass
+class Supervisor:
+    """
+    Pre-fork server: the app is imported once, then each worker is forked (sharing the
+    imported modules) and runs its own uvicorn server and lifespan on the same socket.
+
+    Each worker has an index, from 0 to workers - 1, kept by its replacements: the setup,
+    if any, is called with it in the worker process, before serving (e.g. to have a
+    single worker run the background tasks).
+    Workers that exit, crashed or recycled after max_requests, are replaced: a worker
+    crashing again and again (e.g. on boot) with an exponential backoff.
+    Signals: SIGTERM and SIGINT stop all the workers gracefully, SIGHUP replaces
+    them one by one (a new worker is started before an old one is stopped).
+    """
+
+    settings: Serving
+    app: str
+    workers: int
+    setup: Callable[[int], None] | None = None
+    _context: multiprocessing.context.ForkContext = field(
+        default_factory=lambda: multiprocessing.get_context("fork"),
+        init=False,
+        repr=False,
+    )
+    _processes: list[BaseProcess] = field(default_factory=list, init=False)
+    _socket: socket.socket | None = field(default=None, init=False, repr=False)
+    _wakeup: threading.Event = field(default_factory=threading.Event, init=False)
+    _should_exit: bool = field(default=False, init=False)
+    _should_restart: bool = field(default=False, init=False)
+    # per worker index: when it was started, its crashes in a row, when to replace it.
+    _started_at: dict[int, float] = field(default_factory=dict, init=False)
+    _crashes: dict[int, int] = field(default_factory=dict, init=False)
+    _respawn_at: dict[int, float] = field(default_factory=dict, init=False)
+
+    def run(self) -> None:
+        """Serve until stopped by a signal."""
+        self._socket = self._bind()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self._handle_signal)
+
+        ferrea_logger.info(
+            f"Serving on {self.settings.host}:{self.settings.port} "
+            f"with {self.workers} workers (pid {os.getpid()})."
+        )
+        for index in range(self.workers):
+            self._processes.append(self._spawn(index))
+
+        try:
+            while not self._should_exit:
+                self._wakeup.wait(_MONITOR_INTERVAL)
+                self._wakeup.clear()
+                if self._should_restart:
+                    self._should_restart = False
+                    self._restart()
+                self._replace_exited()
+        finally:
+            self._stop(self._processes)
+            self._socket.close()
+            ferrea_logger.info("Stopped all the workers.")
+
+    def _handle_signal(self, signum: int, frame: FrameType | None) -> None:
+        """Helper method to handle the signals, only flagging what the main loop has to do."""
+        if signum == signal.SIGHUP:
+            self._should_restart = True
+        else:
+            self._should_exit = True
+        self._wakeup.set()
+
+    def _bind(self) -> socket.socket:
+        """Helper method to bind the socket shared by the workers."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.settings.host, self.settings.port))
+        return sock
+
+    def _config(self) -> uvicorn.Config:
+        """
+        Helper method for the config of a new worker.
+        The max requests are jittered, so that the workers are not recycled all at once.
+        """
+        max_requests = None
+        if self.settings.max_requests > 0:
+            max_requests = self.settings.max_requests + random.randint(
+                0, self.settings.max_requests_jitter
+            )
+
+        return uvicorn.Config(
+            self.app,
+            factory=True,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=int(self.settings.graceful_timeout),
+            access_log=False,
+            log_level=None,
+            log_config=None,
+        )
+
+    def _spawn(self, index: int) -> BaseProcess:
+        """Helper method to fork a new worker."""
+        process = self._context.Process(
+            target=_serve_worker,
+            args=(self._config(), self._socket, index, self.setup),
+            daemon=False,
+        )
+        process.start()
+        self._started_at[index] = time.monotonic()
+        self._respawn_at.pop(index, None)
+        ferrea_logger.info(f"Started worker {index} (pid {process.pid}).")
+        return process
+
+    def _replace_exited(self) -> None:
+        """
+        Helper method to replace the workers that exited: at once if recycled,
+        after a backoff if crashed (reset once a worker outlives the longest one).
+        """
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._should_exit:
+                continue
+
+            respawn_at = self._respawn_at.get(index)
+            if respawn_at is None:
+                process.join()
+                if process.exitcode == 0:
+                    ferrea_logger.info(f"Worker {process.pid} recycled, replacing it.")
+                    self._crashes[index] = 0
+                    respawn_at = now
+                else:
+                    if now - self._started_at.get(index, now) > _MAX_RESPAWN_BACKOFF:
+                        self._crashes[index] = 0
+                    self._crashes[index] = self._crashes.get(index, 0) + 1
+                    delay = min(
+                        _RESPAWN_BACKOFF * 2 ** (self._crashes[index] - 1),
+                        _MAX_RESPAWN_BACKOFF,
+                    )
+                    ferrea_logger.warning(
+                        f"Worker {process.pid} exited with code {process.exitcode}, "
+                        f"replacing it in {delay:.1f} seconds."
+                    )
+                    respawn_at = now + delay
+                self._respawn_at[index] = respawn_at
+
+            if respawn_at <= now:
+                self._processes[index] = self._spawn(index)
+
+    def _restart(self) -> None:
+        """Helper method to replace all the workers, one at a time."""
+        ferrea_logger.info("Restarting the workers.")
+        for index, process in enumerate(self._processes):
+            if self._should_exit:
+                return
+            self._processes[index] = self._spawn(index)
+            self._stop([process])
+
+    def _stop(self, processes: list[BaseProcess]) -> None:
+        """Helper method to stop some workers gracefully, killing them after the timeout."""
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        for process in processes:
+            process.join(self.settings.graceful_timeout)
+            if process.is_alive():
+                ferrea_logger.warning(f"Worker {process.pid} did not stop, killing it.")
+                process.kill()
+                process.join()
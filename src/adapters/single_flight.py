@@ -0,0 +1,76 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlight(Generic[K]):
+    """
+    Coalesce concurrent identical calls: while the call of a key is in flight, the other
+    callers of the same key wait for it and share its result (or its exception).
+    Nothing is kept once the call is done: it's not a cache.
+
+    The call runs in a task of its own, so that a caller being cancelled (e.g. its client
+    went away) does not cancel it for the others.
+    Not thread safe: the calls of a single event loop only.
+    """
+
+    _flights: dict[K, asyncio.Task[Any]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def in_flight(self, key: K) -> bool:
+        """
+        Whether the call of a key is in flight, i.e. a new caller would share it.
+
+        Args:
+            key (K): the key of the call.
+
+        Returns:
+            bool: True if in flight.
+        """
+        return key in self._flights
+
+    async def do(self, key: K, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Make a call, unless the one of the same key is already in flight: then wait for it.
+
+        Args:
+            key (K): the key of the call, equal for identical calls.
+            call (Callable[[], Awaitable[T]]): the call, made only if not in flight.
+
+        Returns:
+            T: the result of the call.
+        """
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+
+        return await asyncio.shield(task)
+
+    def forget(self, key: K) -> None:
+        """
+        Stop sharing the call of a key: the next callers make a new one (e.g. after a write).
+
+        Args:
+            key (K): the key of the call.
+        """
+        self._flights.pop(key, None)
+
+    def clear(self) -> None:
+        """Stop sharing all the calls in flight."""
+        self._flights.clear()
+
+    def _land(self, key: K, task: asyncio.Task[Any]) -> None:
+        """Helper method to drop a call once done, unless already replaced by a new one."""
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # retrieved even if all the callers were cancelled, not to log it as never retrieved.
+        if not task.cancelled():
+            task.exception()
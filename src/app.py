@@ -1,27 +1,121 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-import uvicorn
 from fastapi import FastAPI
-from ferrea.core.oas import add_openapi_schema
-from ferrea.observability.logs import setup_logger
+from ferrea.observability.logs import ferrea_logger, setup_logger
 
+from adapters.cache import LocalInvalidationBus
+from adapters.cached_libraries import LibraryCache
+from adapters.coalesced_libraries import ReadKey
+from adapters.database import AsyncNeo4jPool
+from adapters.geocoding import get_geocoder
+from adapters.geocoding_worker import GeocodingWorker
+from adapters.health import DatabaseHealthChecker
+from adapters.migrations import MigrationRunner, load_migrations
+from adapters.oas import add_openapi_schema
+from adapters.profiling import QueryProfiler
+from adapters.single_flight import SingleFlight
 from configs import settings
+from models.exceptions import FerreaMigrationError
 from routers import libraries, probes
+from routers._middleware import CompressionMiddleware, MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Own the process wide resources (e.g. the db driver) for the whole app lifetime."""
+    db_pool = AsyncNeo4jPool(settings.database)
+    app.state.db_pool = db_pool
+    bus = LocalInvalidationBus()
+
+    health_checker = DatabaseHealthChecker(
+        settings=settings.health_check, db_client_factory=db_pool.session
+    )
+    health_checker.start()
+    app.state.health_checker = health_checker
+
+    if settings.migrations.on_startup:
+        await migrate(db_pool)
+
+    geocoding_worker = None
+    if settings.geocoding.background:
+        geocoding_worker = GeocodingWorker(
+            settings=settings.geocoding,
+            geocoder=get_geocoder(),
+            db_client_factory=db_pool.session,
+            bus=bus,
+        )
+        geocoding_worker.start()
+    app.state.geocoding_worker = geocoding_worker
+
+    app.state.query_profiler = None
+    if settings.query_profiling.enabled:
+        app.state.query_profiler = QueryProfiler(
+            settings=settings.query_profiling, session_factory=db_pool.session
+        )
+
+    app.state.library_cache = None
+    if settings.library_cache.enabled:
+        app.state.library_cache = LibraryCache(
+            settings=settings.library_cache,
+            bus=bus,
+        )
+
+    app.state.read_flights = None
+    if settings.request_coalescing.enabled:
+        app.state.read_flights = SingleFlight[ReadKey]()
+
+    try:
+        yield
+    finally:
+        if geocoding_worker is not None:
+            await geocoding_worker.stop()
+        await health_checker.stop()
+        if app.state.query_profiler is not None:
+            await app.state.query_profiler.stop()
+        await db_pool.close()
+
+
+async def migrate(db_pool: AsyncNeo4jPool) -> None:
+    """
+    Apply the pending schema migrations (indexes and constraints).
+    A failure is logged but does not prevent the startup: queries still work, just slower.
+    """
+    path = settings.migrations.path
+    try:
+        runner = MigrationRunner(
+            db_client_factory=db_pool.session,
+            migrations=load_migrations(Path(path) if path is not None else None),
+        )
+        applied = await runner.run()
+    except FerreaMigrationError as e:
+        ferrea_logger.error(f"Unable to migrate the db schema due to {e}.")
+        return
+
+    for migration in applied:
+        ferrea_logger.info(f"Applied migration {migration.version} {migration.name}.")
 
 
 def app() -> FastAPI:
     """Setup the app with custom logic, as well as adding the routers."""
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     if settings.ferrea_app.oas_path is not None:
         app = add_openapi_schema(app, Path(settings.ferrea_app.oas_path))
 
     app.include_router(libraries.router)
     app.include_router(probes.router)
+    if settings.compression.enabled:
+        app.add_middleware(CompressionMiddleware, settings=settings.compression)
+    # the outermost: the duration includes the compression.
+    app.add_middleware(MetricsMiddleware)
 
     return app
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     setup_logger()
     uvicorn.run(
         "app:app",
@@ -0,0 +1,26 @@
+import argparse
+import sys
+from pathlib import Path
+
+from adapters.oas import compile_openapi_schema, compiled_path
+from configs import settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compile the OAS bundle, so that it's not parsed at startup."
+    )
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=(
+            Path(settings.ferrea_app.oas_path) if settings.ferrea_app.oas_path else None
+        ),
+        help="the OAS bundle (defaults to the one of the settings).",
+    )
+    args = parser.parse_args()
+    if args.path is None:
+        print("No OAS bundle to compile.", file=sys.stderr)
+        sys.exit(1)
+
+    compile_openapi_schema(args.path)
+    print(f"Compiled {args.path} into {compiled_path(args.path)}")
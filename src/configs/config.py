@@ -20,6 +20,101 @@ class Database(DictValue):
     username: str
     password: str
     database: str | None = None
+    max_connection_pool_size: int = 100
+    connection_acquisition_timeout: float = 60.0
+    max_connection_lifetime: float = 3600.0
+
+
+class Geocoding(DictValue):
+    """Settings for the geocoding layer (and its caches)."""
+
+    user_agent: str = "my_geo_coder"
+    cache_size: int = 4096
+    cache_ttl: float = 30 * 24 * 3600.0
+    negative_cache_ttl: float = 24 * 3600.0
+    cache_path: str | None = None
+    background: bool = True
+    rate_limit: float = 1.0
+    batch_size: int = 50
+    flush_interval: float = 1.0
+    max_attempts: int = 5
+    backoff: float = 2.0
+    max_backoff: float = 300.0
+    # seconds between two lookups of the libraries left pending on the db
+    # (e.g. by a restart or by the other workers), 0 to look them up at start only.
+    recover_interval: float = 60.0
+    # leave the pending libraries to the background worker of another process.
+    deferred: bool = False
+
+
+class LibraryCache(DictValue):
+    """Settings for the cache of the single library lookups."""
+
+    enabled: bool = True
+    size: int = 10_000
+    ttl: float = 300.0
+    collection_version_ttl: float = 1.0
+
+
+class RequestCoalescing(DictValue):
+    """Settings for the coalescing of the concurrent identical reads on the db."""
+
+    enabled: bool = True
+
+
+class Migrations(DictValue):
+    """Settings for the schema migrations (indexes and constraints)."""
+
+    on_startup: bool = True
+    path: str | None = None
+
+
+class QueryProfiling(DictValue):
+    """Settings for the profiling of the db queries (and the slow query log)."""
+
+    enabled: bool = True
+    # queries slower than this (in seconds) are logged.
+    slow_threshold: float = 0.5
+    # plan logged with a slow query: "none", "explain" or "profile" (reads only, runs them again).
+    plan: str = "none"
+
+
+class HealthCheck(DictValue):
+    """Settings for the background checks of the db, read by the probes."""
+
+    interval: float = 5.0
+    timeout: float = 2.0
+    # a check older than this (in seconds) is not trusted anymore.
+    max_age: float = 30.0
+    # connections opened after the first successful check, before being ready.
+    warm_connections: int = 4
+
+
+class Compression(DictValue):
+    """Settings for the compression of the response bodies (through Accept-Encoding)."""
+
+    enabled: bool = True
+    # bodies smaller than this (in bytes) are sent as they are.
+    minimum_size: int = 1024
+    gzip_level: int = 6
+    zstd_level: int = 3
+
+
+class Serving(DictValue):
+    """Settings for the production serving mode (src/serve.py), pre-forking the workers."""
+
+    host: str = "0.0.0.0"
+    port: int = 8080
+    # 0 (the default) for one worker per cpu. The caches and the metrics are per worker:
+    # with more than one, the library cache is disabled and only the first one geocodes.
+    workers: int = 0
+    # connections to Neo4j of all the workers together, split evenly among them.
+    connection_budget: int = 100
+    # a worker is recycled after this many requests (plus a random jitter), 0 for never.
+    max_requests: int = 10_000
+    max_requests_jitter: int = 1_000
+    # seconds a worker has to finish its requests on shutdown and restart.
+    graceful_timeout: float = 30.0
 
 
 class FerreaSettings(Dynaconf):
@@ -27,10 +122,23 @@ class FerreaSettings(Dynaconf):
 
     ferrea_app: FerreaApp = FerreaApp()  # type: ignore
     database: Database = Database()  # type: ignore
+    geocoding: Geocoding = Geocoding()
+    library_cache: LibraryCache = LibraryCache()
+    request_coalescing: RequestCoalescing = RequestCoalescing()
+    migrations: Migrations = Migrations()
+    query_profiling: QueryProfiling = QueryProfiling()
+    health_check: HealthCheck = HealthCheck()
+    compression: Compression = Compression()
+    serving: Serving = Serving()
 
     dynaconf_options = Options(
         envvar_prefix="FERREA",
-        settings_files=["settings.toml", ".secrets.toml"],
+        # absolute paths: a relative one is searched through the stack of the caller
+        # as well, which alone takes tens of ms at import.
+        settings_files=[
+            str(config_dir / "settings.toml"),
+            str(config_dir / ".secrets.toml"),
+        ],
         root_path=config_dir,
     )
 
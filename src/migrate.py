@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from ferrea.observability.logs import setup_logger
+
+from adapters.database import AsyncNeo4jPool
+from adapters.migrations import MigrationRunner, load_migrations
+from configs import settings
+from models.exceptions import FerreaMigrationError
+
+
+async def main(path: Path | None, dry_run: bool) -> int:
+    """
+    Apply (or just list) the pending schema migrations.
+
+    Args:
+        path (Path | None): the folder of the migrations, None for the default one.
+        dry_run (bool): only list the pending migrations, without applying them.
+
+    Returns:
+        int: the exit code.
+    """
+    db_pool = AsyncNeo4jPool(settings.database)
+    try:
+        runner = MigrationRunner(
+            db_client_factory=db_pool.session, migrations=load_migrations(path)
+        )
+        migrations = await (runner.pending() if dry_run else runner.run())
+    except FerreaMigrationError as e:
+        print(f"{e}", file=sys.stderr)
+        return 1
+    finally:
+        await db_pool.close()
+
+    verb = "Pending" if dry_run else "Applied"
+    for migration in migrations:
+        print(f"{verb} {migration.version:04d} {migration.name}")
+    if len(migrations) == 0:
+        print("The db schema is up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the db schema.")
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=Path(settings.migrations.path) if settings.migrations.path else None,
+        help="the folder of the migrations (defaults to cypher/migrations).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only list the pending migrations.",
+    )
+    args = parser.parse_args()
+
+    setup_logger()
+    sys.exit(asyncio.run(main(args.path, args.dry_run)))
@@ -4,10 +4,26 @@ from ferrea.core.exceptions import FerreaBaseException
 class FerreaLibraryNotCreated(FerreaBaseException):
     """Creation of the Library on the db failed."""
 
-    pass
-
 
 class FerreaNonExistingLibrary(FerreaBaseException):
     """Operation on the library cannot be performed due to non existing library."""
 
-    pass
+
+class FerreaInvalidCursor(FerreaBaseException):
+    """The pagination cursor provided is not valid."""
+
+
+class FerreaInvalidBoundingBox(FerreaBaseException):
+    """The bounding box provided is not valid."""
+
+
+class FerreaInvalidFields(FerreaBaseException):
+    """The fields requested are not fields of the library."""
+
+
+class FerreaGeocodingError(FerreaBaseException):
+    """The geocoding service failed to geocode an address."""
+
+
+class FerreaMigrationError(FerreaBaseException):
+    """The schema migrations cannot be loaded or applied."""
@@ -0,0 +1,49 @@
+from typing import Self
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class Coordinates(BaseModel):
+    """Geographic coordinates (WGS-84) of an address."""
+
+    model_config = ConfigDict(frozen=True)
+
+    latitude: float
+    longitude: float
+
+
+class BoundingBox(BaseModel):
+    """
+    Rectangle of geographic coordinates (WGS-84), e.g. a map viewport.
+    A min_longitude greater than max_longitude means the box crosses the antimeridian.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    min_longitude: float = Field(ge=-180, le=180)
+    min_latitude: float = Field(ge=-90, le=90)
+    max_longitude: float = Field(ge=-180, le=180)
+    max_latitude: float = Field(ge=-90, le=90)
+
+    @model_validator(mode="after")
+    def _check_latitudes(self) -> Self:
+        if self.min_latitude > self.max_latitude:
+            raise ValueError("min_latitude must not be greater than max_latitude.")
+        return self
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        """
+        Check if a point falls inside the box (borders included).
+
+        Args:
+            latitude (float): the latitude of the point.
+            longitude (float): the longitude of the point.
+
+        Returns:
+            bool: True if the point is inside the box.
+        """
+        if not self.min_latitude <= latitude <= self.max_latitude:
+            return False
+        if self.min_longitude <= self.max_longitude:
+            return self.min_longitude <= longitude <= self.max_longitude
+        return longitude >= self.min_longitude or longitude <= self.max_longitude
@@ -1,5 +1,9 @@
-from pydantic import BaseModel, EmailStr
-from pydantic_extra_types.phone_numbers import PhoneNumber
+from enum import StrEnum, auto
+from typing import Any, Self
+
+from pydantic import BaseModel, EmailStr, Field
+
+from models.phone import PhoneNumber
 
 
 class Library(BaseModel):
@@ -12,3 +16,101 @@ class Library(BaseModel):
     email: EmailStr | None = None
     latitude: float | None = None
     longitude: float | None = None
+    location_pending: bool = False
+    # increased on every write, it's the source of the ETag (never serialized).
+    version: int = Field(default=0, exclude=True)
+
+    @classmethod
+    def from_trusted(cls, data: dict[str, Any]) -> Self:
+        """
+        Build the model from data already validated, e.g. a node read back from the db,
+        skipping the validation (phone numbers and emails are not parsed again).
+        Keys that are not fields are dropped, missing fields get their default.
+
+        Args:
+            data (dict[str, Any]): the trusted data.
+
+        Returns:
+            Self: the model.
+        """
+        return cls.model_construct(**data)
+
+
+# the fields a caller can ask for (e.g. with a sparse fieldset).
+LIBRARY_FIELDS = frozenset(
+    name for name, field in Library.model_fields.items() if not field.exclude
+)
+
+
+class NearbyLibrary(Library):
+    """Library object representation, with its distance (in meters) from a point."""
+
+    distance: float
+
+
+class NearbyLibraryList(BaseModel):
+    """Response envelope for a list of libraries ordered by distance."""
+
+    items: int
+    result: list[NearbyLibrary]
+
+
+class ScoredLibrary(Library):
+    """Library object representation, with its relevance for a search."""
+
+    score: float
+
+
+class ScoredLibraryPage(BaseModel):
+    """A page of search results, with the cursor to the next one (if any)."""
+
+    libraries: list[ScoredLibrary]
+    next_cursor: str | None = None
+
+
+class ScoredLibraryList(BaseModel):
+    """Response envelope for a list of libraries ordered by relevance."""
+
+    items: int
+    result: list[ScoredLibrary]
+    next_cursor: str | None = None
+
+
+class LibraryPage(BaseModel):
+    """A page of libraries, with the cursor to the next one (if any)."""
+
+    libraries: list[Library]
+    next_cursor: str | None = None
+
+
+class LibraryList(BaseModel):
+    """Response envelope for a list of libraries."""
+
+    items: int
+    result: list[Library]
+    next_cursor: str | None = None
+
+
+class BatchStatus(StrEnum):
+    """Outcome of a single item of a batch."""
+
+    CREATED = auto()
+    UPDATED = auto()
+    INVALID = auto()
+    FAILED = auto()
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of a single item of a batch, by its position in the request."""
+
+    index: int
+    status: BatchStatus
+    library: Library | None = None
+    error: str | None = None
+
+
+class BatchResult(BaseModel):
+    """Response envelope for a batch of libraries."""
+
+    items: int
+    result: list[BatchItemResult]
@@ -0,0 +1,50 @@
+from typing import Any
+
+from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic_core import PydanticCustomError, core_schema
+
+
+class PhoneNumber(str):
+    """
+    Phone number in the international format, stored as RFC3966 (e.g. tel:+39-039-731269).
+
+    Same validation as pydantic_extra_types.phone_numbers.PhoneNumber, but phonenumbers
+    (and its metadata of every region) is imported on the first validation instead
+    of at import: most of the requests never validate a phone number.
+    """
+
+    @classmethod
+    def __get_pydantic_json_schema__(
+        cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler
+    ) -> dict[str, Any]:
+        json_schema = handler(schema)
+        json_schema.update({"format": "phone"})
+        return json_schema
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: type[Any], handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.with_info_after_validator_function(
+            cls._validate, core_schema.str_schema()
+        )
+
+    @classmethod
+    def _validate(cls, phone_number: str, _: core_schema.ValidationInfo) -> str:
+        """Helper method to parse a phone number, formatting it as RFC3966."""
+        import phonenumbers
+
+        try:
+            parsed = phonenumbers.parse(phone_number, None)
+        except phonenumbers.NumberParseException as e:
+            raise PydanticCustomError(
+                "value_error", "value is not a valid phone number"
+            ) from e
+        if not phonenumbers.is_valid_number(parsed):
+            raise PydanticCustomError(
+                "value_error", "value is not a valid phone number"
+            )
+
+        return phonenumbers.format_number(
+            parsed, phonenumbers.PhoneNumberFormat.RFC3966
+        )
@@ -18,6 +18,18 @@ class Entity(BaseModel):
     name: str
     status: HealthStatus
     internal_status: bool = Field(exclude=True)
+    # duration of the last check and seconds since then, for the entities checked in background.
+    latency: float | None = None
+    age: float | None = None
+
+
+class DatabaseHealth(BaseModel):
+    """Snapshot of the last background check of the db."""
+
+    healthy: bool
+    ready: bool
+    latency: float | None = None
+    age: float | None = None
 
 
 class HealthStatus(StrEnum):
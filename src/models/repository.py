@@ -1,10 +1,14 @@
+from collections.abc import AsyncIterator, Iterator
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
 from dataclasses import dataclass
-from typing import ContextManager, Protocol
+from typing import Protocol
 
 from ferrea.clients.db import DBClient
 from ferrea.core.context import Context
 
-from models.library import Library
+from adapters.database import AsyncDBClient
+from models.geocoding import BoundingBox
+from models.library import BatchItemResult, Library, NearbyLibrary, ScoredLibrary
 
 
 @dataclass
@@ -13,18 +17,73 @@ class RepositoryService(Protocol):
     This class it's just a protocol about the methods an Repository class should implement.
     """
 
-    db_client: ContextManager[DBClient]
+    db_client: AbstractContextManager[DBClient]
     context: Context
 
-    def find_all_libraries(self) -> list[Library]:
+    def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
         """
-        This method gets all libraries on the db.
+        This method gets all libraries on the db, ordered by their fid.
+
+        Args:
+            after (str | None, optional): only the libraries with a greater fid. Defaults to None.
+            limit (int | None, optional): the maximum number of libraries. Defaults to None.
+            bbox (BoundingBox | None, optional): only the libraries inside the box. Defaults to None.
+            fields (frozenset[str] | None, optional): only these properties are read
+                (plus the fid), the others are left to their default. Defaults to None (all).
 
         Returns:
             list[Library]: the list of all Libraries.
         """
         ...
 
+    def iter_all_libraries(self) -> Iterator[Library]:
+        """
+        This method streams all libraries on the db, ordered by their fid.
+
+        Yields:
+            Iterator[Library]: the libraries.
+        """
+        ...
+
+    def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
+        """
+        This method gets the libraries within a radius from a point, the nearest first.
+
+        Args:
+            latitude (float): the latitude of the point.
+            longitude (float): the longitude of the point.
+            radius (float): the maximum distance from the point, in meters.
+            limit (int): the maximum number of libraries.
+
+        Returns:
+            list[NearbyLibrary]: the libraries, ordered by distance.
+        """
+        ...
+
+    def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        """
+        This method searches the libraries by name and address, the most relevant first.
+
+        Args:
+            text (str): the text to search.
+            offset (int): the number of results to skip.
+            limit (int): the maximum number of libraries.
+
+        Returns:
+            list[ScoredLibrary]: the libraries, ordered by relevance.
+        """
+        ...
+
     def find_a_library_by_fid(self, fid: str) -> Library:
         """
         This method search for the desired library on the db.
@@ -40,6 +99,15 @@ class RepositoryService(Protocol):
         """
         ...
 
+    def get_collection_version(self) -> int:
+        """
+        This method gets the version of the libraries collection, increased on every write.
+
+        Returns:
+            int: the version of the collection.
+        """
+        ...
+
     def create_library(self, data: Library) -> Library:
         """
         This method creates a library on the db.
@@ -52,6 +120,18 @@ class RepositoryService(Protocol):
         """
         ...
 
+    def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        """
+        This method creates (or updates, if matching on name and address) many libraries.
+
+        Args:
+            libraries (list[Library]): the data of the libraries.
+
+        Returns:
+            list[BatchItemResult]: the outcome of each library, by its position.
+        """
+        ...
+
     def update_library(self, fid: str, new_value: Library) -> Library:
         """
         This method updates an existing library on the db, based on its fid (Ferrea ID).
@@ -81,3 +161,155 @@ class RepositoryService(Protocol):
             Library: the deleted library.
         """
         ...
+
+
+@dataclass
+class AsyncRepositoryService(Protocol):
+    """
+    This class it's just a protocol about the methods an async Repository class should implement.
+    """
+
+    db_client: AbstractAsyncContextManager[AsyncDBClient]
+    context: Context
+
+    async def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
+        """
+        This method gets all libraries on the db, ordered by their fid.
+
+        Args:
+            after (str | None, optional): only the libraries with a greater fid. Defaults to None.
+            limit (int | None, optional): the maximum number of libraries. Defaults to None.
+            bbox (BoundingBox | None, optional): only the libraries inside the box. Defaults to None.
+            fields (frozenset[str] | None, optional): only these properties are read
+                (plus the fid), the others are left to their default. Defaults to None (all).
+
+        Returns:
+            list[Library]: the list of all Libraries.
+        """
+        ...
+
+    def iter_all_libraries(self) -> AsyncIterator[Library]:
+        """
+        This method streams all libraries on the db, ordered by their fid.
+
+        Yields:
+            AsyncIterator[Library]: the libraries.
+        """
+        ...
+
+    async def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
+        """
+        This method gets the libraries within a radius from a point, the nearest first.
+
+        Args:
+            latitude (float): the latitude of the point.
+            longitude (float): the longitude of the point.
+            radius (float): the maximum distance from the point, in meters.
+            limit (int): the maximum number of libraries.
+
+        Returns:
+            list[NearbyLibrary]: the libraries, ordered by distance.
+        """
+        ...
+
+    async def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        """
+        This method searches the libraries by name and address, the most relevant first.
+
+        Args:
+            text (str): the text to search.
+            offset (int): the number of results to skip.
+            limit (int): the maximum number of libraries.
+
+        Returns:
+            list[ScoredLibrary]: the libraries, ordered by relevance.
+        """
+        ...
+
+    async def find_a_library_by_fid(self, fid: str) -> Library:
+        """
+        This method search for the desired library on the db.
+
+        Args:
+            fid (str): the ferreaID of the object.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the found library.
+        """
+        ...
+
+    async def get_collection_version(self) -> int:
+        """
+        This method gets the version of the libraries collection, increased on every write.
+
+        Returns:
+            int: the version of the collection.
+        """
+        ...
+
+    async def create_library(self, data: Library) -> Library:
+        """
+        This method creates a library on the db.
+
+        Args:
+            data (Library): the data of the library to create.
+
+        Returns:
+            Library: the created library.
+        """
+        ...
+
+    async def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        """
+        This method creates (or updates, if matching on name and address) many libraries.
+
+        Args:
+            libraries (list[Library]): the data of the libraries.
+
+        Returns:
+            list[BatchItemResult]: the outcome of each library, by its position.
+        """
+        ...
+
+    async def update_library(self, fid: str, new_value: Library) -> Library:
+        """
+        This method updates an existing library on the db, based on its fid (Ferrea ID).
+
+        Args:
+            fid (str): the ferreaID of the object.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the updated library.
+        """
+        ...
+
+    async def delete_library(self, fid: str) -> Library:
+        """
+        This method deltes an existing library from the db, based on its fid (Ferrea ID).
+
+        Args:
+            fid (str): the ferreaID of the object.
+
+        Raises:
+            FerreaNonExistingLibrary: if library is not found and operation cannot be carried on.
+
+        Returns:
+            Library: the deleted library.
+        """
+        ...
@@ -0,0 +1,47 @@
+from pydantic import BaseModel, computed_field
+
+
+class CacheStats(BaseModel):
+    """Counters of a cache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def hit_ratio(self) -> float:
+        """Ratio of the lookups served by the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class GeocodingStats(BaseModel):
+    """Counters of the geocoding layer."""
+
+    memory: CacheStats
+    disk_hits: int
+    disk_misses: int
+    negative_hits: int
+    upstream_calls: int
+    upstream_errors: int
+
+
+class GeocodingQueueStats(BaseModel):
+    """Counters of the background geocoding worker."""
+
+    depth: int
+    oldest_job_age: float
+    last_lag: float
+    processed: int
+    retried: int
+    failed: int
+
+
+class Stats(BaseModel):
+    """Overall internal counters of the webserver."""
+
+    geocoding: GeocodingStats
+    geocoding_queue: GeocodingQueueStats | None = None
+    library_cache: CacheStats | None = None
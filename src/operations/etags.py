@@ -0,0 +1,64 @@
+from models.library import Library
+
+
+def library_etag(library: Library) -> str:
+    """Build the strong ETag of a library, from its fid and version.
+
+    Args:
+        library (Library): the library.
+
+    Returns:
+        str: the quoted ETag.
+    """
+    return f'"{library.fid}-{library.version}"'
+
+
+def collection_etag(version: int, fields: frozenset[str] | None = None) -> str:
+    """Build the strong ETag of the libraries collection, from its version.
+    A sparse fieldset is a different representation, so it gets a different ETag.
+
+    Args:
+        version (int): the version of the collection.
+        fields (frozenset[str] | None, optional): the fields requested. Defaults to None (all).
+
+    Returns:
+        str: the quoted ETag.
+    """
+    if fields is not None:
+        return f'"libraries-{version}-{"+".join(sorted(fields))}"'
+    return f'"libraries-{version}"'
+
+
+def representation_etag(etag: str, representation: str | None) -> str:
+    """Build the ETag of another representation (e.g. MessagePack) of the same data.
+    Representations have different bytes, so they get different strong ETags.
+
+    Args:
+        etag (str): the quoted ETag of the default representation (JSON).
+        representation (str | None): the name of the representation, None for the default one.
+
+    Returns:
+        str: the quoted ETag.
+    """
+    if representation is None:
+        return etag
+    return f'{etag[:-1]}-{representation}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against the current ETag (weak comparison, RFC 9110).
+
+    Args:
+        if_none_match (str | None): the value of the If-None-Match header, if any.
+        etag (str): the current ETag.
+
+    Returns:
+        bool: True if the client copy is still valid (and a 304 can be returned).
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = (x.strip().removeprefix("W/") for x in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
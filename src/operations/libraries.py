@@ -1,58 +1,300 @@
-from models.exceptions import FerreaNonExistingLibrary
-from models.library import Library
-from models.repository import RepositoryService
+from collections.abc import AsyncGenerator
+from typing import Any
 
+from pydantic import ValidationError
 
-def get_all_libraries(repository: RepositoryService) -> list[Library]:
+from models.exceptions import (
+    FerreaInvalidBoundingBox,
+    FerreaInvalidFields,
+    FerreaNonExistingLibrary,
+)
+from models.geocoding import BoundingBox
+from models.library import (
+    LIBRARY_FIELDS,
+    BatchItemResult,
+    BatchStatus,
+    Library,
+    LibraryPage,
+    NearbyLibrary,
+    ScoredLibraryPage,
+)
+from models.repository import AsyncRepositoryService
+from operations.pagination import (
+    decode_cursor,
+    decode_offset_cursor,
+    encode_cursor,
+    encode_offset_cursor,
+)
+
+MAX_BATCH_SIZE = 1000
+
+
+async def get_all_libraries(repository: AsyncRepositoryService) -> list[Library]:
     """Get all libraries stored in the repository.
 
     Args:
-        repository (RepositoryService): the repository instance.
+        repository (AsyncRepositoryService): the repository instance.
 
     Returns:
         list[Library]: the list of all libraries in the repository.
     """
-    return repository.find_all_libraries()
+    return await repository.find_all_libraries()
+
+
+def parse_bbox(raw_bbox: str) -> BoundingBox:
+    """Parse a bounding box in the minLon,minLat,maxLon,maxLat form.
+
+    Args:
+        raw_bbox (str): the bounding box, as received in the query string.
+
+    Raises:
+        FerreaInvalidBoundingBox: if the bounding box is not valid.
+
+    Returns:
+        BoundingBox: the bounding box.
+    """
+    values = raw_bbox.split(",")
+    if len(values) != 4:
+        raise FerreaInvalidBoundingBox(
+            f"Invalid bbox {raw_bbox}, expected minLon,minLat,maxLon,maxLat."
+        )
+
+    try:
+        return BoundingBox(
+            min_longitude=values[0],  # type: ignore
+            min_latitude=values[1],  # type: ignore
+            max_longitude=values[2],  # type: ignore
+            max_latitude=values[3],  # type: ignore
+        )
+    except ValidationError as e:
+        raise FerreaInvalidBoundingBox(f"Invalid bbox {raw_bbox}.") from e
+
+
+def parse_fields(raw_fields: str) -> frozenset[str]:
+    """Parse a sparse fieldset, a comma separated list of fields of the library.
+
+    Args:
+        raw_fields (str): the fields, as received in the query string.
+
+    Raises:
+        FerreaInvalidFields: if no field is given or some are not fields of the library.
+
+    Returns:
+        frozenset[str]: the fields.
+    """
+    fields = frozenset(x.strip() for x in raw_fields.split(",") if x.strip())
+    if len(fields) == 0:
+        raise FerreaInvalidFields("No fields requested.")
+
+    unknown = fields - LIBRARY_FIELDS
+    if len(unknown) > 0:
+        raise FerreaInvalidFields(
+            f"Unknown fields {', '.join(sorted(unknown))}, "
+            f"expected some of {', '.join(sorted(LIBRARY_FIELDS))}."
+        )
+
+    return fields
+
+
+async def get_libraries_page(
+    repository: AsyncRepositoryService,
+    cursor: str | None,
+    limit: int,
+    bbox: BoundingBox | None = None,
+    fields: frozenset[str] | None = None,
+) -> LibraryPage:
+    """Get a page of the libraries stored in the repository, ordered by fid.
+
+    Args:
+        repository (AsyncRepositoryService): the repository instance.
+        cursor (str | None): the cursor returned with the previous page, None for the first one.
+        limit (int): the maximum number of libraries in the page.
+        bbox (BoundingBox | None, optional): only the libraries inside the box. Defaults to None.
+        fields (frozenset[str] | None, optional): only these fields are read
+            (plus the fid). Defaults to None (all).
+
+    Raises:
+        FerreaInvalidCursor: if the cursor is not valid.
+
+    Returns:
+        LibraryPage: the libraries of the page and the cursor to the next one.
+    """
+    after = decode_cursor(cursor) if cursor is not None else None
+    # one library more than requested, just to know if there's a next page.
+    libraries = await repository.find_all_libraries(
+        after=after, limit=limit + 1, bbox=bbox, fields=fields
+    )
+
+    if len(libraries) <= limit:
+        return LibraryPage(libraries=libraries)
+
+    libraries = libraries[:limit]
+    return LibraryPage(
+        libraries=libraries,
+        next_cursor=encode_cursor(str(libraries[-1].fid)),
+    )
+
+
+async def search_libraries(
+    repository: AsyncRepositoryService,
+    text: str,
+    cursor: str | None,
+    limit: int,
+) -> ScoredLibraryPage:
+    """Search the libraries by name and address, a page at a time, the most relevant first.
+
+    Args:
+        repository (AsyncRepositoryService): the repository instance.
+        text (str): the text to search.
+        cursor (str | None): the cursor returned with the previous page, None for the first one.
+        limit (int): the maximum number of libraries in the page.
 
+    Raises:
+        FerreaInvalidCursor: if the cursor is not valid.
 
-def get_library_by_fid(repository: RepositoryService, fid: str) -> Library | None:
+    Returns:
+        ScoredLibraryPage: the libraries of the page and the cursor to the next one.
+    """
+    offset = decode_offset_cursor(cursor) if cursor is not None else 0
+    # one library more than requested, just to know if there's a next page.
+    libraries = await repository.search_libraries(text, offset=offset, limit=limit + 1)
+
+    if len(libraries) <= limit:
+        return ScoredLibraryPage(libraries=libraries)
+
+    return ScoredLibraryPage(
+        libraries=libraries[:limit],
+        next_cursor=encode_offset_cursor(offset + limit),
+    )
+
+
+async def get_collection_version(repository: AsyncRepositoryService) -> int:
+    """Get the version of the libraries collection, increased on every write.
+
+    Args:
+        repository (AsyncRepositoryService): the repository instance.
+
+    Returns:
+        int: the version of the collection.
+    """
+    return await repository.get_collection_version()
+
+
+async def get_nearby_libraries(
+    repository: AsyncRepositoryService,
+    latitude: float,
+    longitude: float,
+    radius: float,
+    limit: int,
+) -> list[NearbyLibrary]:
+    """Get the libraries within a radius from a point, the nearest first.
+
+    Args:
+        repository (AsyncRepositoryService): the repository instance.
+        latitude (float): the latitude of the point.
+        longitude (float): the longitude of the point.
+        radius (float): the maximum distance from the point, in meters.
+        limit (int): the maximum number of libraries.
+
+    Returns:
+        list[NearbyLibrary]: the libraries, ordered by distance.
+    """
+    return await repository.find_nearby_libraries(latitude, longitude, radius, limit)
+
+
+async def stream_all_libraries(
+    repository: AsyncRepositoryService,
+) -> AsyncGenerator[Library, None]:
+    """Stream all libraries stored in the repository, without loading all of them.
+
+    Args:
+        repository (AsyncRepositoryService): the repository instance.
+
+    Yields:
+        AsyncGenerator[Library, None]: the libraries in the repository.
+    """
+    async for library in repository.iter_all_libraries():
+        yield library
+
+
+async def get_library_by_fid(
+    repository: AsyncRepositoryService, fid: str
+) -> Library | None:
     """Search for a specific library in the repository.
 
     Args:
-        repository (RepositoryService): the repository instance.
+        repository (AsyncRepositoryService): the repository instance.
         name (str): the name of the library.
 
         Returns:
             Library | None: the library found or None if not found.
     """
     try:
-        return repository.find_a_library_by_fid(fid)
+        return await repository.find_a_library_by_fid(fid)
     except FerreaNonExistingLibrary as _:
         return None
 
 
-def upsert_library(repository: RepositoryService, library: Library) -> Library:
+async def upsert_library(
+    repository: AsyncRepositoryService, library: Library
+) -> Library:
     """Created a new library or update an already existing one.
 
     Args:
-        repository (RepositoryService): the repository instance.
+        repository (AsyncRepositoryService): the repository instance.
         library (Library): the library data.
 
     Returns:
         Library: the created Library.
     """
-    return repository.create_library(library)
+    return await repository.create_library(library)
+
+
+async def upsert_libraries_batch(
+    repository: AsyncRepositoryService, items: list[dict[str, Any]]
+) -> list[BatchItemResult]:
+    """Create or update many libraries at once, validating each of them on its own.
+
+    Args:
+        repository (AsyncRepositoryService): the repository instance.
+        items (list[dict[str, Any]]): the libraries data, as received.
+
+    Returns:
+        list[BatchItemResult]: the outcome of each item, by its position.
+    """
+    results: list[BatchItemResult] = []
+    valid: list[tuple[int, Library]] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, Library.model_validate(item)))
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(str(x) for x in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+            results.append(
+                BatchItemResult(index=index, status=BatchStatus.INVALID, error=error)
+            )
+
+    if len(valid) > 0:
+        written = await repository.upsert_libraries([library for _, library in valid])
+        for result in written:
+            # back to the position in the request.
+            result.index = valid[result.index][0]
+        results.extend(written)
+
+    return sorted(results, key=lambda x: x.index)
 
 
-def update_library(
-    repository: RepositoryService,
+async def update_library(
+    repository: AsyncRepositoryService,
     fid: str,
     new_library: Library,
 ) -> Library | None:
     """Update an already existing library.
 
     Args:
-        repository (RepositoryService): the repository instance.
+        repository (AsyncRepositoryService): the repository instance.
         fid (str): the object fid (ferrea id)
         library (Library): the library data.
 
@@ -60,19 +302,19 @@ def update_library(
         Library | None: the updatedlibrary or None if not found.
     """
     try:
-        return repository.update_library(fid, new_library)
+        return await repository.update_library(fid, new_library)
     except FerreaNonExistingLibrary as _:
         return None
 
 
-def delete_library(
-    repository: RepositoryService,
+async def delete_library(
+    repository: AsyncRepositoryService,
     fid: str,
 ) -> Library | None:
     """Deletes an already existing library.
 
     Args:
-        repository (RepositoryService): the repository instance.
+        repository (AsyncRepositoryService): the repository instance.
         fid (str): the object fid (ferrea id)
         library (Library): the library data.
 
@@ -80,6 +322,6 @@ def delete_library(
         Library | None: the deleted or None if not found.
     """
     try:
-        return repository.delete_library(fid)
+        return await repository.delete_library(fid)
     except FerreaNonExistingLibrary as _:
         return None
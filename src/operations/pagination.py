@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from typing import Any
+
+from models.exceptions import FerreaInvalidCursor
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode(position: dict[str, Any]) -> str:
+    """Helper function to turn a position into an opaque cursor."""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str, key: str, kind: type) -> Any:
+    """Helper function to read a key of the position in a cursor, checking its type."""
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + padding))[key]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise FerreaInvalidCursor(f"Invalid cursor {cursor}.") from e
+
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise FerreaInvalidCursor(f"Invalid cursor {cursor}.")
+    return value
+
+
+def encode_cursor(fid: str) -> str:
+    """Build the opaque cursor pointing after the given library.
+
+    Args:
+        fid (str): the fid (ferrea id) of the last library of the page.
+
+    Returns:
+        str: the opaque cursor.
+    """
+    return _encode({"fid": fid})
+
+
+def decode_cursor(cursor: str) -> str:
+    """Read the fid the cursor points after.
+
+    Args:
+        cursor (str): the opaque cursor.
+
+    Raises:
+        FerreaInvalidCursor: if the cursor has not been built by encode_cursor.
+
+    Returns:
+        str: the fid (ferrea id) of the last library of the previous page.
+    """
+    return _decode(cursor, "fid", str)
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """Build the opaque cursor pointing at a position of results ranked by relevance.
+
+    Args:
+        offset (int): the number of results already returned.
+
+    Returns:
+        str: the opaque cursor.
+    """
+    return _encode({"offset": offset})
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    """Read the position the cursor points at.
+
+    Args:
+        cursor (str): the opaque cursor.
+
+    Raises:
+        FerreaInvalidCursor: if the cursor has not been built by encode_offset_cursor.
+
+    Returns:
+        int: the number of results already returned.
+    """
+    offset = _decode(cursor, "offset", int)
+    if offset < 0:
+        raise FerreaInvalidCursor(f"Invalid cursor {cursor}.")
+    return offset
@@ -1,35 +1,38 @@
-from ferrea.clients.db import DBClient
-from ferrea.observability.logs import ferrea_logger
-
+from adapters.cached_libraries import LibraryCache
+from adapters.geocoding import get_geocoder
+from adapters.geocoding_worker import GeocodingWorker
+from adapters.health import DatabaseHealthChecker
+from adapters.metrics import METRICS, Counter, Gauge, Metric, render
 from models.probes import Entity, HealthProbe, HealthStatus
+from models.stats import CacheStats, Stats
 
 
-def check_health(db_client: DBClient) -> HealthProbe:
-    """From all the registered datasources, try to fetch the data.
+def check_health(health_checker: DatabaseHealthChecker) -> HealthProbe:
+    """From all the registered datasources, read the outcome of their last check.
+    Datasources are checked in background: the probe never waits for them.
 
     Args:
-        db_client (DBClient): the db client.
+        health_checker (DatabaseHealthChecker): the background checker of the db.
 
     Returns:
         HealthProbe: the health probe instance.
     """
-    entities: list[Entity] = list()
-
-    try:
-        db_healthy = db_client.verify_connectivity()
-    except Exception as e:
-        ferrea_logger.error(f"Unable to connect to db due to {e}.")
-        db_healthy = False
+    entities: list[Entity] = []
 
+    db_health = health_checker.snapshot
     entities.append(
         Entity(
             name="database",
-            status=(HealthStatus.HEALTHY if db_healthy else HealthStatus.UNHEALTHY),
-            internal_status=db_healthy,
+            status=(
+                HealthStatus.HEALTHY if db_health.healthy else HealthStatus.UNHEALTHY
+            ),
+            internal_status=db_health.healthy,
+            latency=db_health.latency,
+            age=db_health.age,
         )
     )
 
-    if all([x.internal_status for x in entities]):
+    if all(x.internal_status for x in entities):
         status = HealthStatus.HEALTHY
     else:
         status = HealthStatus.UNHEALTHY
@@ -37,13 +40,16 @@ def check_health(db_client: DBClient) -> HealthProbe:
     return HealthProbe(status=status, entities=entities)
 
 
-def check_readiness() -> HealthProbe:
-    """Just return if the web server is running.
+def check_readiness(health_checker: DatabaseHealthChecker) -> HealthProbe:
+    """Return if the web server is running and the db has been reached (with a warm pool).
+
+    Args:
+        health_checker (DatabaseHealthChecker): the background checker of the db.
 
     Returns:
         HealthProbe: the health probe instance.
     """
-    entities: list[Entity] = list()
+    entities: list[Entity] = []
 
     entities.append(
         Entity(
@@ -52,6 +58,101 @@ def check_readiness() -> HealthProbe:
             internal_status=True,
         )
     )
-    status = HealthStatus.HEALTHY
+    db_ready = health_checker.snapshot.ready
+    entities.append(
+        Entity(
+            name="database",
+            status=HealthStatus.HEALTHY if db_ready else HealthStatus.UNHEALTHY,
+            internal_status=db_ready,
+        )
+    )
+
+    if all(x.internal_status for x in entities):
+        status = HealthStatus.HEALTHY
+    else:
+        status = HealthStatus.UNHEALTHY
 
     return HealthProbe(status=status, entities=entities)
+
+
+def collect_stats(
+    geocoding_worker: GeocodingWorker | None, library_cache: LibraryCache | None
+) -> Stats:
+    """Collect the internal counters of the webserver (e.g. the caches).
+
+    Args:
+        geocoding_worker (GeocodingWorker | None): the background geocoding worker, if any.
+        library_cache (LibraryCache | None): the cache of the libraries, if any.
+
+    Returns:
+        Stats: the counters.
+    """
+    return Stats(
+        geocoding=get_geocoder().stats,
+        geocoding_queue=(
+            geocoding_worker.stats if geocoding_worker is not None else None
+        ),
+        library_cache=library_cache.stats if library_cache is not None else None,
+    )
+
+
+def collect_metrics(
+    geocoding_worker: GeocodingWorker | None, library_cache: LibraryCache | None
+) -> str:
+    """Render the metrics of the webserver for Prometheus.
+    Requests, queries and geocoding are observed while serving, the counters of
+    the caches and of the geocoding layer are read now.
+
+    Args:
+        geocoding_worker (GeocodingWorker | None): the background geocoding worker, if any.
+        library_cache (LibraryCache | None): the cache of the libraries, if any.
+
+    Returns:
+        str: the metrics, in the Prometheus text format.
+    """
+    stats = collect_stats(geocoding_worker, library_cache)
+
+    caches: dict[str, CacheStats] = {"geocoding": stats.geocoding.memory}
+    if stats.library_cache is not None:
+        caches["libraries"] = stats.library_cache
+
+    hits = Counter("ferrea_cache_hits_total", "Lookups served by a cache.", ("cache",))
+    misses = Counter(
+        "ferrea_cache_misses_total", "Lookups missing a cache.", ("cache",)
+    )
+    evictions = Counter(
+        "ferrea_cache_evictions_total", "Entries evicted from a cache.", ("cache",)
+    )
+    size = Gauge("ferrea_cache_size", "Entries stored in a cache.", ("cache",))
+    for name, cache in caches.items():
+        hits.inc(name, amount=cache.hits)
+        misses.inc(name, amount=cache.misses)
+        evictions.inc(name, amount=cache.evictions)
+        size.set(name, value=cache.size)
+
+    upstream_calls = Counter(
+        "ferrea_geocoder_requests_total", "Calls to Nominatim (cache misses only)."
+    )
+    upstream_calls.inc(amount=stats.geocoding.upstream_calls)
+    upstream_errors = Counter(
+        "ferrea_geocoder_failures_total", "Calls to Nominatim that failed."
+    )
+    upstream_errors.inc(amount=stats.geocoding.upstream_errors)
+
+    metrics: list[Metric] = [
+        *METRICS,
+        hits,
+        misses,
+        evictions,
+        size,
+        upstream_calls,
+        upstream_errors,
+    ]
+    if stats.geocoding_queue is not None:
+        depth = Gauge(
+            "ferrea_geocoding_queue_depth", "Libraries waiting for geocoding."
+        )
+        depth.set(value=stats.geocoding_queue.depth)
+        metrics.append(depth)
+
+    return render(metrics)
@@ -1,39 +1,17 @@
 from typing import Annotated
 
 from fastapi import Depends, Request
-from ferrea.clients.db import ConnectionSettings, DBClient, Neo4jClient
 from ferrea.core.context import Context
 from ferrea.core.header import FERRA_CORRELATION_HEADER, get_correlation_id
 
+from adapters.cached_libraries import CachedLibrariesRepository, LibraryCache
+from adapters.coalesced_libraries import CoalescedLibrariesRepository, ReadKey
+from adapters.database import AsyncDBClient, AsyncNeo4jPool
 from adapters.libraries import LibrariesRepository
+from adapters.profiling import ProfiledSession, QueryProfiler
+from adapters.single_flight import SingleFlight
 from configs.config import settings
-from models.repository import RepositoryService
-
-
-def _build_db_connection() -> DBClient:
-    """
-    This function just returns the instance of the db object.
-    Needed a funcion for the "Depends" on fastapi.
-
-    Returns:
-        type[DBClient]: an instance that matches the DBClient protocol.
-    """
-    db_conf = settings.database
-    if db_conf.database is None:
-        connection_settings = ConnectionSettings(
-            db_conf.uri,
-            db_conf.username,
-            db_conf.password,
-        )
-    else:
-        connection_settings = ConnectionSettings(
-            db_conf.uri,
-            db_conf.username,
-            db_conf.password,
-            db_conf.database,
-        )
-
-    return Neo4jClient(connection_settings=connection_settings)
+from models.repository import AsyncRepositoryService
 
 
 async def build_context(request: Request) -> Context:
@@ -51,17 +29,60 @@ async def build_context(request: Request) -> Context:
     return Context(str(correlation_id), settings.ferrea_app.name)
 
 
+def _build_db_connection(
+    request: Request, context: Annotated[Context, Depends(build_context)]
+) -> AsyncDBClient:
+    """
+    This function returns a client bound to the process wide connection pool,
+    profiling its queries (tagged with the correlation id) if enabled.
+    Needed a funcion for the "Depends" on fastapi.
+
+    Args:
+        request (Request): the HTTP Request.
+        context (Annotated[Context, Depends): the context of the request.
+
+    Returns:
+        AsyncDBClient: an instance that matches the AsyncDBClient protocol.
+    """
+    db_pool: AsyncNeo4jPool = request.app.state.db_pool
+    query_profiler: QueryProfiler | None = request.app.state.query_profiler
+
+    if query_profiler is None:
+        return db_pool.session()
+    return ProfiledSession(
+        session=db_pool.session(), profiler=query_profiler, context=context
+    )
+
+
 async def build_repository(
+    request: Request,
     context: Annotated[Context, Depends(build_context)],
-    db_client: Annotated[DBClient, Depends(_build_db_connection)],
-) -> RepositoryService:
+    db_client: Annotated[AsyncDBClient, Depends(_build_db_connection)],
+) -> AsyncRepositoryService:
     """Build the repository object from the context and the db client.
 
     Args:
+        request (Request): the HTTP Request.
         context (Annotated[Context, Depends): the context of the request.
-        db_client (Annotated[DBClient, Depends): the client to interact with the database.
+        db_client (Annotated[AsyncDBClient, Depends): the client to interact with the database.
 
     Returns:
-        RepositoryService: the implementation of the repository.
+        AsyncRepositoryService: the implementation of the repository.
     """
-    return LibrariesRepository(db_client=db_client, context=context)
+    repository: AsyncRepositoryService = LibrariesRepository(
+        db_client=db_client,
+        context=context,
+        geocoding_worker=request.app.state.geocoding_worker,
+    )
+
+    # the cache first: only its misses are coalesced.
+    read_flights: SingleFlight[ReadKey] | None = request.app.state.read_flights
+    if read_flights is not None:
+        repository = CoalescedLibrariesRepository(
+            repository=repository, flights=read_flights
+        )
+
+    library_cache: LibraryCache | None = request.app.state.library_cache
+    if library_cache is None:
+        return repository
+    return CachedLibrariesRepository(repository=repository, cache=library_cache)
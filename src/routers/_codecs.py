@@ -0,0 +1,176 @@
+import json
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+import cbor2
+import msgpack
+import zstandard
+
+
+@dataclass(frozen=True)
+class Codec:
+    """A representation of the bodies: its media type, how to encode and how to decode it."""
+
+    name: str
+    media_type: str
+    # from and to python objects made only of JSON types.
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+JSON = Codec(
+    name="json",
+    media_type="application/json",
+    encode=lambda content: json.dumps(content, separators=(",", ":")).encode(),
+    decode=json.loads,
+)
+
+# the supported representations, the preferred first (JSON is the default one).
+CODECS: list[Codec] = [
+    JSON,
+    Codec(
+        name="msgpack",
+        media_type="application/msgpack",
+        encode=msgpack.packb,
+        decode=msgpack.unpackb,
+    ),
+    Codec(
+        name="cbor",
+        media_type="application/cbor",
+        encode=cbor2.dumps,
+        decode=cbor2.loads,
+    ),
+]
+
+# media types still in use for the same formats, accepted in requests.
+_ALIASES = {"application/x-msgpack": "application/msgpack"}
+
+
+class Compressor(Protocol):
+    """Incremental compressor (e.g. zlib.compressobj)."""
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self, mode: int = ..., /) -> bytes: ...
+
+
+@dataclass(frozen=True)
+class ContentEncoding:
+    """A compression of the bodies: its token (for Content-Encoding) and its compressor."""
+
+    name: str
+    compressor: Callable[[int], Compressor]
+    # flush mode sending all the data compressed so far, without ending the body.
+    sync_flush: int
+
+
+GZIP = ContentEncoding(
+    name="gzip",
+    compressor=lambda level: zlib.compressobj(
+        level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    ),
+    sync_flush=zlib.Z_SYNC_FLUSH,
+)
+
+ZSTD = ContentEncoding(
+    name="zstd",
+    compressor=lambda level: zstandard.ZstdCompressor(level=level).compressobj(),
+    sync_flush=zstandard.COMPRESSOBJ_FLUSH_BLOCK,
+)
+
+# the supported encodings, the preferred first.
+ENCODINGS: list[ContentEncoding] = [ZSTD, GZIP]
+
+
+def _parse_qlist(header: str) -> list[tuple[str, float]]:
+    """Helper function to parse a header made of values with a q parameter (e.g. Accept)."""
+    values = []
+    for item in header.split(","):
+        value, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, raw = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(raw)
+                except ValueError:
+                    quality = 0.0
+        if value:
+            values.append((value.lower(), quality))
+    return values
+
+
+def _media_type_quality(accepted: dict[str, float], media_type: str) -> float:
+    """Helper function for the quality of a media type: the one of its most specific range."""
+    for media_range in (media_type, f"{media_type.split('/')[0]}/*", "*/*"):
+        if media_range in accepted:
+            return accepted[media_range]
+    return 0.0
+
+
+def negotiate_codec(accept: str | None) -> Codec:
+    """
+    Pick the representation of a response from the Accept header of the request.
+
+    Args:
+        accept (str | None): the Accept header, if any.
+
+    Returns:
+        Codec: the acceptable codec with the highest quality (ties go to the preferred one),
+            JSON if none is acceptable.
+    """
+    if accept is None:
+        return JSON
+
+    accepted = dict(_parse_qlist(accept))
+    quality, codec = max(
+        ((_media_type_quality(accepted, codec.media_type), codec) for codec in CODECS),
+        key=lambda x: x[0],
+    )
+    return codec if quality > 0 else JSON
+
+
+def request_codec(content_type: str | None) -> Codec | None:
+    """
+    Find the codec of a request body from its Content-Type header.
+
+    Args:
+        content_type (str | None): the Content-Type header, if any.
+
+    Returns:
+        Codec | None: the codec, None if the body is not of a supported binary format.
+    """
+    if content_type is None:
+        return None
+
+    media_type = content_type.split(";")[0].strip().lower()
+    media_type = _ALIASES.get(media_type, media_type)
+    for codec in CODECS:
+        if codec is not JSON and codec.media_type == media_type:
+            return codec
+    return None
+
+
+def negotiate_encoding(accept_encoding: str | None) -> ContentEncoding | None:
+    """
+    Pick the compression of a response from the Accept-Encoding header of the request.
+
+    Args:
+        accept_encoding (str | None): the Accept-Encoding header, if any.
+
+    Returns:
+        ContentEncoding | None: the acceptable encoding with the highest quality
+            (ties go to the preferred one), None to send the body as it is.
+    """
+    if accept_encoding is None:
+        return None
+
+    accepted = dict(_parse_qlist(accept_encoding))
+    wildcard = accepted.get("*", 0.0)
+    quality, encoding = max(
+        ((accepted.get(encoding.name, wildcard), encoding) for encoding in ENCODINGS),
+        key=lambda x: x[0],
+    )
+    return encoding if quality > 0 else None
@@ -0,0 +1,148 @@
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from adapters.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+from configs.config import Compression
+
+from ._codecs import Compressor, ContentEncoding, negotiate_encoding
+
+# route label of the requests not matching any route (e.g. 404s on random paths).
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware observing the duration of every HTTP request, until the
+    last byte of the body is sent, and the requests in flight.
+
+    Routes are labelled by their template (e.g. /api/v1/libraries/{fid}), so that
+    the number of series does not grow with the fids.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                getattr(route, "path", UNMATCHED_ROUTE),
+                scope["method"],
+                str(status_code),
+            )
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing the response bodies (zstd or gzip)
+    as negotiated through Accept-Encoding.
+
+    Bodies sent at once are compressed only above the minimum size, streamed ones
+    always (their size is not known upfront), chunk by chunk: each chunk is flushed,
+    so that the client gets it as soon as it's sent (e.g. the first line of an export).
+    A compressed body is another representation: its strong ETag becomes weak.
+    """
+
+    def __init__(self, app: ASGIApp, settings: Compression) -> None:
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: Compressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough or message["type"] not in (
+                "http.response.start",
+                "http.response.body",
+            ):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # held until the first chunk of the body tells whether to compress.
+                start = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                assert start is not None
+                headers = MutableHeaders(raw=start["headers"])
+                if "content-encoding" in headers or (
+                    not more_body
+                    and (len(body) == 0 or len(body) < self.settings.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                level = (
+                    self.settings.zstd_level
+                    if encoding.name == "zstd"
+                    else self.settings.gzip_level
+                )
+                compressor = encoding.compressor(level)
+                headers["Content-Encoding"] = encoding.name
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                del headers["content-length"]
+
+                body = self._compress(compressor, encoding, body, more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+            else:
+                body = self._compress(compressor, encoding, body, more_body)
+
+            # the empty chunks of a stream are not worth a message.
+            if body or not more_body:
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": more_body}
+                )
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compress(
+        compressor: Compressor, encoding: ContentEncoding, body: bytes, more_body: bool
+    ) -> bytes:
+        """Helper method to compress a chunk, flushing it (or ending the body if the last)."""
+        if not more_body:
+            return compressor.compress(body) + compressor.flush()
+        if len(body) == 0:
+            return b""
+        return compressor.compress(body) + compressor.flush(encoding.sync_flush)
@@ -0,0 +1,42 @@
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.types import Receive, Scope
+
+from ._codecs import JSON, Codec, request_codec
+
+
+class DecodedRequest(Request):
+    """
+    Request whose body is of a binary format (e.g. MessagePack), handed over to fastapi
+    as JSON: fastapi parses only JSON bodies, the decoded content is the same.
+    A body that cannot be decoded is a 400, as for malformed JSON.
+    """
+
+    def __init__(self, scope: Scope, receive: Receive, codec: Codec) -> None:
+        headers = [(k, v) for k, v in scope["headers"] if k != b"content-type"]
+        headers.append((b"content-type", JSON.media_type.encode()))
+        super().__init__({**scope, "headers": headers}, receive)
+        self._codec = codec
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = self._codec.decode(await self.body())
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """Route accepting the bodies of every supported codec, besides JSON."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            codec = request_codec(request.headers.get("content-type"))
+            if codec is not None:
+                request = DecodedRequest(request.scope, request.receive, codec)
+            return await handler(request)
+
+        return route_handler
@@ -0,0 +1,95 @@
+from collections.abc import Mapping
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from ._codecs import JSON, Codec
+
+PROBLEM_JSON = "application/problem+json"
+
+# the fields to leave out: a set, or a dict for the nested ones (e.g. {"result": {"__all__": ...}}).
+Exclude = set[str] | dict[str, Any]
+
+
+def to_json(
+    model: BaseModel, by_alias: bool = True, exclude: Exclude | None = None
+) -> bytes:
+    """Serialize a pydantic model straight to JSON bytes through pydantic-core.
+
+    Args:
+        model (BaseModel): the model to serialize.
+        by_alias (bool, optional): whether to use the field aliases. Defaults to True.
+        exclude (Exclude | None, optional): the fields to leave out. Defaults to None.
+
+    Returns:
+        bytes: the JSON document.
+    """
+    return model.__pydantic_serializer__.to_json(
+        model, by_alias=by_alias, exclude=exclude
+    )
+
+
+def encode(
+    model: BaseModel,
+    codec: Codec = JSON,
+    by_alias: bool = True,
+    exclude: Exclude | None = None,
+) -> bytes:
+    """Serialize a pydantic model in the representation of a codec.
+
+    Args:
+        model (BaseModel): the model to serialize.
+        codec (Codec, optional): the representation. Defaults to JSON.
+        by_alias (bool, optional): whether to use the field aliases. Defaults to True.
+        exclude (Exclude | None, optional): the fields to leave out. Defaults to None.
+
+    Returns:
+        bytes: the body.
+    """
+    if codec is JSON:
+        return to_json(model, by_alias=by_alias, exclude=exclude)
+
+    content = model.__pydantic_serializer__.to_python(
+        model, mode="json", by_alias=by_alias, exclude=exclude
+    )
+    return codec.encode(content)
+
+
+class ModelResponse(Response):
+    """
+    Response for pydantic models, JSON unless another codec is given (e.g. MessagePack).
+
+    The JSON body is the one produced by pydantic-core, written as is: no round trip
+    through python objects and no second encoding by the json module.
+    """
+
+    media_type = JSON.media_type
+
+    def __init__(
+        self,
+        content: BaseModel,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+        by_alias: bool = True,
+        exclude: Exclude | None = None,
+        codec: Codec = JSON,
+    ) -> None:
+        self._by_alias = by_alias
+        self._exclude = exclude
+        self._codec = codec
+        super().__init__(
+            content,
+            status_code,
+            headers,
+            media_type if media_type is not None else codec.media_type,
+            background,
+        )
+
+    def render(self, content: Any) -> bytes:
+        return encode(
+            content, codec=self._codec, by_alias=self._by_alias, exclude=self._exclude
+        )
@@ -1,27 +1,63 @@
-import json
+from collections.abc import AsyncIterator
+from functools import cached_property
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Body, Depends, Header, Query, Request, status
 from fastapi_utils.cbv import cbv
 from ferrea.core.context import Context
 from ferrea.core.exceptions import FerreaBaseException
 from ferrea.core.header import FERRA_CORRELATION_HEADER
 from ferrea.models.error import FerreaError
 from ferrea.observability.logs import ferrea_logger
-from starlette.responses import JSONResponse
+from starlette.responses import Response, StreamingResponse
 
-from models.library import Library
-from models.repository import RepositoryService
+from models.exceptions import (
+    FerreaInvalidBoundingBox,
+    FerreaInvalidCursor,
+    FerreaInvalidFields,
+)
+from models.library import (
+    LIBRARY_FIELDS,
+    BatchResult,
+    Library,
+    LibraryList,
+    NearbyLibraryList,
+    ScoredLibraryList,
+)
+from models.repository import AsyncRepositoryService
+from operations.etags import (
+    collection_etag,
+    etag_matches,
+    library_etag,
+    representation_etag,
+)
 from operations.libraries import (
+    MAX_BATCH_SIZE,
     delete_library,
-    get_all_libraries,
+    get_collection_version,
+    get_libraries_page,
     get_library_by_fid,
+    get_nearby_libraries,
+    parse_bbox,
+    parse_fields,
+    search_libraries,
+    stream_all_libraries,
     update_library,
+    upsert_libraries_batch,
     upsert_library,
 )
+from operations.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 from ._builder import build_context, build_repository
+from ._codecs import JSON, Codec, negotiate_codec
+from ._requests import NegotiatedRoute
+from ._responses import PROBLEM_JSON, ModelResponse, to_json
 
-router = APIRouter(prefix="/api/v1")
+# bodies are negotiated: JSON, or a binary format (e.g. MessagePack).
+router = APIRouter(prefix="/api/v1", route_class=NegotiatedRoute)
+
+# default radius of the nearby search, in meters.
+DEFAULT_RADIUS = 5000.0
 
 
 @cbv(router)
@@ -31,43 +67,124 @@ class LibraryViews:
     """
 
     context: Context = Depends(build_context)
-    _repository: RepositoryService = Depends(build_repository)
+    _repository: AsyncRepositoryService = Depends(build_repository)
+    request: Request
 
     @property
     def _headers(self) -> dict[str, str]:
-        return {FERRA_CORRELATION_HEADER: self.context.uuid}
+        return {FERRA_CORRELATION_HEADER: self.context.uuid, "Vary": "Accept"}
+
+    @cached_property
+    def _codec(self) -> Codec:
+        """The representation of the response, negotiated through the Accept header."""
+        return negotiate_codec(self.request.headers.get("accept"))
+
+    def _etag(self, etag: str) -> str:
+        """Helper method for the ETag of the negotiated representation."""
+        return representation_etag(
+            etag, None if self._codec is JSON else self._codec.name
+        )
 
     @router.get("/libraries", response_model=None)
-    def get_all_libraries_entrypoint(self) -> JSONResponse:
-        """Endpoint for listing all libraries."""
+    async def get_all_libraries_entrypoint(
+        self,
+        cursor: str | None = None,
+        limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        bbox: str | None = Query(
+            default=None, description="minLon,minLat,maxLon,maxLat"
+        ),
+        fields: str | None = Query(
+            default=None, description="comma separated fields, e.g. fid,name"
+        ),
+        if_none_match: str | None = Header(default=None),
+    ) -> Response:
+        """Endpoint for listing all libraries (optionally inside a bbox), a page at a time."""
         ferrea_logger.info(
             "Listing all libraries.",
             **self.context.log,
         )
 
         try:
-            libraries = get_all_libraries(self._repository)
+            fieldset = parse_fields(fields) if fields is not None else None
+            # the version is read before the page: a write in between only makes the etag older.
+            etag = self._etag(
+                collection_etag(
+                    await get_collection_version(self._repository), fieldset
+                )
+            )
+            if etag_matches(if_none_match, etag):
+                return self._not_modified(etag)
+
+            page = await get_libraries_page(
+                self._repository,
+                cursor=cursor,
+                limit=limit,
+                bbox=parse_bbox(bbox) if bbox is not None else None,
+                fields=fieldset,
+            )
+        except (
+            FerreaInvalidCursor,
+            FerreaInvalidBoundingBox,
+            FerreaInvalidFields,
+        ) as e:
+            return self._bad_request(f"{e}")
         except FerreaBaseException as e:
             return self._ferrea_exception_5xx(e)
         except Exception as e:
             return self._generic_exception_5xx(e)
 
-        response = {
-            "items": len(libraries),
-            "result": [
-                json.loads(library.model_dump_json(by_alias=True))
-                for library in libraries
-            ],
-        }
+        response = LibraryList(
+            items=len(page.libraries),
+            result=page.libraries,
+            next_cursor=page.next_cursor,
+        )
+
+        exclude: dict[str, Any] = {}
+        # the cursor is left out on the last page.
+        if page.next_cursor is None:
+            exclude["next_cursor"] = True
+        if fieldset is not None:
+            exclude["result"] = {"__all__": set(LIBRARY_FIELDS - fieldset)}
 
-        return JSONResponse(
+        return ModelResponse(
             content=response,
             status_code=status.HTTP_200_OK,
+            headers={**self._headers, "ETag": etag},
+            exclude=exclude or None,
+            codec=self._codec,
+        )
+
+    @router.get("/libraries:export", response_model=None)
+    async def export_libraries_entrypoint(self) -> Response:
+        """Endpoint for streaming all libraries as NDJSON, one library per line."""
+        ferrea_logger.info(
+            "Exporting all libraries.",
+            **self.context.log,
+        )
+
+        libraries = stream_all_libraries(self._repository)
+        try:
+            # fetch the first library eagerly, so that db errors still get a 5xx.
+            try:
+                first = await anext(libraries, None)
+            except BaseException:
+                # the stream is not handed over: release its db session here.
+                await libraries.aclose()
+                raise
+        except FerreaBaseException as e:
+            return self._ferrea_exception_5xx(e)
+        except Exception as e:
+            return self._generic_exception_5xx(e)
+
+        return StreamingResponse(
+            content=self._ndjson_lines(first, libraries),
+            status_code=status.HTTP_200_OK,
             headers=self._headers,
+            media_type="application/x-ndjson",
         )
 
     @router.post("/libraries", response_model=None)
-    def create_library_entrypoint(self, data: Library) -> JSONResponse:
+    async def create_library_entrypoint(self, data: Library) -> Response:
         """Endpoint for the creation of a new library."""
         ferrea_logger.info(
             f"Creating a new library for {data.name}.",
@@ -75,20 +192,123 @@ class LibraryViews:
         )
 
         try:
-            new_library = upsert_library(self._repository, data)
+            new_library = await upsert_library(self._repository, data)
         except FerreaBaseException as e:
             return self._ferrea_exception_5xx(e)
         except Exception as e:
             return self._generic_exception_5xx(e)
 
-        return JSONResponse(
-            content=json.loads(new_library.model_dump_json(by_alias=True)),
+        return ModelResponse(
+            content=new_library,
             status_code=status.HTTP_200_OK,
             headers=self._headers,
+            codec=self._codec,
+        )
+
+    @router.post("/libraries:batch", response_model=None)
+    async def batch_libraries_entrypoint(
+        self,
+        data: Annotated[
+            list[dict[str, Any]], Body(min_length=1, max_length=MAX_BATCH_SIZE)
+        ],
+    ) -> Response:
+        """Endpoint for the creation (or update) of many libraries at once."""
+        ferrea_logger.info(
+            f"Creating a batch of {len(data)} libraries.",
+            **self.context.log,
+        )
+
+        try:
+            results = await upsert_libraries_batch(self._repository, data)
+        except FerreaBaseException as e:
+            return self._ferrea_exception_5xx(e)
+        except Exception as e:
+            return self._generic_exception_5xx(e)
+
+        return ModelResponse(
+            content=BatchResult(items=len(results), result=results),
+            status_code=status.HTTP_200_OK,
+            headers=self._headers,
+            codec=self._codec,
+        )
+
+    @router.get("/libraries/nearby", response_model=None)
+    async def nearby_libraries_entrypoint(
+        self,
+        lat: float = Query(ge=-90, le=90),
+        lon: float = Query(ge=-180, le=180),
+        radius: float = Query(default=DEFAULT_RADIUS, gt=0),
+        limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ) -> Response:
+        """Endpoint for listing the libraries near a point, the nearest first."""
+        ferrea_logger.info(
+            f"Listing libraries within {radius} meters from ({lat}, {lon}).",
+            **self.context.log,
+        )
+
+        try:
+            libraries = await get_nearby_libraries(
+                self._repository,
+                latitude=lat,
+                longitude=lon,
+                radius=radius,
+                limit=limit,
+            )
+        except FerreaBaseException as e:
+            return self._ferrea_exception_5xx(e)
+        except Exception as e:
+            return self._generic_exception_5xx(e)
+
+        return ModelResponse(
+            content=NearbyLibraryList(items=len(libraries), result=libraries),
+            status_code=status.HTTP_200_OK,
+            headers=self._headers,
+            codec=self._codec,
+        )
+
+    @router.get("/libraries/search", response_model=None)
+    async def search_libraries_entrypoint(
+        self,
+        q: str = Query(min_length=1, max_length=200),
+        cursor: str | None = None,
+        limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ) -> Response:
+        """Endpoint for searching libraries by name and address, the most relevant first."""
+        ferrea_logger.info(
+            f"Searching libraries matching {q}.",
+            **self.context.log,
+        )
+
+        try:
+            page = await search_libraries(
+                self._repository, text=q, cursor=cursor, limit=limit
+            )
+        except FerreaInvalidCursor as e:
+            return self._bad_request(f"{e}")
+        except FerreaBaseException as e:
+            return self._ferrea_exception_5xx(e)
+        except Exception as e:
+            return self._generic_exception_5xx(e)
+
+        response = ScoredLibraryList(
+            items=len(page.libraries),
+            result=page.libraries,
+            next_cursor=page.next_cursor,
+        )
+
+        return ModelResponse(
+            content=response,
+            status_code=status.HTTP_200_OK,
+            headers=self._headers,
+            # the cursor is left out on the last page.
+            exclude={"next_cursor"} if page.next_cursor is None else None,
+            codec=self._codec,
         )
 
     @router.get("/libraries/{fid}", response_model=None)
-    def search_library_entrypoint(self, fid: str) -> JSONResponse:
+    async def search_library_entrypoint(
+        self, fid: str, if_none_match: str | None = Header(default=None)
+    ) -> Response:
         """Endpoint for search a specific library by its fid (ferrea id)."""
         ferrea_logger.info(
             f"Searching {fid} library.",
@@ -96,7 +316,7 @@ class LibraryViews:
         )
 
         try:
-            library = get_library_by_fid(self._repository, fid=fid)
+            library = await get_library_by_fid(self._repository, fid=fid)
         except FerreaBaseException as e:
             return self._ferrea_exception_5xx(e)
         except Exception as e:
@@ -105,14 +325,19 @@ class LibraryViews:
         if not library:
             return self._not_found(fid)
 
-        return JSONResponse(
-            content=json.loads(library.model_dump_json(by_alias=True)),
+        etag = self._etag(library_etag(library))
+        if etag_matches(if_none_match, etag):
+            return self._not_modified(etag)
+
+        return ModelResponse(
+            content=library,
             status_code=status.HTTP_200_OK,
-            headers=self._headers,
+            headers={**self._headers, "ETag": etag},
+            codec=self._codec,
         )
 
     @router.put("/libraries/{fid}", response_model=None)
-    def update_library_entrypoint(self, fid: str, data: Library) -> JSONResponse:
+    async def update_library_entrypoint(self, fid: str, data: Library) -> Response:
         """Endpoint for update a specific library by its fid (ferrea id)."""
         ferrea_logger.info(
             f"Updating {fid} library.",
@@ -120,7 +345,7 @@ class LibraryViews:
         )
 
         try:
-            library = update_library(self._repository, fid=fid, new_library=data)
+            library = await update_library(self._repository, fid=fid, new_library=data)
         except FerreaBaseException as e:
             return self._ferrea_exception_5xx(e)
         except Exception as e:
@@ -129,14 +354,15 @@ class LibraryViews:
         if not library:
             return self._not_found(fid)
 
-        return JSONResponse(
-            content=json.loads(library.model_dump_json(by_alias=True)),
+        return ModelResponse(
+            content=library,
             status_code=status.HTTP_200_OK,
             headers=self._headers,
+            codec=self._codec,
         )
 
     @router.delete("/libraries/{fid}", response_model=None)
-    def delete_library_entrypoint(self, fid: str) -> JSONResponse:
+    async def delete_library_entrypoint(self, fid: str) -> Response:
         """Endpoint to delete a specific library by its fid (ferrea id)."""
         ferrea_logger.info(
             f"Deleting {fid} library.",
@@ -144,7 +370,7 @@ class LibraryViews:
         )
 
         try:
-            library = delete_library(self._repository, fid=fid)
+            library = await delete_library(self._repository, fid=fid)
         except FerreaBaseException as e:
             return self._ferrea_exception_5xx(e)
         except Exception as e:
@@ -153,13 +379,52 @@ class LibraryViews:
         if not library:
             return self._not_found(fid)
 
-        return JSONResponse(
-            content={},
+        return Response(
             status_code=status.HTTP_204_NO_CONTENT,
             headers=self._headers,
         )
 
-    def _not_found(self, fid: str) -> JSONResponse:
+    async def _ndjson_lines(
+        self, first: Library | None, libraries: AsyncIterator[Library]
+    ) -> AsyncIterator[bytes]:
+        """Helper method to serialize the libraries, one per line."""
+        if first is None:
+            return
+
+        yield to_json(first) + b"\n"
+        try:
+            async for library in libraries:
+                yield to_json(library) + b"\n"
+        except Exception as e:
+            # the response has already started: the only option is to truncate it.
+            ferrea_logger.exception(
+                f"Export interrupted due to: {e}.",
+                **self.context.log,
+            )
+
+    def _not_modified(self, etag: str) -> Response:
+        """Helper method for a client copy still valid: no body at all."""
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={**self._headers, "ETag": etag},
+        )
+
+    def _bad_request(self, message: str) -> Response:
+        """Helper method for invalid requests."""
+        error = FerreaError(
+            uuid=self.context.uuid,
+            code="ferrea.libraries.bad_request",
+            title="Bad request",
+            message=message,
+        )
+        return ModelResponse(
+            content=error,
+            media_type=PROBLEM_JSON,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            headers=self._headers,
+        )
+
+    def _not_found(self, fid: str) -> Response:
         """Helper method for not found libraries."""
         error = FerreaError(
             uuid=self.context.uuid,
@@ -167,15 +432,14 @@ class LibraryViews:
             title="Not found",
             message=f"Unable to find library with fid {fid}.",
         )
-        self._headers.update({"content-type": "application/problem+json"})
-
-        return JSONResponse(
-            content=json.loads(error.model_dump_json()),
+        return ModelResponse(
+            content=error,
+            media_type=PROBLEM_JSON,
             status_code=status.HTTP_404_NOT_FOUND,
             headers=self._headers,
         )
 
-    def _ferrea_exception_5xx(self, e: Exception) -> JSONResponse:
+    def _ferrea_exception_5xx(self, e: Exception) -> Response:
         """Helper method for a Ferrea based exception."""
         ferrea_logger.exception(
             f"Received an error specific for Ferrea: {e}.",
@@ -188,15 +452,14 @@ class LibraryViews:
             title="Internal server error.",
             message=f"{e}",
         )
-        self._headers.update({"content-type": "application/problem+json"})
-
-        return JSONResponse(
-            content=json.loads(error.model_dump_json()),
+        return ModelResponse(
+            content=error,
+            media_type=PROBLEM_JSON,
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             headers=self._headers,
         )
 
-    def _generic_exception_5xx(self, e: Exception) -> JSONResponse:
+    def _generic_exception_5xx(self, e: Exception) -> Response:
         """Helper method for a not Ferrea based exception."""
         ferrea_logger.exception(
             f"Received a generic error: {e}.",
@@ -209,10 +472,9 @@ class LibraryViews:
             title="Internal server error.",
             message=f"{e}",
         )
-        self._headers.update({"content-type": "application/problem+json"})
-
-        return JSONResponse(
-            content=json.loads(error.model_dump_json()),
+        return ModelResponse(
+            content=error,
+            media_type=PROBLEM_JSON,
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             headers=self._headers,
         )
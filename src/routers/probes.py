@@ -1,71 +1,103 @@
-import json
-from typing import Annotated
-
-from fastapi import APIRouter, Depends
-from ferrea.clients.db import DBClient
+from fastapi import APIRouter, Request
 from starlette import status
-from starlette.responses import JSONResponse
+from starlette.responses import Response
 
 from models.probes import HealthStatus
-from operations.probes import check_health, check_readiness
+from operations.probes import (
+    check_health,
+    check_readiness,
+    collect_metrics,
+    collect_stats,
+)
 
-from ._builder import _build_db_connection
+from ._responses import ModelResponse
 
 router = APIRouter()
 
+PROMETHEUS_TEXT = "text/plain; version=0.0.4; charset=utf-8"
+
 
 @router.get("/_/ready", response_model=None)
-async def readiness() -> JSONResponse:
+async def readiness(request: Request) -> Response:
     """
     This function serves as readiness probe.
 
+    Args:
+        request (Request): the HTTP Request.
+
     Returns:
-        JSONResponse: a response.
+        Response: a response.
     """
-    headers = {
-        "content-type": "application/json",
-    }
-
-    health = check_readiness()
+    health = check_readiness(request.app.state.health_checker)
 
     if health.status == HealthStatus.HEALTHY:
-        return JSONResponse(
+        return ModelResponse(
             status_code=status.HTTP_200_OK,
-            content=json.loads(health.model_dump_json()),
-            headers=headers,
+            content=health,
         )
 
-    return JSONResponse(
+    return ModelResponse(
         status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-        content=json.loads(health.model_dump_json()),
-        headers=headers,
+        content=health,
     )
 
 
 @router.get("/_/health", response_model=None)
-async def liveness(
-    db_client: Annotated[DBClient, Depends(_build_db_connection)],
-) -> JSONResponse:
-    """This function serves as readiness probe.
+async def liveness(request: Request) -> Response:
+    """This function serves as liveness probe, reading the last check of the dependencies.
+
+    Args:
+        request (Request): the HTTP Request.
 
     Returns:
-        JSONResponse: a response.
+        Response: a response.
     """
-    headers = {
-        "content-type": "application/json",
-    }
-
-    health = check_health(db_client)
+    health = check_health(request.app.state.health_checker)
 
     if health.status == HealthStatus.HEALTHY:
-        return JSONResponse(
+        return ModelResponse(
             status_code=status.HTTP_200_OK,
-            content=json.loads(health.model_dump_json()),
-            headers=headers,
+            content=health,
         )
 
-    return JSONResponse(
+    return ModelResponse(
         status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-        content=json.loads(health.model_dump_json()),
-        headers=headers,
+        content=health,
+    )
+
+
+@router.get("/_/stats", response_model=None)
+async def stats(request: Request) -> Response:
+    """This function exposes the internal counters (e.g. cache hits and misses).
+
+    Args:
+        request (Request): the HTTP Request.
+
+    Returns:
+        Response: a response.
+    """
+    return ModelResponse(
+        status_code=status.HTTP_200_OK,
+        content=collect_stats(
+            request.app.state.geocoding_worker, request.app.state.library_cache
+        ),
+    )
+
+
+@router.get("/_/metrics", response_model=None)
+async def metrics(request: Request) -> Response:
+    """This function exposes the metrics for Prometheus (e.g. the latency of each route).
+
+    Args:
+        request (Request): the HTTP Request.
+
+    Returns:
+        Response: a response.
+    """
+    return Response(
+        status_code=status.HTTP_200_OK,
+        content=collect_metrics(
+            request.app.state.geocoding_worker, request.app.state.library_cache
+        ),
+        media_type=PROMETHEUS_TEXT,
     )
@@ -0,0 +1,65 @@
+import argparse
+import sys
+
+from ferrea.observability.logs import ferrea_logger, setup_logger
+
+# imported before forking, so that the workers share the modules already loaded.
+import app
+from adapters.serving import Supervisor, worker_count, worker_pool_size
+from configs import settings
+
+
+def setup_worker(index: int) -> None:
+    """
+    Setup of a worker process, before it serves: the background geocoding runs in the
+    first worker only, so that Nominatim gets a single client within its rate limit.
+    The others save the libraries to geocode as pending, left to the first one.
+
+    Args:
+        index (int): the index of the worker.
+    """
+    if index > 0:
+        settings.set("geocoding.deferred", True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the app with pre-forked workers (production mode)."
+    )
+    parser.add_argument("--host", default=settings.serving.host)
+    parser.add_argument("--port", type=int, default=settings.serving.port)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.serving.workers,
+        help="the workers to pre-fork, 0 for one per cpu (the default).",
+    )
+    args = parser.parse_args()
+
+    setup_logger()
+    settings.set("serving.workers", args.workers)
+    workers = worker_count(settings.serving)
+    try:
+        pool_size = worker_pool_size(settings.serving.connection_budget, workers)
+    except ValueError as e:
+        ferrea_logger.error(f"Unable to serve due to {e}")
+        sys.exit(1)
+
+    # every worker owns a pool: together they stay within the connection budget.
+    settings.set("database.max_connection_pool_size", pool_size)
+    settings.set("serving.host", args.host)
+    settings.set("serving.port", args.port)
+    if workers > 1 and settings.library_cache.enabled:
+        # the invalidations don't cross the processes: a worker would keep serving
+        # the libraries written through the others.
+        ferrea_logger.warning(
+            f"Library cache disabled: it can't be shared by {workers} workers."
+        )
+        settings.set("library_cache.enabled", False)
+
+    Supervisor(
+        settings=settings.serving,
+        app=f"{app.__name__}:{app.app.__name__}",
+        workers=workers,
+        setup=setup_worker,
+    ).run()
@@ -0,0 +1,29 @@
+from adapters.cache import MISSING, LRUCache
+
+
+def test_lru_eviction() -> None:
+    """Test that the least recently used entry is evicted when full."""
+    cache: LRUCache[str, int] = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_ttl_expiration() -> None:
+    """Test that expired entries are not returned."""
+    cache: LRUCache[str, int | None] = LRUCache(max_size=2, ttl=60)
+    cache.set("expired", 1, ttl=0)
+    cache.set("negative", None)
+
+    assert cache.get("expired") is MISSING
+    assert cache.get("negative") is None
+
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.hit_ratio) == (1, 1, 0.5)
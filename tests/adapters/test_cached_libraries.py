@@ -0,0 +1,119 @@
+import asyncio
+import uuid
+
+import pytest
+from fake.repository import AsyncFakeRepository, FakeRepository
+from ferrea.clients.db import ConnectionSettings, Neo4jClient
+from ferrea.core.context import Context
+
+from adapters.cache import LocalInvalidationBus
+from adapters.cached_libraries import CachedLibrariesRepository, LibraryCache
+from configs.config import settings
+from models.library import Library
+
+
+class CountingRepository(FakeRepository):
+    """Fake repository that counts the lookups by fid."""
+
+    lookups: int = 0
+
+    def find_a_library_by_fid(self, fid: str) -> Library:
+        self.lookups += 1
+        return super().find_a_library_by_fid(fid)
+
+    def get_collection_version(self) -> int:
+        self.lookups += 1
+        return super().get_collection_version()
+
+
+@pytest.fixture
+def repository() -> CountingRepository:
+    context = Context(uuid=str(uuid.uuid4()), app="LBS_TST")
+    return CountingRepository(
+        context=context, db_client=Neo4jClient(ConnectionSettings("", "", ""))
+    )
+
+
+def _cached(
+    repository: CountingRepository, bus: LocalInvalidationBus | None = None
+) -> CachedLibrariesRepository:
+    """Helper function to put a cache in front of the fake repository."""
+    return CachedLibrariesRepository(
+        repository=AsyncFakeRepository(repository),
+        cache=LibraryCache(settings.library_cache, bus=bus),
+    )
+
+
+def test_read_through(repository: CountingRepository) -> None:
+    """Test that repeated lookups are served by the cache and writes invalidate it."""
+    cached = _cached(repository)
+
+    async def scenario() -> None:
+        library = await cached.create_library(Library(name="Triante", address="Monza"))
+        fid = str(library.fid)
+
+        for _ in range(3):
+            assert (await cached.find_a_library_by_fid(fid)).name == "Triante"
+        assert repository.lookups == 1
+
+        await cached.update_library(fid, Library(name="Civica", address="Monza"))
+        assert (await cached.find_a_library_by_fid(fid)).name == "Civica"
+        assert repository.lookups == 2
+
+    asyncio.run(scenario())
+
+    stats = cached.cache.stats
+    assert (stats.hits, stats.misses, stats.size) == (2, 2, 1)
+
+
+def test_invalidation_through_bus(repository: CountingRepository) -> None:
+    """Test that a write drops the entry from all the caches on the bus, once each."""
+    bus = LocalInvalidationBus()
+    first = _cached(repository, bus)
+    second = _cached(repository, bus)
+
+    async def scenario() -> str:
+        library = await first.create_library(Library(name="Triante", address="Monza"))
+        await second.find_a_library_by_fid(str(library.fid))
+        await first.delete_library(str(library.fid))
+        return str(library.fid)
+
+    generation = first.cache.generation
+    fid = asyncio.run(scenario())
+
+    assert second.cache.get(fid) is None
+    # create and delete: an invalidation each.
+    assert first.cache.generation == generation + 2
+
+
+def test_pending_libraries_not_cached(repository: CountingRepository) -> None:
+    """Test that the libraries waiting for their location are always read from the db."""
+    cached = _cached(repository)
+
+    async def scenario() -> None:
+        library = await cached.create_library(Library(name="Triante", address="Monza"))
+        library.location_pending = True
+
+        await cached.find_a_library_by_fid(str(library.fid))
+        await cached.find_a_library_by_fid(str(library.fid))
+
+    asyncio.run(scenario())
+
+    assert repository.lookups == 2
+
+
+def test_collection_version(repository: CountingRepository) -> None:
+    """Test that the version of the collection is cached until a write."""
+    cached = _cached(repository)
+
+    async def scenario() -> None:
+        version = await cached.get_collection_version()
+        assert await cached.get_collection_version() == version
+        assert repository.lookups == 1
+
+        await cached.create_library(Library(name="Triante", address="Monza"))
+
+        assert await cached.get_collection_version() > version
+        assert repository.lookups == 2
+
+    asyncio.run(scenario())
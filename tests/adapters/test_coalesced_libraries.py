@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+
+import pytest
+from fake.repository import AsyncFakeRepository, FakeRepository
+from ferrea.clients.db import ConnectionSettings, Neo4jClient
+from ferrea.core.context import Context
+
+from adapters.coalesced_libraries import CoalescedLibrariesRepository, ReadKey
+from adapters.metrics import DB_COALESCED_READS, DB_SHARED_READS, Counter
+from adapters.single_flight import SingleFlight
+from models.library import Library
+
+
+class CountingRepository(FakeRepository):
+    """Fake repository that counts the reads."""
+
+    reads: int = 0
+
+    def find_a_library_by_fid(self, fid: str) -> Library:
+        self.reads += 1
+        return super().find_a_library_by_fid(fid)
+
+    def find_all_libraries(self, *args, **kwargs) -> list[Library]:  # type: ignore
+        self.reads += 1
+        return super().find_all_libraries(*args, **kwargs)
+
+
+@pytest.fixture
+def repository() -> CountingRepository:
+    context = Context(uuid=str(uuid.uuid4()), app="LBS_TST")
+    return CountingRepository(
+        context=context, db_client=Neo4jClient(ConnectionSettings("", "", ""))
+    )
+
+
+def _coalesced(repository: CountingRepository) -> CoalescedLibrariesRepository:
+    """Helper function to put the coalescing layer in front of the fake repository."""
+    return CoalescedLibrariesRepository(
+        repository=AsyncFakeRepository(repository), flights=SingleFlight[ReadKey]()
+    )
+
+
+def _count(counter: Counter, method: str) -> float:
+    """Helper function to read the value of a counter by method."""
+    return next((x[2] for x in counter.samples() if x[1] == (("method", method),)), 0)
+
+
+def test_concurrent_reads(repository: CountingRepository) -> None:
+    """Test that identical concurrent reads hit the db once, and are counted as saved."""
+    coalesced = _coalesced(repository)
+    shared = _count(DB_SHARED_READS, "find_a_library_by_fid")
+    made = _count(DB_COALESCED_READS, "find_a_library_by_fid")
+
+    async def scenario() -> None:
+        library = await coalesced.create_library(
+            Library(name="Triante", address="Monza")
+        )
+        fid = str(library.fid)
+
+        found = await asyncio.gather(
+            *(coalesced.find_a_library_by_fid(fid) for _ in range(5))
+        )
+        assert {x.name for x in found} == {"Triante"}
+
+        pages = await asyncio.gather(
+            coalesced.find_all_libraries(limit=10),
+            coalesced.find_all_libraries(limit=10),
+            coalesced.find_all_libraries(limit=1, fields=frozenset({"name"})),
+        )
+        assert [len(x) for x in pages] == [1, 1, 1]
+
+    asyncio.run(scenario())
+
+    # 1 lookup, 2 distinct pages.
+    assert repository.reads == 3
+    assert _count(DB_SHARED_READS, "find_a_library_by_fid") - shared == 4
+    assert _count(DB_COALESCED_READS, "find_a_library_by_fid") - made == 1
+
+
+def test_writes_stop_sharing(repository: CountingRepository) -> None:
+    """Test that the reads after a write don't share the ones started before it."""
+    coalesced = _coalesced(repository)
+
+    async def scenario() -> tuple[Library, Library]:
+        library = await coalesced.create_library(
+            Library(name="Triante", address="Monza")
+        )
+        fid = str(library.fid)
+
+        before = asyncio.ensure_future(coalesced.find_a_library_by_fid(fid))
+        await asyncio.sleep(0)
+        await coalesced.update_library(fid, Library(name="Civica", address="Monza"))
+        after = await coalesced.find_a_library_by_fid(fid)
+        return await before, after
+
+    _, after = asyncio.run(scenario())
+
+    assert after.name == "Civica"
+    assert repository.reads == 2
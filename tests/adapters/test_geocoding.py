@@ -0,0 +1,79 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from adapters.geocoding import AsyncGeocoder, CachedGeocoder, normalize_address
+from configs.config import settings
+from models.geocoding import Coordinates
+
+MONZA = Coordinates(latitude=45.5832943, longitude=9.2550648)
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    calls: list[str] = []
+
+    def fake_lookup(self: CachedGeocoder, address: str) -> Coordinates | None:
+        calls.append(address)
+        self._count("_upstream_calls")
+        return MONZA if "monza" in address.lower() else None
+
+    monkeypatch.setattr(CachedGeocoder, "_lookup", fake_lookup)
+    return calls
+
+
+def _geocoder(tmp_path: Path) -> CachedGeocoder:
+    geocoding_settings = settings.geocoding.copy()
+    geocoding_settings.cache_path = str(tmp_path / "geocoding.sqlite3")
+
+    return CachedGeocoder(geocoding_settings)
+
+
+def test_normalize_address() -> None:
+    """Test that trivially different spellings share the same key."""
+    expected = "via monte amiata, 60, monza"
+
+    assert normalize_address("Via Monte  Amiata ,60,  MONZA ") == expected
+
+
+def test_memory_and_negative_cache(tmp_path: Path, upstream_calls: list[str]) -> None:
+    """Test that both positive and negative results are served by the cache."""
+    geocoder = _geocoder(tmp_path)
+
+    for _ in range(3):
+        assert geocoder.geocode("Via Monte Amiata, 60, Monza") == MONZA
+        assert geocoder.geocode("Nowhere") is None
+
+    stats = geocoder.stats
+    assert len(upstream_calls) == 2
+    assert stats.memory.hits == 4
+    assert stats.negative_hits == 2
+
+
+def test_disk_cache_survives_restarts(
+    tmp_path: Path, upstream_calls: list[str]
+) -> None:
+    """Test that a new geocoder (e.g. after a restart) reads the on-disk tier."""
+    _geocoder(tmp_path).geocode("Via Monte Amiata, 60, Monza")
+
+    geocoder = _geocoder(tmp_path)
+
+    assert geocoder.geocode("via monte amiata, 60, monza") == MONZA
+    assert len(upstream_calls) == 1
+    assert geocoder.stats.disk_hits == 1
+
+
+def test_misses_counted_once(tmp_path: Path, upstream_calls: list[str]) -> None:
+    """Test that a lookup missing both caches counts a single miss of each."""
+    geocoder = _geocoder(tmp_path)
+
+    async def scenario() -> None:
+        await AsyncGeocoder(geocoder).geocode("Via Monte Amiata, 60, Monza")
+
+    asyncio.run(scenario())
+    geocoder.geocode("Via Roma, 1, Monza")
+
+    stats = geocoder.stats
+    assert len(upstream_calls) == 2
+    assert (stats.memory.misses, stats.disk_misses) == (2, 2)
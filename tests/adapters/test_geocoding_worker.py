@@ -0,0 +1,166 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Any, Self
+
+import pytest
+
+from adapters.geocoding import AsyncGeocoder, CachedGeocoder
+from adapters.geocoding_worker import GeocodingWorker
+from configs.config import settings
+from models.geocoding import Coordinates
+
+MONZA = Coordinates(latitude=45.5832943, longitude=9.2550648)
+
+
+class RecordingClient:
+    """Fake db client that records the writes, reading the pending libraries until then."""
+
+    def __init__(self) -> None:
+        self.writes: list[dict[str, Any]] = []
+        self.pending: list[tuple[str, str]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        pass
+
+    async def read(self, query: str, params: dict[str, Any] | None = None) -> list[Any]:
+        return list(self.pending)
+
+    async def write(
+        self, query: str, params: dict[str, Any] | None = None
+    ) -> list[Any]:
+        self.writes.append(params or {})
+        self.pending = []
+        return []
+
+
+@pytest.fixture
+def worker(tmp_path: Path) -> GeocodingWorker:
+    worker_settings = settings.geocoding.copy()
+    worker_settings.cache_path = str(tmp_path / "geocoding.sqlite3")
+    worker_settings.rate_limit = 1000.0
+    worker_settings.flush_interval = 0.05
+    worker_settings.backoff = 0.01
+    worker_settings.max_attempts = 2
+
+    client = RecordingClient()
+    return GeocodingWorker(
+        settings=worker_settings,
+        geocoder=AsyncGeocoder(CachedGeocoder(worker_settings)),
+        db_client_factory=lambda: client,
+    )
+
+
+def _run_until(worker: GeocodingWorker, processed: int) -> None:
+    """Helper function to run the worker until it has processed enough libraries."""
+
+    async def scenario() -> None:
+        worker.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 5
+        while worker.stats.processed < processed and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_batch_of_locations(
+    worker: GeocodingWorker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that queued libraries are geocoded and written in a single batch."""
+    monkeypatch.setattr(CachedGeocoder, "_lookup", lambda self, address: MONZA)
+    worker.enqueue("fid-1", "Via Monte Amiata, 60, Monza")
+    worker.enqueue("fid-2", "Via Monte Amiata, 60, Monza")
+
+    _run_until(worker, processed=2)
+
+    client: RecordingClient = worker.db_client_factory()  # type: ignore
+    [write] = client.writes
+    assert [row["fid"] for row in write["rows"]] == ["fid-1", "fid-2"]
+    assert write["rows"][0]["latitude"] == MONZA.latitude
+    assert worker.stats.depth == 0
+
+
+def test_retry_then_give_up(
+    worker: GeocodingWorker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a failing geocoding is retried, then written without location."""
+
+    class DownGeolocator:
+        def geocode(self, address: str) -> None:
+            raise TimeoutError("Nominatim is down.")
+
+    monkeypatch.setattr(
+        CachedGeocoder, "_geolocator", property(lambda self: DownGeolocator())
+    )
+    worker.enqueue("fid-1", "Via Monte Amiata, 60, Monza")
+
+    _run_until(worker, processed=1)
+
+    stats = worker.stats
+    assert (stats.retried, stats.failed, stats.processed) == (1, 1, 1)
+
+
+def test_unexpected_error(
+    worker: GeocodingWorker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that an unexpected error fails only its job: the worker goes on, then stops."""
+    monkeypatch.setattr(CachedGeocoder, "_lookup", lambda self, address: MONZA)
+    peek = CachedGeocoder.peek
+
+    def locked_peek(self: CachedGeocoder, address: str) -> Any:
+        if address.startswith("Via Roma"):
+            raise sqlite3.OperationalError("database is locked")
+        return peek(self, address)
+
+    monkeypatch.setattr(CachedGeocoder, "peek", locked_peek)
+    worker.enqueue("fid-1", "Via Roma, 1, Monza")
+    worker.enqueue("fid-2", "Via Monte Amiata, 60, Monza")
+
+    _run_until(worker, processed=1)
+
+    client: RecordingClient = worker.db_client_factory()  # type: ignore
+    rows = [row["fid"] for write in client.writes for row in write["rows"]]
+    assert rows == ["fid-2"]
+    # given up after max_attempts, left pending for the recovery.
+    assert worker.stats.failed == 1
+    assert worker.stats.depth == 0
+
+
+def test_recover_pending(
+    worker: GeocodingWorker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the pending libraries are looked up on the db, not queued twice."""
+    monkeypatch.setattr(CachedGeocoder, "_lookup", lambda self, address: MONZA)
+    worker.settings.recover_interval = 0.01
+    client: RecordingClient = worker.db_client_factory()  # type: ignore
+    client.pending = [
+        ("fid-1", "Via Monte Amiata, 60, Monza"),
+        ("fid-2", "Via Roma, 1, Monza"),
+    ]
+    worker.enqueue("fid-1", "Via Monte Amiata, 60, Monza")
+
+    _run_until(worker, processed=2)
+
+    rows = [row["fid"] for write in client.writes for row in write["rows"]]
+    assert sorted(rows) == ["fid-1", "fid-2"]
+
+
+def test_deferred(worker: GeocodingWorker) -> None:
+    """Test that a deferred worker leaves the libraries pending."""
+    worker.settings.deferred = True
+    worker.enqueue("fid-1", "Via Monte Amiata, 60, Monza")
+
+    async def scenario() -> None:
+        worker.start()
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert worker.stats.depth == 0
+    client: RecordingClient = worker.db_client_factory()  # type: ignore
+    assert client.writes == []
@@ -0,0 +1,80 @@
+import asyncio
+from types import TracebackType
+from typing import Any, Self
+
+from adapters.health import DatabaseHealthChecker
+from configs.config import settings
+
+
+class StandInSession:
+    """Stand-in of a session, reaching the db only if it's up."""
+
+    up = True
+    sessions = 0
+
+    async def __aenter__(self) -> Self:
+        StandInSession.sessions += 1
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        pass
+
+    async def read(self, query: str, params: Any = None) -> list[Any]:
+        return []
+
+    async def verify_connectivity(self) -> bool:
+        if not self.up:
+            raise ConnectionError("db down")
+        return True
+
+
+def _checker(max_age: float = 30.0) -> DatabaseHealthChecker:
+    """Helper function to build a checker on the stand-in sessions."""
+    health_settings = settings.health_check.copy()
+    health_settings.max_age = max_age
+
+    return DatabaseHealthChecker(
+        settings=health_settings, db_client_factory=StandInSession
+    )
+
+
+def test_ready_after_first_check() -> None:
+    """Test that the checker is ready only after a successful check and a warm pool."""
+    StandInSession.up = False
+    checker = _checker()
+    assert checker.snapshot.ready is False
+    assert checker.snapshot.age is None
+
+    asyncio.run(checker.check())
+    assert (checker.snapshot.healthy, checker.snapshot.ready) == (False, False)
+
+    StandInSession.up = True
+    StandInSession.sessions = 0
+    asyncio.run(checker.check())
+
+    snapshot = checker.snapshot
+    assert (snapshot.healthy, snapshot.ready) == (True, True)
+    assert snapshot.latency is not None and snapshot.age is not None
+    # the check itself plus the connections opened to warm the pool.
+    assert StandInSession.sessions == 1 + settings.health_check.warm_connections
+
+
+def test_unhealthy_when_down_or_stale() -> None:
+    """Test that a failed check or an old one are unhealthy, while staying ready."""
+    StandInSession.up = True
+    checker = _checker()
+    asyncio.run(checker.check())
+
+    StandInSession.up = False
+    asyncio.run(checker.check())
+    assert (checker.snapshot.healthy, checker.snapshot.ready) == (False, True)
+
+    StandInSession.up = True
+    stale = _checker(max_age=0.0)
+    asyncio.run(stale.check())
+    assert stale.snapshot.healthy is False
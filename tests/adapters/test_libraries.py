@@ -0,0 +1,182 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any, Self
+
+import pytest
+from ferrea.core.context import Context
+from neo4j.spatial import WGS84Point
+
+from adapters.libraries import LibrariesRepository
+from models.exceptions import FerreaNonExistingLibrary
+from models.geocoding import Coordinates
+from models.library import Library
+
+MONZA = Coordinates(latitude=45.5832943, longitude=9.2550648)
+
+
+class StubSession:
+    """Fake db client returning the same records to every query, recording them."""
+
+    def __init__(self, records: list[Any]) -> None:
+        self.records = records
+        self.queries: list[tuple[str, str, dict[str, Any] | None]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
+
+    async def read(self, query: str, params: dict[str, Any] | None = None) -> list[Any]:
+        self.queries.append(("read", query, params))
+        return self.records
+
+    async def write(
+        self, query: str, params: dict[str, Any] | None = None
+    ) -> list[Any]:
+        self.queries.append(("write", query, params))
+        return self.records
+
+    async def stream(
+        self, query: str, params: dict[str, Any] | None = None
+    ) -> AsyncIterator[Any]:
+        self.queries.append(("stream", query, params))
+        for record in self.records:
+            yield record
+
+
+class OfflineRepository(LibrariesRepository):
+    """Repository geocoding every address to Monza, without calling Nominatim."""
+
+    async def _find_location(self, address: str) -> Coordinates | None:
+        return MONZA
+
+
+def _repository(session: StubSession) -> OfflineRepository:
+    """Helper function to build a repository on the stubbed session."""
+    return OfflineRepository(
+        db_client=session,  # type: ignore
+        context=Context(uuid=str(uuid.uuid4()), app="LBS_TST"),
+    )
+
+
+def _node(name: str) -> dict[str, Any]:
+    """Helper function for a library node, as returned by the db."""
+    return {
+        "fid": "94d8b1e8-7d0e-4b5e-9b8e-3a0c2f1d6e51",
+        "name": name,
+        "address": "via Monte Amiata, 60, Monza",
+        "location": WGS84Point((MONZA.longitude, MONZA.latitude)),
+        "location_pending": False,
+        "version": 2,
+    }
+
+
+def test_trusted_hydration() -> None:
+    """Test that the nodes read from the db build the same library as the validation."""
+    library = Library(
+        name="Triante",
+        address="via Monte Amiata, 60, Monza",
+        phone="+39 039 731269",
+        email="monza.triante@brianzabiblioteche.it",
+    )
+    node = {
+        "fid": str(uuid.uuid4()),
+        "name": library.name,
+        "address": library.address,
+        "phone": str(library.phone),
+        "email": str(library.email),
+        "location": WGS84Point((9.2550648, 45.5832943)),
+        "location_pending": False,
+        "version": 3,
+    }
+    repository = LibrariesRepository(
+        db_client=None,  # type: ignore
+        context=Context(uuid=str(uuid.uuid4()), app="LBS_TST"),
+    )
+
+    hydrated = repository._build_library(dict(node))
+
+    assert hydrated == Library(**repository._flatten_location(dict(node)))
+    assert hydrated.version == 3
+    assert hydrated.latitude == 45.5832943
+    assert (
+        hydrated.model_dump_json() == Library(**hydrated.model_dump()).model_dump_json()
+    )
+
+
+@pytest.mark.parametrize("operation", ["create", "update", "delete"])
+def test_single_statement(operation: str) -> None:
+    """Test that each write is a single query, returning the written library."""
+    session = StubSession([[_node("Triante")]])
+    repository = _repository(session)
+    library = Library(name="Triante", address="via Monte Amiata, 60, Monza")
+
+    async def scenario() -> Library:
+        if operation == "create":
+            return await repository.create_library(library)
+        if operation == "update":
+            return await repository.update_library(str(uuid.uuid4()), library)
+        return await repository.delete_library(str(uuid.uuid4()))
+
+    written = asyncio.run(scenario())
+
+    assert [x[0] for x in session.queries] == ["write"]
+    assert written.name == "Triante"
+    assert written.latitude == MONZA.latitude
+    if operation != "delete":
+        params = session.queries[0][2] or {}
+        assert params["latitude"] == MONZA.latitude
+        assert params["location_pending"] is False
+
+
+@pytest.mark.parametrize("operation", ["update", "delete"])
+def test_missing_library(operation: str) -> None:
+    """Test that a write matching no library raises, after a single query."""
+    session = StubSession([])
+    repository = _repository(session)
+    fid = str(uuid.uuid4())
+
+    async def scenario() -> Library:
+        if operation == "update":
+            return await repository.update_library(
+                fid, Library(name="Triante", address="Monza")
+            )
+        return await repository.delete_library(fid)
+
+    with pytest.raises(FerreaNonExistingLibrary):
+        asyncio.run(scenario())
+
+    assert len(session.queries) == 1
+    assert session.queries[0][2] is not None
+    assert session.queries[0][2]["fid"] == fid
+
+
+@pytest.mark.parametrize(
+    ("after", "predicate"), [(None, "l.fid IS NOT NULL"), ("fid-1", "l.fid > $after")]
+)
+def test_keyset_seeks_the_fid_index(after: str | None, predicate: str) -> None:
+    """Test that every page filters on the fid, so that its order comes from the index."""
+    session = StubSession([])
+    repository = _repository(session)
+
+    asyncio.run(repository.find_all_libraries(after=after, limit=10))
+
+    [(_, query, params)] = session.queries
+    assert f"WHERE {predicate}" in query
+    assert "ORDER BY l.fid LIMIT $limit" in query
+    assert params == {"after": after, "limit": 10}
+
+
+def test_export_seeks_the_fid_index() -> None:
+    """Test that the export streams in the order of the fid index, with no sort."""
+    session = StubSession([[_node("Triante")]])
+    repository = _repository(session)
+
+    async def scenario() -> list[Library]:
+        return [x async for x in repository.iter_all_libraries()]
+
+    assert [x.name for x in asyncio.run(scenario())] == ["Triante"]
+    [(_, query, _)] = session.queries
+    assert "WHERE l.fid IS NOT NULL RETURN l ORDER BY l.fid" in query
@@ -0,0 +1,81 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from adapters.metrics import Counter, Histogram, render, timed
+
+
+def test_histogram_exposition() -> None:
+    """Test that the buckets are cumulative and the labels are rendered."""
+    histogram = Histogram(
+        "test_duration_seconds", "Test.", labels=("route",), buckets=(0.1, 1.0)
+    )
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "/a")
+
+    lines = render([histogram]).splitlines()
+
+    assert lines[:2] == [
+        "# HELP test_duration_seconds Test.",
+        "# TYPE test_duration_seconds histogram",
+    ]
+    assert lines[2:] == [
+        'test_duration_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_duration_seconds_bucket{route="/a",le="1"} 3',
+        'test_duration_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_duration_seconds_sum{route="/a"} 6.05',
+        'test_duration_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_counter_escaping() -> None:
+    """Test that the values of the labels are escaped."""
+    counter = Counter("test_total", "Test.", labels=("path",))
+    counter.inc('a"b\\c')
+    counter.inc('a"b\\c', amount=2)
+
+    assert render([counter]).splitlines()[-1] == r'test_total{path="a\"b\\c"} 3'
+
+
+def test_timed() -> None:
+    """Test that both coroutines and async generators are observed, by name."""
+    histogram = Histogram("test_seconds", "Test.", labels=("method",))
+
+    @timed(histogram)
+    async def find() -> int:
+        return 1
+
+    @timed(histogram)
+    async def stream() -> AsyncIterator[int]:
+        yield 1
+        yield 2
+
+    async def scenario() -> list[int]:
+        await find()
+        return [x async for x in stream()]
+
+    assert asyncio.run(scenario()) == [1, 2]
+    counts = {
+        labels: value
+        for suffix, labels, value in histogram.samples()
+        if suffix == "_count"
+    }
+    assert counts == {(("method", "find"),): 1, (("method", "stream"),): 1}
+
+
+def test_timer() -> None:
+    """Test that the block is observed once, even if it raises."""
+    histogram = Histogram("test_seconds", "Test.", labels=("method",))
+
+    with histogram.timer("write"):
+        pass
+    with pytest.raises(ValueError), histogram.timer("write"):
+        raise ValueError("failed")
+
+    counts = {
+        labels: value
+        for suffix, labels, value in histogram.samples()
+        if suffix == "_count"
+    }
+    assert counts == {(("method", "write"),): 2}
@@ -0,0 +1,87 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Self
+
+import pytest
+from neo4j.exceptions import ClientError
+
+from adapters.migrations import MigrationRunner, load_migrations
+from models.exceptions import FerreaMigrationError
+
+
+class GraphClient:
+    """
+    Fake db client that records the statements and the applied migrations,
+    raising the error, if any, on the statements.
+    """
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.statements: list[str] = []
+        self.applied: dict[int, str] = {}
+        self.error = error
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        pass
+
+    async def read(self, query: str, params: dict[str, Any] | None = None) -> list[Any]:
+        return sorted(self.applied.items())
+
+    async def write(
+        self, query: str, params: dict[str, Any] | None = None
+    ) -> list[Any]:
+        if params is not None and "checksum" in params:
+            self.applied[params["version"]] = params["checksum"]
+        else:
+            if self.error is not None and self.statements:
+                raise self.error
+            self.statements.append(query)
+        return []
+
+
+def test_load_migrations() -> None:
+    """Test that the shipped migrations are ordered and split in statements."""
+    migrations = load_migrations()
+
+    versions = [x.version for x in migrations]
+    assert versions == sorted(versions)
+    assert all(len(x.statements) > 0 for x in migrations)
+    assert not any("//" in y for x in migrations for y in x.statements)
+
+
+def test_run_once() -> None:
+    """Test that migrations are applied only once."""
+    client = GraphClient()
+    runner = MigrationRunner(lambda: client, load_migrations())
+
+    first = asyncio.run(runner.run())
+    applied_statements = len(client.statements)
+    second = asyncio.run(runner.run())
+
+    assert [x.version for x in first] == sorted(client.applied)
+    assert second == []
+    # only the bootstrap of the tracking constraint runs again.
+    assert len(client.statements) == applied_statements + 1
+
+
+def test_duplicated_version(tmp_path: Path) -> None:
+    """Test that two migrations with the same version are rejected."""
+    (tmp_path / "0001_first.cypher").write_text("RETURN 1;")
+    (tmp_path / "001_second.cypher").write_text("RETURN 2;")
+
+    with pytest.raises(FerreaMigrationError):
+        load_migrations(tmp_path)
+
+
+def test_failed_statement() -> None:
+    """Test that db errors fail the migration, programming errors are not masked."""
+    db_error = GraphClient(error=ClientError("Invalid input."))
+    with pytest.raises(FerreaMigrationError):
+        asyncio.run(MigrationRunner(lambda: db_error, load_migrations()).run())
+    assert db_error.applied == {}
+
+    bug = GraphClient(error=TypeError("unsupported parameter"))
+    with pytest.raises(TypeError):
+        asyncio.run(MigrationRunner(lambda: bug, load_migrations()).run())
@@ -0,0 +1,29 @@
+import json
+from pathlib import Path
+
+from adapters.oas import compile_openapi_schema, compiled_path, load_openapi_schema
+
+BUNDLE = Path(__file__).parents[2] / "oas" / "bundle.yaml"
+
+
+def test_compiled_schema(tmp_path: Path) -> None:
+    """Test that the compiled form is the same schema as the bundle."""
+    bundle = tmp_path / "bundle.yaml"
+    bundle.write_bytes(BUNDLE.read_bytes())
+
+    schema = load_openapi_schema(bundle)
+    assert compiled_path(bundle).exists()
+    assert schema["info"]["title"] == "Libraries API"
+    assert load_openapi_schema(bundle) == schema
+
+
+def test_stale_compiled_schema(tmp_path: Path) -> None:
+    """Test that a compiled form is not used once the bundle changes."""
+    bundle = tmp_path / "bundle.yaml"
+    bundle.write_text("openapi: 3.0.3\ninfo:\n  title: Old\n")
+    compile_openapi_schema(bundle)
+
+    bundle.write_text("openapi: 3.0.3\ninfo:\n  title: New\n")
+    assert load_openapi_schema(bundle)["info"]["title"] == "New"
+    compiled = json.loads(compiled_path(bundle).read_text())
+    assert compiled["schema"]["info"]["title"] == "New"
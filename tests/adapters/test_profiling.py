@@ -0,0 +1,151 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from types import TracebackType
+from typing import Any, Self
+
+import pytest
+from ferrea.core.context import Context
+
+from adapters import profiling
+from adapters.metrics import DB_STATEMENT_DURATION, Histogram
+from adapters.profiling import ProfiledSession, QueryProfiler
+from configs.config import settings
+
+PLAN = {
+    "operatorType": "ProduceResults@neo4j",
+    "args": {"EstimatedRows": 10.0},
+    "children": [
+        {
+            "operatorType": "NodeByLabelScan@neo4j",
+            "args": {"EstimatedRows": 10.0, "Details": "l:Library"},
+            "children": [],
+        }
+    ],
+}
+
+
+class SlowSession:
+    """Stand-in of a session: every query takes a while and returns two rows."""
+
+    def __init__(self) -> None:
+        self.plans: list[tuple[str, bool, bool]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        pass
+
+    async def read(self, query: str, params: Any = None) -> list[int]:
+        await asyncio.sleep(0.02)
+        return [1, 2]
+
+    async def write(self, query: str, params: Any = None) -> list[int]:
+        return await self.read(query, params)
+
+    async def stream(self, query: str, params: Any = None) -> AsyncIterator[int]:
+        for row in await self.read(query, params):
+            yield row
+
+    async def plan(
+        self, query: str, params: Any = None, profile: bool = False, write: bool = False
+    ) -> dict[str, Any]:
+        self.plans.append((query, profile, write))
+        return PLAN
+
+
+@pytest.fixture
+def warnings(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, dict[str, Any]]]:
+    logged: list[tuple[str, dict[str, Any]]] = []
+
+    class Logger:
+        def warning(self, message: str, **kwargs: Any) -> None:
+            logged.append((message, kwargs))
+
+    monkeypatch.setattr(profiling, "ferrea_logger", Logger())
+    return logged
+
+
+def _profiled(session: SlowSession, threshold: float, plan: str) -> ProfiledSession:
+    """Helper function to wrap a session with a profiler."""
+    profiling_settings = settings.query_profiling.copy()
+    profiling_settings.slow_threshold = threshold
+    profiling_settings.plan = plan
+
+    return ProfiledSession(
+        session=session,  # type: ignore
+        profiler=QueryProfiler(
+            settings=profiling_settings,
+            session_factory=lambda: session,  # type: ignore
+        ),
+        context=Context(uuid=str(uuid.uuid4()), app="LBS_TST"),
+    )
+
+
+def _count(histogram: Histogram) -> float:
+    """Helper function for the observations of the reads on a histogram."""
+    return next(
+        (
+            x[2]
+            for x in histogram.samples()
+            if x[0] == "_count" and x[1] == (("transaction", "read"),)
+        ),
+        0,
+    )
+
+
+def test_slow_queries_logged(warnings: list[tuple[str, dict[str, Any]]]) -> None:
+    """Test that slow queries are logged with rows, parameter shapes and plan."""
+    session = SlowSession()
+    profiled = _profiled(session, threshold=0.01, plan="profile")
+
+    async def scenario() -> list[int]:
+        async with profiled:
+            await profiled.read("MATCH (l:Library)\n  RETURN l", {"fid": "secret"})
+            # the plan is fetched in the background: the records are not held back.
+            assert session.plans == []
+            await profiled.write("UNWIND $rows AS row", {"rows": [{}, {}, {}]})
+            rows = [x async for x in profiled.stream("MATCH (l) RETURN l")]
+        await profiled.profiler.stop()
+        return rows
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+    assert len(warnings) == 3
+    message, kwargs = warnings[0]
+    assert kwargs == profiled.context.log  # type: ignore
+    assert (
+        "2 rows): MATCH (l:Library) RETURN l with parameters {'fid': 'str'}" in message
+    )
+    assert "secret" not in message
+    assert "  NodeByLabelScan@neo4j (estimated rows 10, l:Library)" in message
+    assert "list[3]" in warnings[1][0]
+    # writes are only explained, never run again.
+    assert [(x[1], x[2]) for x in session.plans] == [
+        (True, False),
+        (False, True),
+        (True, False),
+    ]
+
+
+def test_fast_queries_not_logged(warnings: list[tuple[str, dict[str, Any]]]) -> None:
+    """Test that queries under the threshold are only observed, not logged nor planned."""
+    session = SlowSession()
+    profiled = _profiled(session, threshold=10.0, plan="explain")
+    observed = _count(DB_STATEMENT_DURATION)
+
+    async def scenario() -> None:
+        async with profiled:
+            await profiled.read("MATCH (l:Library) RETURN l")
+
+    asyncio.run(scenario())
+
+    assert warnings == []
+    assert session.plans == []
+    assert _count(DB_STATEMENT_DURATION) == observed + 1
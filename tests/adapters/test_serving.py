@@ -0,0 +1,80 @@
+import pytest
+
+from adapters import serving
+from adapters.serving import Supervisor, worker_count, worker_pool_size
+from configs.config import settings
+
+
+class ExitedProcess:
+    """Stand-in of a worker process that already exited."""
+
+    pid = 1
+
+    def __init__(self, exitcode: int) -> None:
+        self.exitcode = exitcode
+
+    def is_alive(self) -> bool:
+        return False
+
+    def join(self, timeout: float | None = None) -> None:
+        pass
+
+
+def test_worker_pool_size() -> None:
+    """Test that the workers together stay within the connection budget."""
+    assert worker_pool_size(100, 1) == 100
+    assert worker_pool_size(100, 8) == 12
+    assert worker_pool_size(8, 8) == 1
+
+    with pytest.raises(ValueError):
+        worker_pool_size(4, 8)
+    with pytest.raises(ValueError):
+        worker_pool_size(100, 0)
+
+
+def test_worker_count() -> None:
+    """Test that one worker per cpu is the default, unless configured."""
+    serving_settings = settings.serving.copy()
+    assert serving_settings.workers == 0
+    assert worker_count(serving_settings) >= 1
+
+    serving_settings.workers = 3
+    assert worker_count(serving_settings) == 3
+
+
+def test_crashing_worker_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a worker crashing in a row is replaced with a growing delay."""
+    now = [100.0]
+    monkeypatch.setattr(serving.time, "monotonic", lambda: now[0])
+    supervisor = Supervisor(settings=settings.serving.copy(), app="app:app", workers=1)
+    spawned: list[float] = []
+
+    def spawn(index: int) -> ExitedProcess:
+        spawned.append(now[0])
+        supervisor._started_at[index] = now[0]
+        supervisor._respawn_at.pop(index, None)
+        return ExitedProcess(exitcode=1)
+
+    monkeypatch.setattr(supervisor, "_spawn", spawn)
+    supervisor._processes = [ExitedProcess(exitcode=1)]  # type: ignore
+    supervisor._started_at[0] = now[0]
+
+    # a check every 0.25 seconds, for 10 seconds.
+    for _ in range(40):
+        supervisor._replace_exited()
+        now[0] += 0.25
+
+    # each crash is noticed on the check after the spawn, then waits 0.5, 1, 2, 4 seconds.
+    assert spawned == [100.5, 101.75, 104.0, 108.25]
+
+
+def test_recycled_worker_replaced_at_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a worker exiting cleanly (recycled) is replaced right away."""
+    supervisor = Supervisor(settings=settings.serving.copy(), app="app:app", workers=1)
+    spawned: list[int] = []
+    monkeypatch.setattr(supervisor, "_spawn", lambda index: spawned.append(index))
+    supervisor._processes = [ExitedProcess(exitcode=0)]  # type: ignore
+
+    supervisor._replace_exited()
+
+    assert spawned == [0]
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from adapters.single_flight import SingleFlight
+
+
+class Backend:
+    """Slow backend, counting its calls."""
+
+    calls: int = 0
+
+    async def read(self, value: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if value == "missing":
+            raise KeyError(value)
+        return value.upper()
+
+
+def test_concurrent_calls_share_one() -> None:
+    """Test that identical concurrent calls share a single one, distinct keys don't."""
+    backend = Backend()
+    flights = SingleFlight[str]()
+
+    async def scenario() -> list[str]:
+        return await asyncio.gather(
+            *(flights.do("a", lambda: backend.read("a")) for _ in range(10)),
+            flights.do("b", lambda: backend.read("b")),
+        )
+
+    results = asyncio.run(scenario())
+
+    assert results == ["A"] * 10 + ["B"]
+    assert backend.calls == 2
+    assert not flights.in_flight("a")
+
+
+def test_done_calls_are_not_cached() -> None:
+    """Test that a call is made again once the previous one is done."""
+    backend = Backend()
+    flights = SingleFlight[str]()
+
+    async def scenario() -> None:
+        for _ in range(3):
+            await flights.do("a", lambda: backend.read("a"))
+
+    asyncio.run(scenario())
+
+    assert backend.calls == 3
+
+
+def test_exceptions_are_shared() -> None:
+    """Test that all the callers get the exception of the shared call."""
+    backend = Backend()
+    flights = SingleFlight[str]()
+
+    async def scenario() -> list[str | BaseException]:
+        return await asyncio.gather(
+            *(flights.do("x", lambda: backend.read("missing")) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(x, KeyError) for x in results)
+    assert backend.calls == 1
+
+
+def test_cancelled_caller() -> None:
+    """Test that cancelling a caller does not cancel the call for the others."""
+    backend = Backend()
+    flights = SingleFlight[str]()
+
+    async def scenario() -> str:
+        first = asyncio.create_task(flights.do("a", lambda: backend.read("a")))
+        second = asyncio.create_task(flights.do("a", lambda: backend.read("a")))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "A"
+    assert backend.calls == 1
+
+
+def test_forget() -> None:
+    """Test that the callers after forget make a new call."""
+    backend = Backend()
+    flights = SingleFlight[str]()
+
+    async def scenario() -> None:
+        first = asyncio.create_task(flights.do("a", lambda: backend.read("a")))
+        await asyncio.sleep(0)
+        flights.forget("a")
+        second = asyncio.create_task(flights.do("a", lambda: backend.read("a")))
+        third = asyncio.create_task(flights.do("a", lambda: backend.read("a")))
+        await asyncio.gather(first, second, third)
+
+    asyncio.run(scenario())
+
+    assert backend.calls == 2
+    assert not flights.in_flight("a")
@@ -1,26 +1,110 @@
 import random
 import uuid
+from collections.abc import AsyncIterator, Iterator
+from contextlib import AbstractContextManager
 from dataclasses import dataclass
-from typing import ContextManager
 
 from ferrea.clients.db import DBClient
 from ferrea.core.context import Context
 
 from models.exceptions import FerreaNonExistingLibrary
-from models.library import Library
+from models.geocoding import BoundingBox
+from models.library import (
+    BatchItemResult,
+    BatchStatus,
+    Library,
+    NearbyLibrary,
+    ScoredLibrary,
+)
+
+from .search import InvertedIndex
+from .spatial import KDTree, chord_to_meters, meters_to_chord, to_cartesian
 
 
 @dataclass
 class FakeRepository:
 
-    db_client: ContextManager[DBClient]
+    db_client: AbstractContextManager[DBClient]
     context: Context
 
     def __post_init__(self) -> None:
         self._graph: list[Library] = []
-
-    def find_all_libraries(self) -> list[Library]:
-        return self._graph
+        self._spatial_index: KDTree[Library] | None = None
+        self._text_index: InvertedIndex[str] | None = None
+        self._version = 0
+
+    @property
+    def _location_index(self) -> KDTree[Library]:
+        """Spatial index on the location, rebuilt lazily after a write."""
+        if self._spatial_index is None:
+            self._spatial_index = KDTree(
+                [
+                    (to_cartesian(x.latitude, x.longitude), x)
+                    for x in self._graph
+                    if x.latitude is not None and x.longitude is not None
+                ]
+            )
+        return self._spatial_index
+
+    @property
+    def _search_index(self) -> InvertedIndex[str]:
+        """Full-text index on name and address, rebuilt lazily after a write."""
+        if self._text_index is None:
+            self._text_index = InvertedIndex(
+                [(str(x.fid), f"{x.name} {x.address}") for x in self._graph]
+            )
+        return self._text_index
+
+    def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
+        libraries = sorted(self._graph, key=lambda x: str(x.fid))
+        if after is not None:
+            libraries = [x for x in libraries if str(x.fid) > after]
+        if bbox is not None:
+            libraries = [
+                x
+                for x in libraries
+                if x.latitude is not None
+                and x.longitude is not None
+                and bbox.contains(x.latitude, x.longitude)
+            ]
+        libraries = libraries[:limit]
+        if fields is not None:
+            libraries = [
+                Library.from_trusted(x.model_dump(include=fields | {"fid"}))
+                for x in libraries
+            ]
+        return libraries
+
+    def iter_all_libraries(self) -> Iterator[Library]:
+        yield from sorted(self._graph, key=lambda x: str(x.fid))
+
+    def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
+        found = self._location_index.within_radius(
+            to_cartesian(latitude, longitude), meters_to_chord(radius)
+        )
+        found.sort(key=lambda x: x[0])
+
+        return [
+            NearbyLibrary(**library.model_dump(), distance=chord_to_meters(chord))
+            for chord, library in found[:limit]
+        ]
+
+    def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        libraries = {str(x.fid): x for x in self._graph}
+        return [
+            ScoredLibrary(**libraries[fid].model_dump(), score=score)
+            for score, fid in self._search_index.search(text)[offset : offset + limit]
+        ]
 
     def find_a_library_by_fid(self, fid: str) -> Library:
         [library_found] = [x for x in self._graph if x.fid == fid]
@@ -31,19 +115,43 @@ class FakeRepository:
             )
         return library_found
 
+    def get_collection_version(self) -> int:
+        return self._version
+
     def create_library(self, data: Library) -> Library:
         self._graph.append(self._hydrate_data(data))
 
         return data
 
+    def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        results: list[BatchItemResult] = []
+        for index, data in enumerate(libraries):
+            existing = [
+                x
+                for x in self._graph
+                if (x.name, x.address) == (data.name, data.address)
+            ]
+            if existing:
+                data.fid = existing[0].fid
+                self.update_library(str(data.fid), data)
+                status = BatchStatus.UPDATED
+            else:
+                self.create_library(data)
+                status = BatchStatus.CREATED
+            results.append(BatchItemResult(index=index, status=status, library=data))
+
+        return results
+
     def update_library(self, fid: str, new_value: Library) -> Library:
         if fid not in [x.fid for x in self._graph]:
             raise FerreaNonExistingLibrary(
                 f"Unable to find library based on the provided fid {fid}."
             )
 
+        new_value.fid = fid
         for index, lib in enumerate(self._graph):
             if lib.fid == fid:
+                new_value.version = lib.version
                 self._graph.pop(index)
                 self._graph.insert(index, self._hydrate_data(new_value))
         return new_value
@@ -52,13 +160,78 @@ class FakeRepository:
         for index, lib in enumerate(self._graph):
             if lib.fid == fid:
                 old_library = self._graph.pop(index)
+        self._spatial_index = None
+        self._text_index = None
+        self._version += 1
         return old_library
 
     def _hydrate_data(self, input_data: Library) -> Library:
         """Add read only properties."""
+        self._spatial_index = None
+        self._text_index = None
+        self._version += 1
+        input_data.version += 1
         if input_data.fid is None:
             input_data.fid = str(uuid.uuid4())
         input_data.latitude = random.random()
         input_data.longitude = random.random()
 
         return input_data
+
+
+@dataclass
+class AsyncFakeRepository:
+    """Async counterpart of the FakeRepository, matching the AsyncRepositoryService protocol."""
+
+    repository: FakeRepository
+
+    @property
+    def db_client(self) -> AbstractContextManager[DBClient]:
+        return self.repository.db_client
+
+    @property
+    def context(self) -> Context:
+        return self.repository.context
+
+    async def find_all_libraries(
+        self,
+        after: str | None = None,
+        limit: int | None = None,
+        bbox: BoundingBox | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Library]:
+        return self.repository.find_all_libraries(
+            after=after, limit=limit, bbox=bbox, fields=fields
+        )
+
+    async def iter_all_libraries(self) -> AsyncIterator[Library]:
+        for library in self.repository.iter_all_libraries():
+            yield library
+
+    async def find_nearby_libraries(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyLibrary]:
+        return self.repository.find_nearby_libraries(latitude, longitude, radius, limit)
+
+    async def search_libraries(
+        self, text: str, offset: int, limit: int
+    ) -> list[ScoredLibrary]:
+        return self.repository.search_libraries(text, offset, limit)
+
+    async def find_a_library_by_fid(self, fid: str) -> Library:
+        return self.repository.find_a_library_by_fid(fid)
+
+    async def get_collection_version(self) -> int:
+        return self.repository.get_collection_version()
+
+    async def create_library(self, data: Library) -> Library:
+        return self.repository.create_library(data)
+
+    async def upsert_libraries(self, libraries: list[Library]) -> list[BatchItemResult]:
+        return self.repository.upsert_libraries(libraries)
+
+    async def update_library(self, fid: str, new_value: Library) -> Library:
+        return self.repository.update_library(fid, new_value)
+
+    async def delete_library(self, fid: str) -> Library:
+        return self.repository.delete_library(fid)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import bisect
+import math
+import re
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Sequence
+from typing import Generic, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+_TERMS = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words, as the standard analyzer of the full-text index."""
+    return _TERMS.findall(text.casefold())
+
+
+class InvertedIndex(Generic[T]):
+    """
+    Static inverted index, behaving as the full-text index of the repository:
+    every word must match as a whole or as a prefix (whole words are more relevant).
+    """
+
+    def __init__(self, documents: Sequence[tuple[T, str]]) -> None:
+        self._postings: dict[str, Counter[T]] = defaultdict(Counter)
+        for key, text in documents:
+            for token in tokenize(text):
+                self._postings[token][key] += 1
+        self._vocabulary = sorted(self._postings)
+        self._documents = len(documents)
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + self._documents / len(self._postings[token]))
+
+    def _expand(self, term: str) -> list[str]:
+        """The tokens of the vocabulary starting with the term."""
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff")
+        return self._vocabulary[start:end]
+
+    def search(self, text: str) -> list[tuple[float, T]]:
+        """The documents matching all the words, with their score, the best first."""
+        terms = tokenize(text)
+        if len(terms) == 0:
+            return []
+
+        scores: Counter[T] | None = None
+        for term in terms:
+            term_scores: Counter[T] = Counter()
+            for token in self._expand(term):
+                boost = 1.0 if token == term else 0.5
+                for key, frequency in self._postings[token].items():
+                    term_scores[key] += boost * frequency * self._idf(token)
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = Counter(
+                    {
+                        k: v + term_scores[k]
+                        for k, v in scores.items()
+                        if k in term_scores
+                    }
+                )
+
+        assert scores is not None
+        return sorted(
+            ((score, key) for key, score in scores.items()),
+            key=lambda x: (-x[0], x[1]),
+        )
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+# same radius used by Neo4j for the distance between WGS-84 points.
+EARTH_RADIUS = 6_378_140.0
+
+Coordinates = tuple[float, ...]
+
+
+def to_cartesian(latitude: float, longitude: float) -> Coordinates:
+    """Point on the unit sphere: the chord distance grows with the great circle one."""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (
+        math.cos(lat) * math.cos(lon),
+        math.cos(lat) * math.sin(lon),
+        math.sin(lat),
+    )
+
+
+def chord_to_meters(chord: float) -> float:
+    """Great circle distance (meters) of a chord of the unit sphere."""
+    return 2 * EARTH_RADIUS * math.asin(min(chord / 2, 1.0))
+
+
+def meters_to_chord(meters: float) -> float:
+    """Chord of the unit sphere of a great circle distance (meters)."""
+    return 2 * math.sin(min(meters / EARTH_RADIUS, math.pi) / 2)
+
+
+@dataclass
+class _Node(Generic[T]):
+    point: Coordinates
+    item: T
+    axis: int
+    left: _Node[T] | None
+    right: _Node[T] | None
+
+
+class KDTree(Generic[T]):
+    """Static k-d tree, balanced on the median of each axis."""
+
+    def __init__(self, items: Sequence[tuple[Coordinates, T]]) -> None:
+        self._root = self._build(list(items), depth=0)
+
+    def _build(self, items: list[tuple[Coordinates, T]], depth: int) -> _Node[T] | None:
+        if len(items) == 0:
+            return None
+
+        axis = depth % len(items[0][0])
+        items.sort(key=lambda x: x[0][axis])
+        median = len(items) // 2
+        point, item = items[median]
+
+        return _Node(
+            point=point,
+            item=item,
+            axis=axis,
+            left=self._build(items[:median], depth + 1),
+            right=self._build(items[median + 1 :], depth + 1),
+        )
+
+    def within_radius(
+        self, center: Coordinates, radius: float
+    ) -> list[tuple[float, T]]:
+        """All the items within the euclidean radius, with their distance."""
+        found: list[tuple[float, T]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+
+            distance = math.dist(node.point, center)
+            if distance <= radius:
+                found.append((distance, node.item))
+
+            delta = center[node.axis] - node.point[node.axis]
+            if delta - radius <= 0:
+                stack.append(node.left)
+            if delta + radius >= 0:
+                stack.append(node.right)
+
+        return found
@@ -1,30 +1,41 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import uuid
+import zlib
+from typing import Any
 
+import msgpack
 import pytest
-from fake.repository import FakeRepository
+from fake.repository import AsyncFakeRepository, FakeRepository
 from fastapi.testclient import TestClient
 from ferrea.clients.db import ConnectionSettings, Neo4jClient
 from ferrea.core.context import Context
 
 from app import app as spinup_app
-from models.repository import RepositoryService
+from configs import settings
+from models.repository import AsyncRepositoryService
 from routers._builder import build_repository
+from routers._middleware import CompressionMiddleware
 
 PREFIX = "/api/v1/libraries"
 
 
 @pytest.fixture
 def client() -> TestClient:
-    def mock_repository_dependency() -> RepositoryService:
-        context = Context(uuid=str(uuid.uuid4()), app="LBS_TST")
-        conn_sett = ConnectionSettings(
-            uri="",
-            user="",
-            password="",
-        )
-        return FakeRepository(context=context, db_client=Neo4jClient(conn_sett))
+    context = Context(uuid=str(uuid.uuid4()), app="LBS_TST")
+    conn_sett = ConnectionSettings(
+        uri="",
+        user="",
+        password="",
+    )
+    repository = AsyncFakeRepository(
+        FakeRepository(context=context, db_client=Neo4jClient(conn_sett))
+    )
+
+    def mock_repository_dependency() -> AsyncRepositoryService:
+        return repository
 
     app = spinup_app()
     app.dependency_overrides[build_repository] = mock_repository_dependency
@@ -40,3 +51,267 @@ def test_no_libraries(client: TestClient) -> None:
 
     assert response.status_code == 200
     assert actual == expected
+
+
+def _create_libraries(client: TestClient, count: int) -> None:
+    """Helper function to populate the repository."""
+    for index in range(count):
+        response = client.post(
+            PREFIX,
+            json={"name": f"Library {index}", "address": f"Via Roma, {index}, Monza"},
+        )
+        assert response.status_code == 200
+
+
+def test_pagination(client: TestClient) -> None:
+    """Test that all libraries are listed exactly once, a page at a time."""
+    _create_libraries(client, 5)
+
+    fids: list[str] = []
+    pages = 0
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get(PREFIX, params=params)
+        assert response.status_code == 200
+        body = response.json()
+        fids.extend(library["fid"] for library in body["result"])
+        pages += 1
+        if "next_cursor" not in body:
+            break
+        params["cursor"] = body["next_cursor"]
+
+    assert pages == 3
+    assert fids == sorted(fids)
+    assert len(set(fids)) == 5
+
+
+def test_pagination_invalid_cursor(client: TestClient) -> None:
+    """Test that a forged cursor is rejected."""
+    response = client.get(PREFIX, params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+def test_export(client: TestClient) -> None:
+    """Test that all libraries are streamed as NDJSON, one per line."""
+    _create_libraries(client, 3)
+
+    response = client.get(f"{PREFIX}:export")
+    libraries = [json.loads(line) for line in response.text.splitlines()]
+    fids = [library["fid"] for library in libraries]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(libraries) == 3
+    assert fids == sorted(fids)
+
+
+def test_nearby_libraries(client: TestClient) -> None:
+    """Test that the libraries within the radius are listed, the nearest first."""
+    _create_libraries(client, 5)
+
+    # the fake repository places the libraries between (0, 0) and (1, 1).
+    response = client.get(
+        f"{PREFIX}/nearby", params={"lat": 0.5, "lon": 0.5, "radius": 200_000}
+    )
+    distances = [library["distance"] for library in response.json()["result"]]
+
+    assert response.status_code == 200
+    assert len(distances) == 5
+    assert distances == sorted(distances)
+
+    response = client.get(
+        f"{PREFIX}/nearby", params={"lat": -45, "lon": -90, "radius": 1_000}
+    )
+    assert response.json() == {"items": 0, "result": []}
+
+
+def test_bbox(client: TestClient) -> None:
+    """Test that only the libraries inside the bounding box are listed."""
+    _create_libraries(client, 5)
+
+    # the fake repository places the libraries between (0, 0) and (1, 1).
+    inside = client.get(PREFIX, params={"bbox": "0,0,1,1"}).json()
+    outside = client.get(PREFIX, params={"bbox": "10,10,11,11", "limit": 1}).json()
+    invalid = client.get(PREFIX, params={"bbox": "0,1,1,0"})
+
+    assert inside["items"] == 5
+    assert outside == {"items": 0, "result": []}
+    assert invalid.status_code == 400
+
+
+def test_batch(client: TestClient) -> None:
+    """Test that each item of a batch gets its own outcome."""
+    _create_libraries(client, 1)
+
+    response = client.post(
+        f"{PREFIX}:batch",
+        json=[
+            {"name": "Library 0", "address": "Via Roma, 0, Monza"},
+            {"name": "Monza Civica", "address": "Via Padre Giuliani, 1, Monza"},
+            {"name": "No address"},
+        ],
+    )
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["items"] == 3
+    assert [x["status"] for x in body["result"]] == ["updated", "created", "invalid"]
+    assert body["result"][2]["error"].startswith("address")
+    assert client.get(PREFIX).json()["items"] == 2
+    assert client.post(f"{PREFIX}:batch", json=[]).status_code == 422
+
+
+def test_etags(client: TestClient) -> None:
+    """Test that unchanged resources are answered with 304, until a write."""
+    _create_libraries(client, 1)
+    collection = client.get(PREFIX)
+    fid = collection.json()["result"][0]["fid"]
+    library = client.get(f"{PREFIX}/{fid}")
+
+    for response in (collection, library):
+        etag = response.headers["etag"]
+        cached = client.get(response.url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+    client.put(f"{PREFIX}/{fid}", json={"name": "Renamed", "address": "Monza"})
+
+    for response in (collection, library):
+        etag = response.headers["etag"]
+        changed = client.get(response.url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+
+def test_search(client: TestClient) -> None:
+    """Test that libraries are found by partial words, the most relevant first."""
+    for name, address in [
+        ("Biblioteca Civica", "Via Padre Reginaldo Giuliani, Monza"),
+        ("Biblioteca Triante", "Via Monte Amiata, Monza"),
+        ("Biblioteca Centrale", "Via Roma, Milano"),
+    ]:
+        client.post(PREFIX, json={"name": name, "address": address})
+
+    response = client.get(f"{PREFIX}/search", params={"q": "bibl monza", "limit": 1})
+    body = response.json()
+    assert response.status_code == 200
+    assert body["items"] == 1
+
+    next_page = client.get(
+        f"{PREFIX}/search",
+        params={"q": "bibl monza", "limit": 1, "cursor": body["next_cursor"]},
+    ).json()
+    names = {body["result"][0]["name"], next_page["result"][0]["name"]}
+    assert names == {"Biblioteca Civica", "Biblioteca Triante"}
+    assert "next_cursor" not in next_page
+
+    exact = client.get(f"{PREFIX}/search", params={"q": "civica"}).json()
+    assert [x["name"] for x in exact["result"]] == ["Biblioteca Civica"]
+    assert exact["result"][0]["score"] > 0
+
+
+def test_sparse_fieldsets(client: TestClient) -> None:
+    """Test that only the requested fields are returned, on every page."""
+    _create_libraries(client, 3)
+
+    response = client.get(PREFIX, params={"fields": "fid,name", "limit": 2})
+    body = response.json()
+    next_page = client.get(
+        PREFIX, params={"fields": "name", "cursor": body["next_cursor"]}
+    ).json()
+
+    assert response.status_code == 200
+    assert all(set(x) == {"fid", "name"} for x in body["result"])
+    assert next_page["result"] == [{"name": next_page["result"][0]["name"]}]
+    assert response.headers["etag"] != client.get(PREFIX).headers["etag"]
+    assert client.get(PREFIX, params={"fields": "name,version"}).status_code == 400
+    assert client.get(PREFIX, params={"fields": ","}).status_code == 400
+
+
+def test_metrics(client: TestClient) -> None:
+    """Test that requests are observed by route template, status and method."""
+    client.app.state.geocoding_worker = None  # type: ignore
+    client.app.state.library_cache = None  # type: ignore
+    _create_libraries(client, 1)
+    fid = client.get(PREFIX).json()["result"][0]["fid"]
+    client.get(f"{PREFIX}/{fid}")
+
+    response = client.get("/_/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    # labelled by the template of the route, not by the fid.
+    assert '/libraries/{fid}",method="GET",status="200"}' in response.text
+    assert 'ferrea_cache_hits_total{cache="geocoding"}' in response.text
+    assert fid not in response.text
+
+
+def test_msgpack(client: TestClient) -> None:
+    """Test that MessagePack is negotiated for both the request and the response."""
+    library = {"name": "Biblioteca Civica", "address": "Via Roma, 1, Monza"}
+    headers = {"content-type": "application/msgpack", "accept": "application/msgpack"}
+
+    created = client.post(PREFIX, content=msgpack.packb(library), headers=headers)
+    listed = client.get(PREFIX, headers={"accept": "application/msgpack"})
+
+    assert created.status_code == 200
+    assert created.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(created.content)["name"] == library["name"]
+    assert (
+        msgpack.unpackb(listed.content)["result"] == client.get(PREFIX).json()["result"]
+    )
+    assert listed.headers["etag"] != client.get(PREFIX).headers["etag"]
+    assert "Accept" in listed.headers["vary"]
+    malformed = client.post(PREFIX, content=b"\xc1", headers=headers)
+    assert malformed.status_code == 400
+
+
+def test_compression(client: TestClient) -> None:
+    """Test that only the bodies above the minimum size are compressed."""
+    _create_libraries(client, 20)
+    fid = client.get(PREFIX).json()["result"][0]["fid"]
+
+    listed = client.get(PREFIX, headers={"accept-encoding": "gzip"})
+    single = client.get(f"{PREFIX}/{fid}", headers={"accept-encoding": "gzip"})
+    plain = client.get(PREFIX, headers={"accept-encoding": "identity"})
+
+    assert listed.headers["content-encoding"] == "gzip"
+    assert listed.headers["etag"] == f"W/{plain.headers['etag']}"
+    assert listed.json() == plain.json()
+    assert "content-encoding" not in single.headers
+    assert "content-encoding" not in plain.headers
+    not_modified = client.get(
+        PREFIX,
+        headers={"accept-encoding": "gzip", "if-none-match": listed.headers["etag"]},
+    )
+    assert not_modified.status_code == 304
+
+
+def test_streamed_compression() -> None:
+    """Test that each chunk of a compressed stream is sent as soon as it's produced."""
+    lines = [b'{"name": "Triante"}\n', b'{"name": "Civica"}\n']
+
+    async def stream(scope: Any, receive: Any, send: Any) -> None:
+        headers = [(b"content-type", b"application/x-ndjson")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for line in lines:
+            await send({"type": "http.response.body", "body": line, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    messages: list[dict[str, Any]] = []
+
+    async def send(message: dict[str, Any]) -> None:
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    middleware = CompressionMiddleware(stream, settings=settings.compression)
+    asyncio.run(middleware(scope, None, send))  # type: ignore
+
+    chunks = [x["body"] for x in messages if x["type"] == "http.response.body"]
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # the first line can be read before the body ends.
+    assert decompressor.decompress(chunks[0]) == lines[0]
+    assert decompressor.decompress(b"".join(chunks[1:])) == lines[1]
+    assert decompressor.eof
@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+
+# modules that are heavy to import and needed only by few requests, if any.
+LAZY_MODULES = ("geopy", "phonenumbers", "yaml", "uvicorn")
+
+
+def test_import_budget() -> None:
+    """Test that importing (and building) the app leaves the heavy modules unloaded."""
+    script = (
+        "import json, sys; import app; app.app(); "
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    env.pop("FERREA_FERREA_APP__OAS_PATH", None)
+
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert json.loads(result.stdout.splitlines()[-1]) == []